@@ -0,0 +1,244 @@
+"""
+This file hosts a parallel, resumable grid search over the hyperparameters of
+the ANFIS model.
+
+Each combination of hyperparameters is a trial that is trained independently,
+so the trials are spread across a pool of worker processes, each of which is
+given a budget of CPU threads such that the workers do not contend with one
+another. The results of every trial are appended to a single SQLite table as
+soon as the trial completes, and trials that are already within the table are
+skipped, such that an interrupted search can simply be resumed.
+
+Every trial is trained on the same seeded split of the data, and is stored
+along with the name of that split. The results of earlier searches, which were
+each trained on a different unseeded split, can be imported into the table, but
+are marked as the 'legacy' split, such that they are never treated as completed
+trials of a seeded search or ranked alongside them.
+
+"""
+#################################### Import Packages: ####################################
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import multiprocessing
+import numpy as np
+import pandas as pd
+from itertools import product
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import tensorflow as tf
+from tensorflow import keras
+from tensorflow.keras import Input, Model
+from tensorflow.keras.optimizers import Adam
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+# the layers are shared with the deployed model, rather than copied next to this file:
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ANFIS_Model_Deployment'))
+from ANFIS_Custom_Layers import *
+
+#################################### Define  Classes: ####################################
+
+# append-only store of the grid search results:
+class ResultsStore:
+    # the columns of the results table, in the same format as consolidated_results.csv:
+    param_columns = ['MF_type', 'MF_num', 'learning_rate', 'batch_size', 'num_epochs']
+    result_columns = ['train_MSE', 'train_MAE', 'train_RMSE', 'train_R2', 'val_MSE', 'val_MAE', 'val_RMSE', 'val_R2', 'training_time']
+
+    # map of the keras history keys onto the result columns:
+    history_columns = {
+        'loss'                          : 'train_MSE',
+        'mae'                           : 'train_MAE',
+        'root_mean_squared_error'       : 'train_RMSE',
+        'r2_score'                      : 'train_R2',
+        'val_loss'                      : 'val_MSE',
+        'val_mae'                       : 'val_MAE',
+        'val_root_mean_squared_error'   : 'val_RMSE',
+        'val_r2_score'                  : 'val_R2',
+        'train_time'                    : 'training_time',
+    }
+
+    # name of the split of the results imported from earlier searches, which were trained on unseeded splits:
+    legacy_split = 'legacy'
+
+    # constructor:
+    def __init__(self, path):
+        self.path = path
+
+        # create the table if it does not exist:
+        with sqlite3.connect(self.path) as connection:
+            types = {'MF_type': 'TEXT', 'MF_num': 'INTEGER', 'batch_size': 'INTEGER', 'num_epochs': 'INTEGER'}
+            columns = ', '.join([f'{c} {types.get(c, "REAL")}' for c in self.param_columns + self.result_columns])
+            existing = [row[1] for row in connection.execute('PRAGMA table_info(results)')]
+
+            # a table written before the splits were recorded cannot tell its trials apart, so they are all marked as legacy:
+            if existing and 'split' not in existing:
+                connection.execute('ALTER TABLE results RENAME TO results_unsplit')
+            connection.execute(f'CREATE TABLE IF NOT EXISTS results (trial TEXT, split TEXT, {columns}, completed_at REAL, PRIMARY KEY (trial, split))')
+            if existing and 'split' not in existing:
+                connection.execute(f"INSERT INTO results SELECT trial, '{self.legacy_split}', {', '.join(existing[1:])} FROM results_unsplit")
+                connection.execute('DROP TABLE results_unsplit')
+
+    # keys of the trials that have completed on a split:
+    def completed(self, split):
+        with sqlite3.connect(self.path) as connection:
+            return {row[0] for row in connection.execute('SELECT trial FROM results WHERE split = ?', (split, ))}
+
+    # append the results of a trial, trained on the given split:
+    def add(self, params, results, split):
+        row = [trial_key(params), split, params['mf_type'], params['num_mfs'], params['learning_rate'], params['batch_size'], params['num_epochs']]
+        row += [results.get(key) for key in self.history_columns]
+        row += [time.time()]
+
+        with sqlite3.connect(self.path) as connection:
+            connection.execute(f'INSERT OR IGNORE INTO results VALUES ({", ".join("?" * len(row))})', row)
+
+    # import the results of the per-trial directories written by earlier searches, marked as the legacy split:
+    def import_directories(self, folder):
+        completed = self.completed(self.legacy_split)
+        for name in sorted(os.listdir(folder)):
+            params_file = os.path.join(folder, name, 'params_results.json')
+            if os.path.isfile(params_file):
+                with open(params_file, 'r') as f:
+                    data = json.load(f)
+                if trial_key(data['parameters']) not in completed:
+                    self.add(data['parameters'], data['results'], self.legacy_split)
+
+    # load the results as a dataframe, of every split or only of the given split:
+    def to_dataframe(self, split = None):
+        query = f'SELECT split, {", ".join(self.param_columns + self.result_columns)} FROM results'
+        with sqlite3.connect(self.path) as connection:
+            if split is None:
+                results_df = pd.read_sql_query(f'{query} ORDER BY split, trial', connection)
+            else:
+                results_df = pd.read_sql_query(f'{query} WHERE split = ? ORDER BY trial', connection, params = (split, ))
+
+        # insert an identifer for models:
+        results_df.insert(0, 'model_name', [f'model {index + 1}' for index in range(len(results_df))])
+        return results_df
+
+#################################### Define Functions: ###################################
+
+LOSS_FUNCTION = 'mse'
+
+# define model generation function:
+def BuildAnfis(input_shape, num_inputs, num_mfs, mf_type, rate):
+    # define the inputs:
+    inputs = Input(shape = input_shape)
+
+    # add the custom layers:
+    membership_layer = MF_Layer(num_inputs = num_inputs, num_mfs = num_mfs, mf_type = mf_type)(inputs)
+    firing_layer = FS_Layer(num_inputs = num_inputs, num_mfs = num_mfs)(membership_layer)
+    normalization_layer = NM_Layer(num_inputs = num_inputs, num_mfs = num_mfs)(firing_layer)
+    consequent_layer = CN_Layer(num_inputs = num_inputs, num_mfs = num_mfs)([normalization_layer, inputs])
+    output_layer = O_Layer(num_inputs = num_inputs, num_mfs = num_mfs)(consequent_layer)
+
+    # compile the model:
+    model = Model(inputs = inputs, outputs = output_layer)
+    model.compile(optimizer = Adam(learning_rate = rate),
+                  loss = LOSS_FUNCTION,
+                  metrics = ['mae', keras.metrics.RootMeanSquaredError(), keras.metrics.R2Score()])
+
+    return model
+
+# name of the data split that is made with a given seed:
+def split_name(seed):
+    return f'seed_{seed}'
+
+# key of a trial, which is the same as the directory names of earlier searches:
+def trial_key(params):
+    return f"{params['num_epochs']}_{params['batch_size']}_{params['learning_rate']}_{params['mf_type']}_{params['num_mfs']}"
+
+# every combination of the hyperparameters, in the same order as the nested loops of the notebook:
+def grid_trials(num_epochs, batch_sizes, learning_rates, membership_functions, num_mfs):
+    return [{'mf_type': mf, 'num_mfs': num, 'learning_rate': rate, 'batch_size': batch, 'num_epochs': epochs}
+            for epochs, batch, rate, mf, num in product(num_epochs, batch_sizes, learning_rates, membership_functions, num_mfs)]
+
+# load, split, and scale the data:
+def load_data(data_path, seed = 0):
+    # perform split:
+    data = pd.read_csv(data_path)
+    x_data = data.drop(columns = 'Suitability').astype('float32').values
+    y_data = data['Suitability'].astype('float32').values
+
+    # split the data using train_test_split, seeded such that every worker uses the same split:
+    x_train, x_filler, y_train, y_filler = train_test_split(x_data, y_data, test_size = 0.2, random_state = seed)
+    x_val, x_test, y_val, y_test = train_test_split(x_filler, y_filler, test_size = 0.5, random_state = seed)
+
+    # scale each set:
+    scaler = StandardScaler()
+    x_train = scaler.fit_transform(x_train)
+    x_val = scaler.transform(x_val)
+    x_test = scaler.transform(x_test)
+
+    return x_train, y_train, x_val, y_val, x_test, y_test
+
+# state of each worker process, which is loaded once by init_worker():
+_worker_state = {}
+
+def init_worker(data_path, threads, seed):
+    # limit the threads that tensorflow uses within this worker:
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+    # load the data once per worker:
+    _worker_state['data'] = load_data(data_path, seed)
+    _worker_state['seed'] = seed
+
+# train a single trial:
+def run_trial(params):
+    x_train, y_train, x_val, y_val, _, _ = _worker_state['data']
+
+    # build the model:
+    tf.keras.backend.clear_session()
+    tf.keras.utils.set_random_seed(_worker_state['seed'])
+    model = BuildAnfis(input_shape = (3, ),
+                       num_inputs = 3,
+                       num_mfs = params['num_mfs'],
+                       mf_type = params['mf_type'],
+                       rate = params['learning_rate'])
+
+    # train the model:
+    train_start = time.time()
+    history = model.fit(x_train, y_train,
+                        epochs = params['num_epochs'],
+                        batch_size = params['batch_size'],
+                        validation_data = (x_val, y_val),
+                        verbose = 0)
+    train_time = time.time() - train_start
+
+    # store training results:
+    training_results = {key: float(values[-1]) for key, values in history.history.items()}
+    training_results['train_time'] = train_time
+
+    return params, training_results
+
+# run the grid search:
+def run_grid_search(trials, store_path, data_path, workers = None, threads_per_worker = 1, seed = 0):
+    # this function trains every trial that is not already in the results store for the split of this seed,
+    # across a pool of worker processes, and appends the results of each trial to the store as soon as it completes:
+    store = ResultsStore(store_path)
+    split = split_name(seed)
+    completed = store.completed(split)
+    remaining = [params for params in trials if trial_key(params) not in completed]
+    print(f'{len(trials) - len(remaining)}/{len(trials)} trials already completed on the {split} split')
+
+    if not remaining:
+        return store
+
+    # by default, use as many workers as the thread budget allows:
+    if workers is None:
+        workers = max(1, (os.cpu_count() or 1) // threads_per_worker)
+
+    # spawn fresh processes, such that each worker initializes its own tensorflow runtime:
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers = workers, mp_context = context, initializer = init_worker, initargs = (data_path, threads_per_worker, seed)) as executor:
+        futures = [executor.submit(run_trial, params) for params in remaining]
+        for j, future in enumerate(as_completed(futures)):
+            params, training_results = future.result()
+            store.add(params, training_results, split)
+            print(f'completed trial {j + 1}/{len(remaining)}: {trial_key(params)}')
+
+    return store
@@ -0,0 +1,197 @@
+"""
+This file hosts an asynchronous successive halving (ASHA) scheduler for the
+hyperparameter search of the ANFIS model.
+
+Rather than training every configuration for the full number of epochs, every
+configuration is first trained for a small number of epochs, and only the best
+1/eta of the configurations at each rung, based on the validation loss, are
+promoted to be trained for eta times as many epochs. Promotions are made as
+soon as a worker is free, rather than waiting for every configuration of a rung
+to finish, such that the workers are never left idle.
+
+A promoted configuration continues from the weights that it reached at its
+previous rung, so the total number of epochs trained is far smaller than that
+of the exhaustive grid search. The Adam moments are not carried over between
+rungs.
+
+The search is compared against the trials of the exhaustive grid search that
+were trained on the same seeded split of the data, such that both searches are
+ranked on the same validation data.
+
+"""
+#################################### Import Packages: ####################################
+
+import os
+import time
+import tempfile
+import multiprocessing
+import numpy as np
+import pandas as pd
+from itertools import product
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import tensorflow as tf
+from ANFIS_Grid_Search import BuildAnfis, init_worker, split_name, _worker_state
+
+#################################### Define Functions: ###################################
+
+# every configuration of the hyperparameters, with the number of epochs left to the scheduler:
+def asha_configs(batch_sizes, learning_rates, membership_functions, num_mfs):
+    return [{'mf_type': mf, 'num_mfs': num, 'learning_rate': rate, 'batch_size': batch}
+            for batch, rate, mf, num in product(batch_sizes, learning_rates, membership_functions, num_mfs)]
+
+# key of a configuration:
+def config_key(config):
+    return f"{config['batch_size']}_{config['learning_rate']}_{config['mf_type']}_{config['num_mfs']}"
+
+# epochs at which each rung ends, growing by eta until max_epochs:
+def asha_rungs(min_epochs, max_epochs, eta):
+    rungs = []
+    epochs = min_epochs
+    while epochs < max_epochs:
+        rungs.append(epochs)
+        epochs *= eta
+    rungs.append(max_epochs)
+    return rungs
+
+# train a configuration from one rung to the next:
+def run_rung(config, start_epoch, end_epoch, checkpoint_path):
+    x_train, y_train, x_val, y_val, _, _ = _worker_state['data']
+
+    # build the model, continuing from the previous rung if it has been trained:
+    tf.keras.backend.clear_session()
+    tf.keras.utils.set_random_seed(_worker_state['seed'])
+    model = BuildAnfis(input_shape = (3, ),
+                       num_inputs = 3,
+                       num_mfs = config['num_mfs'],
+                       mf_type = config['mf_type'],
+                       rate = config['learning_rate'])
+    if start_epoch > 0:
+        model.load_weights(checkpoint_path)
+
+    # train the model up to the end of this rung:
+    train_start = time.time()
+    history = model.fit(x_train, y_train,
+                        initial_epoch = start_epoch,
+                        epochs = end_epoch,
+                        batch_size = config['batch_size'],
+                        validation_data = (x_val, y_val),
+                        verbose = 0)
+    train_time = time.time() - train_start
+
+    # save the weights for a promotion:
+    model.save_weights(checkpoint_path)
+
+    # store training results:
+    training_results = {key: float(values[-1]) for key, values in history.history.items()}
+    training_results['train_time'] = train_time
+
+    return training_results
+
+# run the asha search:
+def asha_search(configs, data_path, min_epochs = 25, max_epochs = 500, eta = 3, workers = None, threads_per_worker = 1, seed = 0, checkpoint_dir = None):
+    # this function returns a dataframe with a row for every configuration trained to every rung, along with
+    # the number of epochs it was trained for and the time taken:
+    rungs = asha_rungs(min_epochs, max_epochs, eta)
+    rung_results = [{} for _ in rungs]      # validation loss of each configuration that completed each rung
+    promoted = [set() for _ in rungs]       # configurations that have been promoted out of each rung
+    rows = []
+    next_config = 0
+
+    if checkpoint_dir is None:
+        checkpoint_dir = tempfile.mkdtemp(prefix = 'asha_')
+    os.makedirs(checkpoint_dir, exist_ok = True)
+
+    # by default, use as many workers as the thread budget allows:
+    if workers is None:
+        workers = max(1, (os.cpu_count() or 1) // threads_per_worker)
+
+    # get the next job, preferring promotions from the highest rung:
+    def next_job():
+        nonlocal next_config
+        for rung in reversed(range(len(rungs) - 1)):
+            completed = rung_results[rung]
+            top = sorted(completed, key = completed.get)[:len(completed) // eta]
+            for index in top:
+                if index not in promoted[rung]:
+                    promoted[rung].add(index)
+                    return index, rung + 1
+
+        # otherwise start a new configuration at the bottom rung:
+        if next_config < len(configs):
+            next_config += 1
+            return next_config - 1, 0
+
+        return None
+
+    # submit a job to the pool:
+    def submit(executor, job):
+        index, rung = job
+        start_epoch = rungs[rung - 1] if rung > 0 else 0
+        checkpoint_path = os.path.join(checkpoint_dir, f'{config_key(configs[index])}.weights.h5')
+        future = executor.submit(run_rung, configs[index], start_epoch, rungs[rung], checkpoint_path)
+        running[future] = (index, rung, start_epoch)
+
+    # spawn fresh processes, such that each worker initializes its own tensorflow runtime:
+    context = multiprocessing.get_context('spawn')
+    running = {}
+    with ProcessPoolExecutor(max_workers = workers, mp_context = context, initializer = init_worker, initargs = (data_path, threads_per_worker, seed)) as executor:
+        # fill every worker:
+        for _ in range(workers):
+            job = next_job()
+            if job is None:
+                break
+            submit(executor, job)
+
+        while running:
+            done, _ = wait(running, return_when = FIRST_COMPLETED)
+            for future in done:
+                index, rung, start_epoch = running.pop(future)
+                training_results = future.result()
+                rung_results[rung][index] = training_results['val_loss']
+
+                rows.append({**configs[index], 'split': split_name(seed), 'rung': rung, 'num_epochs': rungs[rung], 'epochs_trained': rungs[rung] - start_epoch,
+                             'val_MSE': training_results['val_loss'], 'train_MSE': training_results['loss'],
+                             'training_time': training_results['train_time']})
+                print(f"completed {config_key(configs[index])} at {rungs[rung]} epochs, val_MSE: {round(training_results['val_loss'], 4)}")
+
+                # hand the free worker its next job:
+                job = next_job()
+                if job is not None:
+                    submit(executor, job)
+
+    return pd.DataFrame(rows)
+
+# compare the asha search against the exhaustive grid search:
+def asha_report(asha_df, consolidated_df):
+    # only the exhaustive trials that were trained on the same split as the asha search are compared against:
+    split = asha_df['split'].iloc[0]
+    if 'split' not in consolidated_df.columns or not (consolidated_df['split'] == split).any():
+        raise ValueError(f'No exhaustive search results were trained on the {split} split, see ResultsStore.to_dataframe()')
+    consolidated_df = consolidated_df[consolidated_df['split'] == split]
+
+    # the chosen configuration is the best at the highest rung that was reached:
+    top_rung = asha_df['rung'].max()
+    chosen = asha_df[asha_df['rung'] == top_rung].sort_values(by = 'val_MSE').iloc[0]
+
+    # the best configuration of the exhaustive search, at the same number of epochs if it was searched,
+    # otherwise at the largest number of epochs:
+    epochs = chosen['num_epochs'] if chosen['num_epochs'] in set(consolidated_df['num_epochs']) else consolidated_df['num_epochs'].max()
+    exhaustive = consolidated_df[consolidated_df['num_epochs'] == epochs].sort_values(by = 'val_MSE').reset_index(drop = True)
+    best = exhaustive.iloc[0]
+
+    # rank of the chosen configuration within the exhaustive search:
+    match = ((exhaustive['MF_type'] == chosen['mf_type']) & (exhaustive['MF_num'] == chosen['num_mfs']) &
+             np.isclose(exhaustive['learning_rate'], chosen['learning_rate']) & (exhaustive['batch_size'] == chosen['batch_size']))
+    rank = int(np.flatnonzero(match)[0]) + 1 if match.any() else None
+    exhaustive_val = float(exhaustive.loc[match, 'val_MSE'].iloc[0]) if match.any() else np.nan
+
+    report = pd.DataFrame({
+        'ASHA'          : [f"{chosen['mf_type']}, {chosen['num_mfs']} MFs, lr {chosen['learning_rate']}, batch {chosen['batch_size']}",
+                           chosen['val_MSE'], exhaustive_val, rank, int(asha_df['epochs_trained'].sum()), asha_df['training_time'].sum()],
+        'Exhaustive'    : [f"{best['MF_type']}, {best['MF_num']} MFs, lr {best['learning_rate']}, batch {best['batch_size']}",
+                           best['val_MSE'], best['val_MSE'], 1, int(consolidated_df['num_epochs'].sum()), consolidated_df['training_time'].sum()],
+    })
+    report.index = ['Configuration', 'Search val_MSE', f'Exhaustive val_MSE at {epochs} epochs', 'Exhaustive rank',
+                    'Total epochs trained', 'Total training time (s)']
+
+    return report
@@ -62,6 +62,13 @@ class MF_Layer(Layer):
             self.init_max = 50.0
             self.init_min = 1.0
 
+        # select the membership function once, rather than on every call:
+        self.mf_function = {
+            'Gaussian'              : self.gaussian,
+            'Smoothed Triangular'   : self.smoothed_triangular,
+            'Generalized Bell'      : self.generalized_bell,
+        }[self.mf_type]
+
         # need to initialize antecedent parameters
         self.mf_params = self.add_weight(
             shape = (self.num_inputs, self.num_mfs, self.num_antecedents),             
@@ -155,77 +162,61 @@ class MF_Layer(Layer):
             plt.grid(True)
         plt.show()
 
-    # function call:
-    def call(self, inputs):
-        # need to initialize the membership values:
-        membership_values = []
+    # gaussian membership function:
+    def gaussian(self, x, params):
+        # define parameters, each of shape (num_inputs, num_mfs):
+        mean = params[:, :, 0]  # mean of the gaussian
+        std = params[:, :, 1]   # standard deviation of the gaussian
 
-        # for every input:
-        for i in range(self.num_inputs):
-            # get the memberships for that input:
-            input_mf_params = self.mf_params[i]
+        # compute output:
+        return tf.exp(-0.5 * tf.square((x - mean) / (std + 1e-6)))
 
-            # need to now compute the fuzzified value for each membership function:
-            fuzzified_values = []
+    # smoothed triangular membership function:
+    def smoothed_triangular(self, x, params):
+        # define parameters, each of shape (num_inputs, num_mfs):
+        a = params[:, :, 0]     # a parameter
+        b = params[:, :, 1]     # b parameter
+        c = params[:, :, 2]     # c parameter
 
-            # for every membership function:
-            for j in range(self.num_mfs):
+        # smoothing factor beta:
+        beta = 100.0
 
-                # if gaussian:
-                if self.mf_type == 'Gaussian':
-                    # define parameters:
-                    mean = input_mf_params[j, 0]  # mean of the gaussian
-                    std = input_mf_params[j, 1]   # standard deviation of the gaussian
+        # check if we are on the edges:
+        is_left_edge = tf.equal(a, b)
+        is_right_edge = tf.equal(b, c)
 
-                    # compute output:
-                    output = tf.exp(-0.5 * tf.square((inputs[:, i] - mean) / (std + 1e-6)))
-                    fuzzified_values.append(output)
-
-                # if smoothed triangular:
-                if self.mf_type == 'Smoothed Triangular':
-                    # define parameters
-                    a = input_mf_params[j, 0]   # a parameter
-                    b = input_mf_params[j, 1]   # b parameter
-                    c = input_mf_params[j, 2]   # c parameter
-
-                    # smoothing factor beta:
-                    beta = 100.0
+        # compute softplus-based smoothed triangular membership function:
+        left = tf.nn.softplus(beta * (x - a)) / (tf.nn.softplus(beta * (b - a)) + 1e-6)
+        right = tf.nn.softplus(beta * (c - x)) / (tf.nn.softplus(beta * (c - b)) + 1e-6)
 
-                    # check if we are on the edges:
-                    is_left_edge = tf.equal(a, b)
-                    is_right_edge = tf.equal(b, c)
+        # deal with edge case:
+        left = tf.where((x == a) & is_left_edge, 1.0, left)
+        right = tf.where((x == c) & is_right_edge, 1.0, right)
 
-                    # compute softplus-based smoothed triangular membership function:
-                    left = tf.nn.softplus(beta * (inputs[:, i] - a)) / (tf.nn.softplus(beta * (b - a)) + 1e-6)
-                    right = tf.nn.softplus(beta * (c - inputs[:, i])) / (tf.nn.softplus(beta * (c - b)) + 1e-6)
+        # compute output:
+        return tf.maximum(0.0, tf.minimum(left, right))
 
-                    # deal with edge case:
-                    left = tf.where((inputs[:, i] == a) & is_left_edge, 1.0, left)
-                    right = tf.where((inputs[:, i] == c) & is_right_edge, 1.0, right)
+    # generalized bell membership function:
+    def generalized_bell(self, x, params):
+        # define parameters, each of shape (num_inputs, num_mfs):
+        a = params[:, :, 0]
+        b = params[:, :, 1]
+        c = params[:, :, 2]
 
-                    # compute output:
-                    output = tf.maximum(0.0, tf.minimum(left, right))
-                    fuzzified_values.append(output)
+        # clamp b:
+        b = tf.clip_by_value(b, 1e-6, 5.0)
 
-                # if generalized bell:
-                if self.mf_type == 'Generalized Bell':
-                    # define parameters
-                    a = input_mf_params[j, 0]
-                    b = input_mf_params[j, 1]
-                    c = input_mf_params[j, 2]
+        # compute output:
+        return 1 / (1 + tf.abs((x - c) / (a + 1e-6)) ** (2 * b))
 
-                    # clamp b:
-                    b = tf.clip_by_value(b, 1e-6, 5.0)
+    # function call:
+    def call(self, inputs):
+        # expand the inputs to (batch_size, num_inputs, 1), such that every input is evaluated against all
+        # of its membership functions, of shape (num_inputs, num_mfs), in a single broadcast:
+        x = tf.expand_dims(inputs, axis = -1)
 
-                    # compute output:
-                    output = 1 / (1 + tf.abs((inputs[:, i] - c) / (a + 1e-6)) ** (2 * b))
-                    fuzzified_values.append(output)
-            
-            # need to now stack the mf values for that given input:
-            membership_values.append(tf.stack(fuzzified_values, axis = -1))
-
-        # stack everything and return:
-        return tf.stack(membership_values, axis = 1)
+        # returns the membership values, of shape (batch_size, num_inputs, num_mfs):
+        return self.mf_function(x, self.mf_params)
     
 # second layer -> firing strength layer:
 class FS_Layer(Layer):
@@ -236,6 +227,10 @@ class FS_Layer(Layer):
         self.num_mfs = num_mfs
         self.num_rules = num_mfs ** num_inputs
 
+        # generate all the rule combinations once, as the index of the mf used by each input in each rule:
+        rules = list(product(range(self.num_mfs), repeat = self.num_inputs))    # example [(0, 0, 0), (0, 0, 1), ...]
+        self.rule_index = np.array(rules, dtype = np.int32)                     # shape: (num_rules, num_inputs)
+
     # call function:
     def call(self, membership_values):
         # this layer accepts the membership values, which have shape (batch_size, num_inputs, num_mfs):
@@ -244,28 +239,12 @@ class FS_Layer(Layer):
         # initialize the firing strengths:
         firing_strengths = tf.ones((batch_size, self.num_rules), dtype = tf.float32)
 
-        # generate all the rule combinations:
-        rules = list(product(range(self.num_mfs), repeat = self.num_inputs))    # example [(0, 0, 0), (0, 0, 1), ...]
-
-        # need to check each input, each mf combination, and multiply their values together:
-        for rule_index, combination in enumerate(rules):
-            # print(f'combination: {combination}')
-            rule_strength = tf.ones((batch_size, ), dtype = tf.float32)
-
-            # for every input and membership function:
-            for input_index, mf_index in enumerate(combination):
-                # print(f'input: {input_index + 1} | mf: {mf_index + 1}')
-
-                # correctly extract the fuzzified values based on the combination index:
-                rule_strength *= membership_values[:, input_index, mf_index] + 1e-6
-            
-            # update the firing strengths:
-            rule_strength = tf.expand_dims(rule_strength, axis = -1)  # shape: (batch_size, 1)
-            firing_strengths = tf.concat(
-                [firing_strengths[:, :rule_index], rule_strength, firing_strengths[:, rule_index + 1:]],
-                axis = 1,
-            )
-            # print(f'firing strength: {firing_strengths}')
+        # the firing strength of every rule is the product of its membership values, so for every input
+        # gather the membership value used by each rule, giving shape (batch_size, num_rules), and multiply
+        # them in, in the same order as the rule combinations:
+        for input_index in range(self.num_inputs):
+            rule_memberships = tf.gather(membership_values[:, input_index, :], self.rule_index[:, input_index], axis = 1)
+            firing_strengths *= rule_memberships + 1e-6
 
         return firing_strengths
     
@@ -0,0 +1,101 @@
+"""
+This file hosts the export of a trained ANFIS model into a single fused forward
+function, for use when the ANFIS model is deployed.
+
+The Keras model chains the MF, FS, NM, CN and O layers, each of which
+materializes its own intermediate tensors, with the consequent layer building a
+(batch_size, num_rules, num_inputs + 1) product. Instead, the trained antecedent
+and consequent parameters are read from the saved .h5 file, and the forward pass
+is rebuilt as a single tf.function, where the first-order Sugeno weighted sum is
+computed as one matmul of the normalized firing strengths with the consequent
+parameters. The largest intermediate is then the (batch_size, num_rules)
+firing strengths.
+
+"""
+#################################### Import Packages: ####################################
+
+import numpy as np
+import tensorflow as tf
+from itertools import product
+from ANFIS_Runtime import read_anfis_weights, read_scaler
+
+#################################### Define Functions: ###################################
+
+# build the fused forward pass from the trained parameters:
+def build_fused_forward(weights, scaler = None):
+    # unpack the parameters:
+    num_inputs = weights['num_inputs']
+    num_mfs = weights['num_mfs']
+    mf_type = weights['mf_type']
+    antecedents = tf.constant(weights['antecedents'])
+    consequents = tf.constant(weights['consequents'])
+
+    # the index of the mf used by each input in each rule, in the same order as the FS_Layer:
+    rule_index = np.array(list(product(range(num_mfs), repeat = num_inputs)), dtype = np.int32)
+
+    # fold a standard scaler into the function, such that it accepts raw inputs:
+    if scaler is not None:
+        mean = tf.constant(np.asarray(scaler.mean_, dtype = np.float32))
+        scale = tf.constant(np.asarray(scaler.scale_, dtype = np.float32))
+
+    # membership functions, evaluated on inputs of shape (batch_size, num_inputs, 1):
+    if mf_type == 'Gaussian':
+        def membership(x):
+            mean_mf, std = antecedents[:, :, 0], antecedents[:, :, 1]
+            return tf.exp(-0.5 * tf.square((x - mean_mf) / (std + 1e-6)))
+    elif mf_type == 'Smoothed Triangular':
+        def membership(x):
+            a, b, c = antecedents[:, :, 0], antecedents[:, :, 1], antecedents[:, :, 2]
+            beta = 100.0
+            left = tf.nn.softplus(beta * (x - a)) / (tf.nn.softplus(beta * (b - a)) + 1e-6)
+            right = tf.nn.softplus(beta * (c - x)) / (tf.nn.softplus(beta * (c - b)) + 1e-6)
+            left = tf.where((x == a) & tf.equal(a, b), 1.0, left)
+            right = tf.where((x == c) & tf.equal(b, c), 1.0, right)
+            return tf.maximum(0.0, tf.minimum(left, right))
+    elif mf_type == 'Generalized Bell':
+        def membership(x):
+            a, b, c = antecedents[:, :, 0], antecedents[:, :, 1], antecedents[:, :, 2]
+            b = tf.clip_by_value(b, 1e-6, 5.0)
+            return 1 / (1 + tf.abs((x - c) / (a + 1e-6)) ** (2 * b))
+    else:
+        raise ValueError(f'Unrecognized MF type: {mf_type}')
+
+    # fused forward pass:
+    @tf.function(input_signature = [tf.TensorSpec(shape = (None, num_inputs), dtype = tf.float32)])
+    def forward(inputs):
+        if scaler is not None:
+            inputs = (inputs - mean) / scale
+
+        # membership values, of shape (batch_size, num_inputs, num_mfs):
+        membership_values = membership(tf.expand_dims(inputs, axis = -1))
+
+        # firing strengths, of shape (batch_size, num_rules):
+        firing_strengths = tf.ones((tf.shape(inputs)[0], rule_index.shape[0]), dtype = tf.float32)
+        for input_index in range(num_inputs):
+            firing_strengths *= tf.gather(membership_values[:, input_index, :], rule_index[:, input_index], axis = 1) + 1e-6
+
+        # normalized firing strengths:
+        normalized_strengths = firing_strengths / (tf.reduce_sum(firing_strengths, axis = 1, keepdims = True) + 1e-10)
+
+        # the output is sum_k w_bar_k * (x_1 * p_k + ... + s_k), which is computed as one matmul of the
+        # normalized strengths with the consequent parameters, giving (batch_size, num_inputs + 1),
+        # followed by a dot product with the inputs and bias:
+        inputs_with_bias = tf.concat([inputs, tf.ones((tf.shape(inputs)[0], 1), dtype = tf.float32)], axis = -1)
+        return tf.reduce_sum(tf.matmul(normalized_strengths, consequents) * inputs_with_bias, axis = 1, keepdims = True)
+
+    return forward
+
+# export a trained ANFIS model as a fused forward function:
+def export_fused_anfis(model_path, scaler_path = None, export_path = None):
+    # this function returns the fused forward function, which accepts raw inputs of shape (batch_size, num_inputs)
+    # if a scaler is given, and can also save it as a SavedModel for serving:
+    scaler = read_scaler(scaler_path) if scaler_path is not None else None
+    forward = build_fused_forward(read_anfis_weights(model_path), scaler)
+
+    # save the function as a SavedModel:
+    if export_path is not None:
+        module = tf.Module()
+        module.forward = forward
+        tf.saved_model.save(module, export_path, signatures = {'serving_default': forward})
+
+    return forward
@@ -0,0 +1,168 @@
+"""
+This file hosts a lightweight runtime for a trained ANFIS model, which does the
+full forward pass in NumPy.
+
+Loading the Keras model imports TensorFlow and Keras, rebuilds the custom layers
+and needs a warm-up prediction, which takes seconds. Instead, the runtime reads
+the membership function and consequent parameters straight from the saved .h5
+file with h5py, and the mean and scale of the StandardScaler from its pickle
+without importing scikit-learn, such that it starts in milliseconds.
+
+It is meant to be imported when the ANFIS model is deployed.
+
+"""
+#################################### Import Packages: ####################################
+
+import json
+import pickle
+import h5py
+import numpy as np
+from itertools import product
+
+#################################### Define  Classes: ####################################
+
+# holds the fitted state of a pickled StandardScaler:
+class ScalerState:
+    # the pickle restores the fitted attributes, e.g. mean_ and scale_, through this:
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+# unpickler that reads a StandardScaler without importing scikit-learn:
+class ScalerUnpickler(pickle.Unpickler):
+    # map the scaler class onto the state holder, and allow numpy to rebuild the arrays:
+    def find_class(self, module, name):
+        if module.startswith('sklearn.') and name == 'StandardScaler':
+            return ScalerState
+        if module == 'numpy' or module.startswith('numpy.'):
+            return super().find_class(module, name)
+        raise pickle.UnpicklingError(f'Unexpected object in scaler pickle: {module}.{name}')
+
+# numpy runtime for a trained ANFIS model:
+class ANFISRuntime:
+    # constructor:
+    def __init__(self, weights, mean = None, scale = None):
+        self.num_inputs = weights['num_inputs']
+        self.num_mfs = weights['num_mfs']
+        self.mf_type = weights['mf_type']
+        self.antecedents = weights['antecedents']       # shape: (num_inputs, num_mfs, num_antecedents)
+        self.consequents = weights['consequents']       # shape: (num_rules, num_inputs + 1)
+        self.mean = mean                                # mean of the standard scaler
+        self.scale = scale                              # scale of the standard scaler
+
+        # the index of the mf used by each input in each rule, in the same order as the FS_Layer:
+        self.rule_index = np.array(list(product(range(self.num_mfs), repeat = self.num_inputs)), dtype = np.int64)
+
+        # select the membership function once:
+        if self.mf_type == 'Gaussian':
+            self.membership = self.gaussian
+        elif self.mf_type == 'Smoothed Triangular':
+            self.membership = self.smoothed_triangular
+        elif self.mf_type == 'Generalized Bell':
+            self.membership = self.generalized_bell
+        else:
+            raise ValueError(f'Unrecognized MF type: {self.mf_type}')
+
+    # load the runtime from the saved model and scaler:
+    @classmethod
+    def load(cls, model_path, scaler_path = None):
+        weights = read_anfis_weights(model_path)
+
+        # read the scaler, if the model was trained on scaled inputs:
+        mean, scale = None, None
+        if scaler_path is not None:
+            scaler = read_scaler(scaler_path)
+            mean = np.asarray(scaler.mean_, dtype = np.float32)
+            scale = np.asarray(scaler.scale_, dtype = np.float32)
+
+        return cls(weights, mean, scale)
+
+    # gaussian membership function:
+    def gaussian(self, x):
+        mean = self.antecedents[:, :, 0]
+        std = self.antecedents[:, :, 1]
+        return np.exp(-0.5 * np.square((x - mean) / (std + np.float32(1e-6))))
+
+    # smoothed triangular membership function:
+    def smoothed_triangular(self, x):
+        a = self.antecedents[:, :, 0]
+        b = self.antecedents[:, :, 1]
+        c = self.antecedents[:, :, 2]
+        beta = np.float32(100.0)
+
+        # softplus, computed in a numerically stable manner:
+        softplus = lambda z: np.logaddexp(np.float32(0.0), z)
+
+        # compute softplus-based smoothed triangular membership function:
+        left = softplus(beta * (x - a)) / (softplus(beta * (b - a)) + np.float32(1e-6))
+        right = softplus(beta * (c - x)) / (softplus(beta * (c - b)) + np.float32(1e-6))
+
+        # deal with edge case:
+        left = np.where((x == a) & (a == b), np.float32(1.0), left)
+        right = np.where((x == c) & (b == c), np.float32(1.0), right)
+
+        return np.maximum(np.float32(0.0), np.minimum(left, right))
+
+    # generalized bell membership function:
+    def generalized_bell(self, x):
+        a = self.antecedents[:, :, 0]
+        b = np.clip(self.antecedents[:, :, 1], np.float32(1e-6), np.float32(5.0))
+        c = self.antecedents[:, :, 2]
+        return 1 / (1 + np.abs((x - c) / (a + np.float32(1e-6))) ** (2 * b))
+
+    # predict a batch of samples:
+    def predict(self, inputs):
+        # this function accepts raw inputs of shape (batch_size, num_inputs), such as:
+        # [[Load History, Distance to Task, Total Distance Travelled], ...]
+        inputs = np.atleast_2d(np.asarray(inputs, dtype = np.float32))
+        if self.mean is not None:
+            inputs = (inputs - self.mean) / self.scale
+
+        # membership values, of shape (batch_size, num_inputs, num_mfs):
+        membership_values = self.membership(inputs[:, :, None])
+
+        # firing strengths, of shape (batch_size, num_rules):
+        firing_strengths = np.ones((inputs.shape[0], self.rule_index.shape[0]), dtype = np.float32)
+        for input_index in range(self.num_inputs):
+            firing_strengths *= membership_values[:, input_index, self.rule_index[:, input_index]] + np.float32(1e-6)
+
+        # normalized firing strengths:
+        normalized_strengths = firing_strengths / (firing_strengths.sum(axis = 1, keepdims = True) + np.float32(1e-10))
+
+        # first-order sugeno weighted sum, as one matmul with the consequent parameters:
+        inputs_with_bias = np.concatenate([inputs, np.ones((inputs.shape[0], 1), dtype = np.float32)], axis = 1)
+        return np.sum((normalized_strengths @ self.consequents) * inputs_with_bias, axis = 1)
+
+#################################### Define Functions: ###################################
+
+# read the trained parameters of an ANFIS model from its .h5 file:
+def read_anfis_weights(model_path):
+    # this function returns a dictionary of the number of inputs, number of mfs, mf type, and the
+    # antecedent and consequent parameters, without needing to rebuild the model:
+    with h5py.File(model_path, 'r') as f:
+        # get the settings of the membership layer from the model config:
+        config = json.loads(f.attrs['model_config'])
+        mf_config = next(layer['config'] for layer in config['config']['layers'] if layer['class_name'] == 'MF_Layer')
+
+        # find the parameters, which are stored as e.g. mf__layer/mf__layer/Antecedent_Params:
+        params = {}
+        def find_params(name, obj):
+            if isinstance(obj, h5py.Dataset) and name.split('/')[-1] in ('Antecedent_Params', 'Consequent_Params'):
+                params[name.split('/')[-1]] = obj[()]
+        f['model_weights'].visititems(find_params)
+
+    # make sure that both sets of parameters were found:
+    if 'Antecedent_Params' not in params or 'Consequent_Params' not in params:
+        raise ValueError(f'Could not find the antecedent and consequent parameters in {model_path}')
+
+    return {
+        'num_inputs'    : mf_config['num_inputs'],
+        'num_mfs'       : mf_config['num_mfs'],
+        'mf_type'       : mf_config['mf_type'],
+        'antecedents'   : params['Antecedent_Params'].astype(np.float32),   # shape: (num_inputs, num_mfs, num_antecedents)
+        'consequents'   : params['Consequent_Params'].astype(np.float32),   # shape: (num_rules, num_inputs + 1)
+    }
+
+# read a pickled StandardScaler:
+def read_scaler(scaler_path):
+    with open(scaler_path, 'rb') as f:
+        return ScalerUnpickler(f).load()
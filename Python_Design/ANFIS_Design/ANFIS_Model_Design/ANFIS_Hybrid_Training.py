@@ -0,0 +1,151 @@
+"""
+This file hosts the hybrid learning rule for training the ANFIS model.
+
+The output of a first-order Sugeno ANFIS is linear in the consequent parameters
+once the firing strengths are known, so they do not need to be found by gradient
+descent. Instead, each epoch follows the hybrid learning rule of Jang:
+    - forward pass: the normalized firing strengths are computed for the training
+      set, and the consequent parameters are solved by least squares
+    - backward pass: the consequents are held fixed, and only the membership
+      function parameters are updated by gradient descent
+
+It works on a model built by BuildAnfis(), finding its MF, NM and CN layers by
+their class names, so it can be used with the layers that are defined within
+the notebooks or imported from ANFIS_Custom_Layers.py.
+
+"""
+#################################### Import Packages: ####################################
+
+import time
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras import Model
+from tensorflow.keras.optimizers import Adam
+
+#################################### Define Functions: ###################################
+
+# find a layer of the model by its class name:
+def get_layer_by_class(model, class_name):
+    for layer in model.layers:
+        if type(layer).__name__ == class_name:
+            return layer
+    raise ValueError(f'Model does not contain a {class_name}')
+
+# solve the consequent parameters by least squares:
+def solve_consequents(strengths_model, x, y, num_rules, batch_size = 1024, ridge = 1e-6):
+    # the output is sum_k w_bar_k * (x_1 * p_k + ... + s_k), which is linear in the consequents, so each sample
+    # gives a row of the design matrix, w_bar_k * [x, 1] for every rule k, of size num_rules * (num_inputs + 1).
+    # the normal equations are accumulated over batches, such that the full design matrix is never built:
+    num_params = num_rules * (x.shape[1] + 1)
+    ata = np.zeros((num_params, num_params))
+    aty = np.zeros(num_params)
+
+    for start in range(0, len(x), batch_size):
+        x_batch = x[start:start + batch_size]
+        y_batch = y[start:start + batch_size]
+
+        # normalized firing strengths, of shape (batch_size, num_rules):
+        normalized_strengths = strengths_model(x_batch, training = False).numpy().astype(np.float64)
+
+        # rows of the design matrix, of shape (batch_size, num_rules * (num_inputs + 1)):
+        inputs_with_bias = np.concatenate([x_batch, np.ones((len(x_batch), 1))], axis = 1)
+        a = (normalized_strengths[:, :, None] * inputs_with_bias[:, None, :]).reshape(len(x_batch), -1)
+
+        ata += a.T @ a
+        aty += a.T @ y_batch
+
+    # solve, with a small ridge term in case some rules are never fired:
+    ata[np.diag_indices_from(ata)] += ridge
+    return np.linalg.solve(ata, aty).reshape(num_rules, -1)
+
+# train the model with the hybrid learning rule:
+def hybrid_fit(model, x_train, y_train, x_val, y_val, epochs = 50, batch_size = 128, rate = 0.001, target_mse = None, patience = 10, verbose = True):
+    # this function returns a history dictionary of the training and validation mse and the elapsed time at the
+    # end of each epoch, along with the time taken to first reach a validation mse of target_mse, if given:
+    x_train = np.asarray(x_train, dtype = np.float32)
+    y_train = np.asarray(y_train, dtype = np.float32).reshape(-1)
+    x_val = np.asarray(x_val, dtype = np.float32)
+    y_val = np.asarray(y_val, dtype = np.float32).reshape(-1)
+
+    # find the layers that are trained:
+    mf_layer = get_layer_by_class(model, 'MF_Layer')
+    nm_layer = get_layer_by_class(model, 'NM_Layer')
+    cn_layer = get_layer_by_class(model, 'CN_Layer')
+    num_rules = cn_layer.num_rules
+
+    # sub-model that outputs the normalized firing strengths:
+    strengths_model = Model(inputs = model.inputs, outputs = nm_layer.output)
+
+    # only the membership function parameters are trained by gradient:
+    optimizer = Adam(learning_rate = rate)
+    mf_params = mf_layer.mf_params
+
+    @tf.function
+    def train_step(x_batch, y_batch):
+        with tf.GradientTape() as tape:
+            y_pred = tf.reshape(model(x_batch, training = True), [-1])
+            loss = tf.reduce_mean(tf.square(y_pred - y_batch))
+        gradients = tape.gradient(loss, [mf_params])
+        optimizer.apply_gradients(zip(gradients, [mf_params]))
+
+        # apply the constraint on the parameters, if any:
+        if mf_params.constraint is not None:
+            mf_params.assign(mf_params.constraint(mf_params))
+        return loss
+
+    # mean squared error over a full set:
+    def evaluate(x, y):
+        y_pred = np.concatenate([model(x[i:i + 1024], training = False).numpy().reshape(-1) for i in range(0, len(x), 1024)])
+        return float(np.mean(np.square(y_pred - y)))
+
+    history = {'loss': [], 'val_loss': [], 'time': []}
+    time_to_target = None
+    best_val_loss = np.inf
+    best_weights = None
+    wait = 0
+    rng = np.random.default_rng(0)
+    train_start = time.time()
+
+    for epoch in range(epochs):
+        # forward pass, solve the consequents with the membership functions fixed:
+        cn_layer.consequent_params.assign(solve_consequents(strengths_model, x_train, y_train, num_rules).astype(np.float32))
+
+        # backward pass, update the membership functions with the consequents fixed:
+        order = rng.permutation(len(x_train))
+        for start in range(0, len(x_train), batch_size):
+            index = order[start:start + batch_size]
+            train_step(tf.constant(x_train[index]), tf.constant(y_train[index]))
+
+        # the consequents are re-solved for the updated membership functions before evaluating:
+        cn_layer.consequent_params.assign(solve_consequents(strengths_model, x_train, y_train, num_rules).astype(np.float32))
+
+        # evaluate:
+        loss = evaluate(x_train, y_train)
+        val_loss = evaluate(x_val, y_val)
+        elapsed = time.time() - train_start
+        history['loss'].append(loss)
+        history['val_loss'].append(val_loss)
+        history['time'].append(elapsed)
+
+        if verbose:
+            print(f'Epoch {epoch + 1}/{epochs} - {round(elapsed, 1)}s - loss: {loss:.4f} - val_loss: {val_loss:.4f}')
+
+        # record the time taken to reach the target mse:
+        if target_mse is not None and time_to_target is None and val_loss <= target_mse:
+            time_to_target = elapsed
+
+        # early stopping, restoring the best weights:
+        if val_loss < best_val_loss:
+            best_val_loss = val_loss
+            best_weights = model.get_weights()
+            wait = 0
+        else:
+            wait += 1
+            if wait >= patience:
+                break
+
+    # restore the best weights, if any epoch gave a valid loss:
+    if best_weights is not None:
+        model.set_weights(best_weights)
+
+    return history, time_to_target
@@ -8,6 +8,24 @@ agents within a fictitious environment
 
 THIS FILE RUNS NUMEROUS SIMULATIONS
 
+Each simulation is independent given its own random seed, so the simulations
+are fanned out across a pool of worker processes. Every worker loads the map
+and creates the rulebase once, and simulation i is always seeded with
+seed + i, such that the results are identical to a serial run (workers = 1)
+with the same seed.
+
+The distance from each robot to the task is found with the path planners of
+the V3 tests, chosen by params['planner'] in the same manner as within
+PythonFISV3Implementation.py, and the number of nodes expanded by the planner
+is summed over every simulation, such that the planners can be compared over
+a full batch of simulations.
+
+Tasks and robots are placed at a fixed list of candidate locations for each map,
+so with the field planner, the distance fields to every location are precomputed
+once and cached on disk by location_distances(). Every worker loads them, and
+each robot then looks up its distance to the task from the field of the task, so
+the simulations do no path search at all.
+
 """
 ######################## Import Packages ########################
 
@@ -19,11 +37,16 @@ import sys
 import random
 import math as m
 import heapq
-from PythonFISFunction2 import *
+from PythonFISFunctionV2 import *
 import pandas as pd
 import tkinter as tk
 import statistics
 import time
+from concurrent.futures import ProcessPoolExecutor
+
+# the path planners are shared with the V3 tests:
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "FIS_TestV3"))
+from PythonFISV3PathPlanning import plan, node_expansions, distance_field, start_distances, location_distances
 
 ################# Function & Class Definition ###################
 
@@ -64,12 +87,11 @@ class Robot:
                 f"Travelled Distance: {self.travel}\n"
                 f"Suitability: {self.suitability}")
 
-def read_map(map_str, resolution):
+def read_map(map_str, resolution, buffer):
 
-    # get cwd, list all directories and append to the file path of the maps
+    # get cwd and append to the file path of the maps
     current_dir = os.getcwd()
-    files_in_dir = os.listdir(current_dir)
-    file_path = os.path.join(current_dir, files_in_dir[files_in_dir.index('python_stuff')], "maps", str(map_str))
+    file_path = os.path.join(current_dir, "Python_Design", "FIS_Design", "maps", str(map_str))
 
     # check if that map exists, read image if it does
     if not os.path.isfile(file_path):
@@ -83,70 +105,6 @@ def read_map(map_str, resolution):
 
     return image_rgb, buffered_image
 
-def dijkstra(image, start, goal):
-
-    # first need to get the dimensionality of the image:
-    rows, cols = image.shape
-
-    # swap the (x, y) input to (y, x) format for internal use - cv2 has y,x notation
-    start = (start[1], start[0])  # swap (x, y) -> (y, x)
-    goal = (goal[1], goal[0])     # swap (x, y) -> (y, x)
-
-    # need to initialize both the distance map and the previous node map:
-    dist = np.full((rows,cols), np.inf)  # set other distances to a very big number
-    dist[start] = 0                      # set the initial starting distance to 0
-
-    # need to track the parent of each node such that the resulting path can be reconstructed:
-    parent = {start: None}
-
-    # start the priority queue to store the distance values in x and y:
-    pq = [(0, start)]
-
-    # encode the directions that the robot can move, assuming 8 options of movement at each given
-    # node, 45 degree offsets (holonomic movement):
-    directions = [
-        (-1,0), (1,0), (0,-1), (0,1),    # left, right, down, up
-        (-1,-1), (-1,1), (1,-1), (1,1)   # diagonals
-    ]
-
-    # define a set for the visited node:
-    visited = set()
-
-    while pq:
-        current_dist, (x, y) = heapq.heappop(pq)
-        
-        # if the node has already been visited, skip it
-        if (x, y) in visited:
-            continue
-        visited.add((x, y))
-        
-        # if we reached the goal, reconstruct the path:
-        if (x, y) == goal:
-            path = []
-            while (x,y) != start:
-                path.append((y,x))
-                x,y = parent[(x,y)]
-            path.append((start[1],start[0]))
-            return path[::-1], dist[goal] # reverse path 
-        
-    # explore neighbors
-        for dx, dy in directions:
-            nx, ny = x + dx, y + dy
-            if 0 <= nx < rows and 0 <= ny < cols and (nx, ny) not in visited:
-                # ignore black borders
-                if image[nx, ny] >= 254:  # threshold for white space
-                    # calculate the movement cost
-                    movement_cost = m.sqrt(2) if dx != 0 and dy != 0 else 1
-                    new_dist = current_dist + movement_cost
-                    
-                    # if a shorter path is found, update the distance and push to pq
-                    if new_dist < dist[nx, ny]:
-                        dist[nx, ny] = new_dist
-                        parent[(nx,ny)] = (x,y)
-                        heapq.heappush(pq, (new_dist, (nx, ny)))
-    
-    return None, None # if goal unreachable
-
 def add_buffer(image, buffer_size):
 
     # create a binary mask where black (0) and gray (205) areas are marked
@@ -173,8 +131,7 @@ def generate_image(width, height):
     blank_image = np.ones((height, width, 3), dtype=np.uint8) * 205
 
     # specify path:
-    files_in_dir = os.listdir(os.getcwd())
-    file_path = os.path.join(os.getcwd(), files_in_dir[files_in_dir.index('python_stuff')], "maps")
+    file_path = os.path.join(os.getcwd(), "Python_Design", "FIS_Design", "maps")
 
     # write the image to variable that will return a flag for true or false
     a = cv2.imwrite(os.path.join(file_path, 'blank_image.png'), blank_image)
@@ -185,7 +142,7 @@ def generate_image(width, height):
     else:
         print('Image saving failed')
 
-def draw_circles_on_image(image):
+def draw_circles_on_image(image, robots, current_task):
 
     # for every robot:
     for robot in robots.values(): 
@@ -200,7 +157,7 @@ def draw_circles_on_image(image):
 
     return image
 
-def initialize_plot():
+def initialize_plot(robots):
     
     # start a tkinter window
     root = tk.Tk()
@@ -231,48 +188,11 @@ def initialize_plot():
         plt.scatter(0,0, color = (robot.colour[0]/255, robot.colour[1]/255, robot.colour[2]/255), label = robot.id)  
     plt.legend()
 
-#################             Main             ###################
-
-# simulation parameters:
-resolution = 0.05               # resolution of the map, slam_toolbox default
-map_str = "warehouse_map.png"   # string value of the map name
-visualize = False               # whether to view or not
-buffer = 5                      # distance in pixels that obstacles should be avoided
-
-nr = 4                      # number of robots in the MRS
-x = 2                       # number of camera equipped robots within the MRS
-y = nr - x                  # number of measurement equipped robots within the MRS
-task_num = 10               # number of task sites
-sim_length = 250            # number of times to simulate allocation
-robots = {}                 # empty dictionary to hold robot objects once created
+def get_locations(map_str):
 
-bid = np.zeros((nr,3), dtype = object)      # empty array to store robot bids
-cumulative_distance = 0                     # cumulative weighted travel distance amongst all robots, initialized
-
-loads = []              # initialize empty list of loads
-total_travel = []       # initialize empty list of total distance travelled per robot
-
-# create empty pandas dataframes:
-
-inputs = pd.DataFrame()     # empty data frame for input 
-outputs = pd.DataFrame()    # empty data frame for output
-
-# create fuzzy inference rulebase:
-rulebase = fis_create()
-
-# initialize map:
-image_rgb, buffered_image = read_map(map_str, resolution)
-
-begin = time.time()
-
-for i in range(0,sim_length):
-    nr = 4                      # number of robots in the MRS
-    x = 2                       # number of camera equipped robots within the MRS
-    y = nr - x                  # number of measurement equipped robots within the MRS
-
-    # determine task and robot sites: 
+    # determine the candidate task and robot sites of the map:
     match map_str:
-    # for the warehouse case:
+        # for the warehouse case:
         case "warehouse_map.png":
             locations = [(64,63), (64,157), (64,231), (63,300), (175, 65), (172,123), 
                 (171,188), (180,262), (182,330), (288,74), (221,120), (238,192),
@@ -280,11 +200,8 @@ for i in range(0,sim_length):
                 (285,265), (425,98), (422,150), (417,226), (428,266), (490,304),
                 (539,332), (559,290), (591,327),(558,259), (633,333), (481,115),
                 (544,115), (604,115), (487,179), (547,179), (603,179), (600,67)]
-            random.shuffle(locations)   # shuffle the locations list so that each time the simulation is ran the robots and tasks are in different locations
-            tasks = locations[0:task_num]
-            positions = locations[task_num::]
 
-    # for the lab case:    
+        # for the lab case:    
         case "edited_map.png":
             locations = [(36,297), (29,276), (59,300), (73,293), (82,266), (121,278),
                         (106,287), (46,229), (83,232), (102,204), (80,183), (50,174),
@@ -292,9 +209,42 @@ for i in range(0,sim_length):
                         (76,26), (121,20), (145,23), (185,23), (213,29), (217,66),
                         (183,68), (153,66), (219,86), (235,74), (257,96), (284,80),
                         (63,90), (187,63), (159,11), (71,214), (75,143), (49,294)]
-            random.shuffle(locations)   # shuffle the locations list so that each time the simulation is ran the robots and tasks are in different locations
-            tasks = locations[0:task_num]
-            positions = locations[task_num::]  
+
+    return locations
+
+def simulate(seed, params, rulebase, image_rgb, buffered_image):
+
+    """
+    Runs a single simulation of task_num allocations, with every random draw made
+    from the given seed, and returns:
+        - the final load history of each robot
+        - the final total distance travelled by each robot
+        - the FIS inputs and outputs of every robot at every allocation
+        - the number of nodes expanded by the planner
+
+    """
+
+    # seed the simulation, such that it is the same regardless of the process it runs in:
+    random.seed(seed)
+
+    nr = params['nr']               # number of robots in the MRS
+    x = params['x']                 # number of camera equipped robots within the MRS
+    task_num = params['task_num']   # number of task sites
+    visualize = params['visualize']
+    resolution = params['resolution']
+    planner = params['planner']     # path planner to use, see plan()
+    expanded = node_expansions[planner]
+
+    bid = np.zeros((nr,3), dtype = object)      # empty array to store robot bids
+    robots = {}                                 # empty dictionary to hold robot objects once created
+    input_data = []                             # FIS inputs of every robot at every allocation
+    output_data = []                            # FIS outputs of every robot at every allocation
+
+    # shuffle the locations list so that each time the simulation is ran the robots and tasks are in different locations
+    locations = get_locations(params['map_str'])
+    random.shuffle(locations)
+    tasks = locations[0:task_num]
+    positions = locations[task_num::]
   
     # spawn robots based on the user defined mission parameters:
     for num in range(1, nr+1):
@@ -315,28 +265,39 @@ for i in range(0,sim_length):
                 position = positions[num-1],
             )
 
+    if visualize == True:
+        initialize_plot(robots)
+
     for current_task in tasks:
 
         # draw the markers for the initial positions of everything
-        combined_image = draw_circles_on_image(image_rgb.copy())
         if visualize == True:
+            combined_image = draw_circles_on_image(image_rgb.copy(), robots, current_task)
             plt.imshow(combined_image)
             plt.draw()
             plt.pause(0.5)
 
+        # with the field planner, look up the distance of every robot from the field to the task at once:
+        if planner == 'field':
+            distances = start_distances(distance_field(buffered_image, current_task), buffered_image, [robot.position for robot in robots.values()])
+
         # query robots and determine suitability:
-        for id, robot in robots.items():
+        for i, (id, robot) in enumerate(robots.items()):
 
             # determine the robots starting position:
             start = robot.position
 
-            # determine the length of the planned path:
-            shortest_path, dist = dijkstra(buffered_image, start, current_task)
+            # determine the length of the planned path, the path itself is only needed to draw it:
+            if planner == 'field':
+                dist = distances[i]
+                shortest_path = plan(buffered_image, start, current_task, planner)[0] if visualize == True else None
+            else:
+                shortest_path, dist = plan(buffered_image, start, current_task, planner)
             
             # add the path if it exists:
-            if shortest_path is not None:
-                for x,y in shortest_path:
-                    combined_image[y,x] = robot.colour
+            if visualize == True and shortest_path is not None:
+                for px, py in shortest_path:
+                    combined_image[py,px] = robot.colour
 
             # update the robots planned travel distance:
             robot.travel = round((dist * resolution),3)
@@ -373,22 +334,14 @@ for i in range(0,sim_length):
                 break
 
         # save the data that was used to make the decision:
-
-        input_data = [
-        {'Load History': robot.load, 'Distance to Task': robot.travel, 'Total Distance Traveled': robot.total}
-        for robot in robots.values()    
-        ]
-
-        input_df = pd.DataFrame(input_data)
-        inputs = pd.concat([inputs, input_df], ignore_index=True)
-
-        output_data = [
+        input_data.extend(
+            {'Load History': robot.load, 'Distance to Task': robot.travel, 'Total Distance Traveled': robot.total}
+            for robot in robots.values()
+        )
+        output_data.extend(
             {'Suitability': robot.suitability}
             for robot in robots.values()
-        ]
-
-        output_df = pd.DataFrame(output_data)
-        outputs = pd.concat([outputs, output_df], ignore_index=True)
+        )
     
         # these robots have been selected, send them to the task site and update:
         for id, robot in robots.items():
@@ -403,40 +356,122 @@ for i in range(0,sim_length):
                 # increment the robots individual total travel distance:
                 robot.total += robot.travel
 
-                # keep track of the total distance that all robots have travelled:
-                cumulative_distance += robot.travel
-
-        # print robot data in terminal:
-        robots_data = [
-        {'Robot ID': robot.id, 'Sensor Type': robot.sensor, 'Load History': robot.load , 'Distance to Task': robot.travel, 'Total Distance Travelled': robot.total,
-        'Suitability': robot.suitability}
-        for robot in robots.values()
-        ]
-
-        df = pd.DataFrame(robots_data)
-
-        # draw after positions have been updated:
-        combined_image = draw_circles_on_image(image_rgb.copy())
+        # print robot data in terminal and draw after positions have been updated:
         if visualize == True:
-            print(df.to_string(index = False, justify = 'center'))
+            robots_data = [
+            {'Robot ID': robot.id, 'Sensor Type': robot.sensor, 'Load History': robot.load , 'Distance to Task': robot.travel, 'Total Distance Travelled': robot.total,
+            'Suitability': robot.suitability}
+            for robot in robots.values()
+            ]
+            print(pd.DataFrame(robots_data).to_string(index = False, justify = 'center'))
+
+            combined_image = draw_circles_on_image(image_rgb.copy(), robots, current_task)
             plt.imshow(combined_image)
             plt.draw()
             plt.pause(1)
 
     # get metrics after simulation:
+    loads = [robot.load for robot in robots.values()]
+    total_travel = [robot.total for robot in robots.values()]
+
+    return loads, total_travel, input_data, output_data, node_expansions[planner] - expanded
+
+# state of each worker process, which is loaded once by init_worker():
+_worker_state = {}
+
+def init_worker(params):
+
+    # load the map and create the fuzzy inference rulebase once per worker:
+    image_rgb, buffered_image = read_map(params['map_str'], params['resolution'], params['buffer'])
+    _worker_state['params'] = params
+    _worker_state['rulebase'] = fis_create()
+    _worker_state['image_rgb'] = image_rgb
+    _worker_state['buffered_image'] = buffered_image
+
+    # load the distance fields to every location, which are computed and cached on the first run for this map and buffer:
+    if params['planner'] == 'field' and params['precompute'] == True:
+        cache_dir = os.path.join(os.getcwd(), "Python_Design", "FIS_Design", "cache")
+        location_distances(buffered_image, get_locations(params['map_str']), params['buffer'], cache_dir)
+
+def simulate_worker(seed):
+
+    # run a simulation with the state of this worker:
+    return simulate(seed, _worker_state['params'], _worker_state['rulebase'], _worker_state['image_rgb'], _worker_state['buffered_image'])
+
+def run_simulations(params, sim_length, seed = 0, workers = None):
+
+    """
+    Runs sim_length simulations, where simulation i is seeded with seed + i, and
+    merges their results in order of simulation, along with the total number of
+    nodes expanded by the planner.
+
+    The simulations are spread across a pool of worker processes, or run in this
+    process if workers = 1. Visualization is only supported when running in this
+    process.
+
+    The results are the same for any number of workers, other than the number of
+    nodes expanded, which depends on the distance fields that each process has
+    already cached from its earlier simulations.
+
+    """
+
+    seeds = [seed + i for i in range(sim_length)]
+    results = []
+
+    if workers == 1 or params['visualize'] == True:
+        init_worker(params)
+        for i, s in enumerate(seeds):
+            results.append(simulate_worker(s))
+            print(f"simulation {i+1}/{sim_length}")
+    else:
+        # build any cached planner data in this process first, such that the workers only load it:
+        init_worker(params)
+        with ProcessPoolExecutor(max_workers = workers, initializer = init_worker, initargs = (params,)) as executor:
+            for i, result in enumerate(executor.map(simulate_worker, seeds)):
+                results.append(result)
+                print(f"simulation {i+1}/{sim_length}")
+
+    # merge the results of every simulation:
+    loads = np.array([result[0] for result in results])
+    total_travel = np.array([result[1] for result in results])
+    inputs = pd.DataFrame([row for result in results for row in result[2]])
+    outputs = pd.DataFrame([row for result in results for row in result[3]])
+    expansions = sum(result[4] for result in results)
+
+    return loads, total_travel, inputs, outputs, expansions
+
+#################             Main             ###################
+
+if __name__ == '__main__':
+
+    # simulation parameters:
+    params = {
+        'resolution': 0.05,             # resolution of the map, slam_toolbox default
+        'map_str': "warehouse_map.png", # string value of the map name
+        'visualize': False,             # whether to view or not, runs the simulations serially
+        'buffer': 5,                    # distance in pixels that obstacles should be avoided
+        'nr': 4,                        # number of robots in the MRS
+        'x': 2,                         # number of camera equipped robots within the MRS
+        'task_num': 10,                 # number of task sites
+        'planner': "field",             # path planner to use, one of "field", "cached", "astar", or "dijkstra"
+        'precompute': True,             # whether to precompute and cache the distance fields to every location, for the field planner
+    }
+
+    sim_length = 250            # number of times to simulate allocation
+    seed = 0                    # seed of the first simulation, simulation i uses seed + i
+    workers = None              # number of worker processes, None uses every CPU and 1 runs serially
+
+    begin = time.time()
 
-    loads.append(df['Load History'].tolist())
-    total_travel.append(df['Total Distance Travelled'].tolist())
-    print(f"simulation {i+1}/{sim_length}")
+    loads, total_travel, inputs, outputs, expansions = run_simulations(params, sim_length, seed, workers)
 
-end = time.time()
+    end = time.time()
 
-inputs.to_csv('inputs.csv', index = False)
-outputs.to_csv('outputs.csv', index = False)
+    inputs.to_csv('inputs.csv', index = False)
+    outputs.to_csv('outputs.csv', index = False)
 
-loads = np.array(loads)
-total_travel = np.array(total_travel)
-print(f"Standard Deviation of Load History: {round(loads.std(),3)}\n"
-      f"Average Total Distance: {round(total_travel.mean(),2)}m\n"
-      f"Standard Deviation of Total Distance: {round(total_travel.std(),3)}m\n"
-      f"Elapsed Time: {round(((end - begin)/60),2)} minutes")
+    print(f"Standard Deviation of Load History: {round(loads.std(),3)}\n"
+          f"Average Total Distance: {round(total_travel.mean(),2)}m\n"
+          f"Standard Deviation of Total Distance: {round(total_travel.std(),3)}m\n"
+          f"Elapsed Time: {round(((end - begin)/60),2)} minutes\n"
+          f"Nodes Expanded by the {params['planner']} Planner: {expansions}")
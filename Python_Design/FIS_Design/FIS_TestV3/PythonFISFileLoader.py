@@ -0,0 +1,262 @@
+"""
+
+This program loads a Fuzzy Inference System (FIS) that was designed within
+MATLAB, using the Fuzzy Logic Designer, directly from its .fis file.
+
+This file serves to parse the MATLAB .fis format, which consists of the
+[System], [Input*], [Output*] and [Rules] sections, and compile it straight into
+the vectorized FIS. This means that MATLAB_FIS_V1/V2/V3.fis can be run by the
+Python engine without transcribing their rulebases into ctrl.Rule lines.
+
+Compiled files are cached against their path and modification time, so an
+edited file is re-parsed. Within a process, switching between rulebase versions
+only parses each file once. If a cache directory is given, the compiled arrays
+are also saved within it, such that later runs load them rather than parsing
+the file again.
+
+"""
+######################## Import Packages ########################
+
+import os
+import re
+import hashlib
+import numpy as np
+from PythonFISVectorized import *
+
+####################### Define Functions ########################
+
+# cache of compiled FIS objects, keyed by file path and holding (mtime, fis):
+_fis_cache = {}
+
+def parse_value(value):
+
+    """
+    Converts a value from a .fis file into a string, number, or list of numbers.
+
+    """
+
+    value = value.strip()
+
+    # quoted strings:
+    if value.startswith("'") and value.endswith("'"):
+        return value[1:-1]
+
+    # arrays, such as [0 0 6]:
+    if value.startswith('[') and value.endswith(']'):
+        return [float(v) for v in value[1:-1].split()]
+
+    return float(value)
+
+def parse_fis(path):
+
+    """
+    Parses a MATLAB .fis file into a dictionary of its sections. Each section is a
+    dictionary of its keys, apart from [Rules], which is a list of rule lines.
+
+    """
+
+    sections = {}
+    section = None
+
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+
+            # skip blank lines and comments:
+            if not line or line.startswith('%'):
+                continue
+
+            # start of a new section:
+            if line.startswith('[') and line.endswith(']'):
+                section = line[1:-1]
+                sections[section] = [] if section == 'Rules' else {}
+                continue
+
+            if section is None:
+                raise ValueError(f'Line outside of a section in {path}: {line}')
+
+            # the rules are kept as lines, everything else is key=value:
+            if section == 'Rules':
+                sections[section].append(line)
+            else:
+                key, value = line.split('=', 1)
+                sections[section][key.strip()] = value.strip()
+
+    return sections
+
+def parse_mf(value):
+
+    """
+    Parses a membership function definition, such as 'Low':'trimf',[0 0 6], into
+    its name, type, and parameters.
+
+    """
+
+    match = re.match(r"'(.*)'\s*:\s*'(.*)'\s*,\s*(\[.*\])", value)
+    if match is None:
+        raise ValueError(f'Unrecognized membership function: {value}')
+
+    name, mf_type, params = match.groups()
+    return name, mf_type, parse_value(params)
+
+def parse_variable(section):
+
+    """
+    Parses an [Input*] or [Output*] section into its name, range, and the trimf
+    parameters of its membership functions.
+
+    """
+
+    name = parse_value(section['Name'])
+    var_range = parse_value(section['Range'])
+    num_mfs = int(parse_value(section['NumMFs']))
+
+    mfs = []
+    for j in range(1, num_mfs + 1):
+        mf_name, mf_type, params = parse_mf(section[f'MF{j}'])
+
+        # only triangular membership functions are used within the designed systems:
+        if mf_type != 'trimf':
+            raise ValueError(f"Unsupported membership function type '{mf_type}' for '{mf_name}' of '{name}'")
+
+        mfs.append(params)
+
+    return name, var_range, mfs
+
+def parse_rule(line, num_inputs):
+
+    """
+    Parses a rule line, such as 1 2 1, 4 (1) : 1, into the membership function
+    index of each input, the output index, the weight, and the connective.
+
+    """
+
+    match = re.match(r'([-\d\s]+),([-\d\s]+)\(([\d.]+)\)\s*:\s*(\d)', line)
+    if match is None:
+        raise ValueError(f'Unrecognized rule: {line}')
+
+    antecedent = [int(v) for v in match.group(1).split()]
+    consequent = [int(v) for v in match.group(2).split()]
+
+    if len(antecedent) != num_inputs or len(consequent) != 1:
+        raise ValueError(f'Rule does not match the number of inputs and outputs: {line}')
+
+    if any(v < 0 for v in antecedent + consequent):
+        raise ValueError(f'Negated terms are not supported: {line}')
+
+    return antecedent, consequent[0], float(match.group(3)), int(match.group(4))
+
+def fis_compile(sections):
+
+    """
+    Compiles the parsed sections of a .fis file into a vectorized FIS.
+
+    The vectorized FIS evaluates Mamdani systems with min AND, max OR, min
+    implication, max aggregation, and centroid defuzzification, so any other
+    settings are rejected rather than silently evaluated differently.
+
+    """
+
+    system = sections['System']
+
+    # check that the system is one that can be evaluated:
+    expected = {'Type': 'mamdani', 'AndMethod': 'min', 'OrMethod': 'max', 'ImpMethod': 'min',
+                'AggMethod': 'max', 'DefuzzMethod': 'centroid'}
+    for key, value in expected.items():
+        if parse_value(system[key]) != value:
+            raise ValueError(f"Unsupported {key} '{parse_value(system[key])}', expected '{value}'")
+
+    num_inputs = int(parse_value(system['NumInputs']))
+    num_outputs = int(parse_value(system['NumOutputs']))
+    if num_outputs != 1:
+        raise ValueError(f'Only systems with a single output are supported, got {num_outputs}')
+
+    # input and output variables:
+    inputs = [parse_variable(sections[f'Input{i}']) for i in range(1, num_inputs + 1)]
+    output_name, output_range, output_mfs = parse_variable(sections['Output1'])
+
+    # rulebase:
+    rules = [parse_rule(line, num_inputs) for line in sections['Rules']]
+    antecedents, consequents, weights, connections = zip(*rules)
+
+    return VectorizedFIS(input_names = [name for name, _, _ in inputs],
+                         input_ranges = [var_range for _, var_range, _ in inputs],
+                         input_mfs = [mfs for _, _, mfs in inputs],
+                         output_name = output_name,
+                         output_range = output_range,
+                         output_mfs = output_mfs,
+                         antecedents = antecedents,
+                         consequents = consequents,
+                         weights = weights,
+                         connections = connections)
+
+def fis_save(fis, path):
+
+    """
+    Saves the arrays of a vectorized FIS as a .npz, such that it can be rebuilt by
+    fis_restore() without parsing its .fis file.
+
+    """
+
+    np.savez(path, input_names = np.array(fis.input_names), input_ranges = fis.input_ranges,
+             input_mfs = fis.input_mfs, num_mfs = fis.num_mfs, output_name = np.array(fis.output_name),
+             output_range = fis.output_range, output_mfs = fis.output_mfs, antecedents = fis.antecedents,
+             consequents = fis.consequents, weights = fis.weights, connections = fis.connections)
+
+def fis_restore(path):
+
+    """
+    Rebuilds a vectorized FIS from the arrays saved by fis_save().
+
+    """
+
+    with np.load(path) as data:
+        return VectorizedFIS(input_names = data['input_names'].tolist(),
+                             input_ranges = data['input_ranges'],
+                             input_mfs = [mfs[:n] for mfs, n in zip(data['input_mfs'], data['num_mfs'])],
+                             output_name = str(data['output_name']),
+                             output_range = data['output_range'],
+                             output_mfs = data['output_mfs'],
+                             antecedents = data['antecedents'],
+                             consequents = data['consequents'],
+                             weights = data['weights'],
+                             connections = data['connections'])
+
+def fis_load(path, cache_dir = None):
+
+    """
+    Loads a MATLAB .fis file as a vectorized FIS, such that:
+        fis = fis_load('MATLAB_FIS_V3.fis')
+        fis.solve(load, distance, total_travel)
+
+    The compiled FIS is cached against the path and modification time of the file,
+    within this process and, if cache_dir is given, on disk within cache_dir.
+
+    """
+
+    path = os.path.abspath(path)
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f'No such FIS file: {path}')
+
+    # return the cached FIS if the file has not changed since it was compiled:
+    mtime = os.path.getmtime(path)
+    if path in _fis_cache and _fis_cache[path][0] == mtime:
+        return _fis_cache[path][1]
+
+    # otherwise load the compiled arrays saved by an earlier run, or compile and save them:
+    cache_path = None
+    if cache_dir is not None:
+        key = hashlib.sha1(f'{path}:{mtime!r}'.encode()).hexdigest()
+        cache_path = os.path.join(cache_dir, f'fis_{os.path.splitext(os.path.basename(path))[0]}_{key[:16]}.npz')
+
+    if cache_path is not None and os.path.isfile(cache_path):
+        fis = fis_restore(cache_path)
+    else:
+        fis = fis_compile(parse_fis(path))
+        if cache_path is not None:
+            os.makedirs(cache_dir, exist_ok = True)
+            fis_save(fis, cache_path)
+
+    _fis_cache[path] = (mtime, fis)
+
+    return fis
@@ -148,3 +148,41 @@ def fis_solve(rulebase, load, distance, total_travel):
 
     result = sim.output['Suitability']
     return result
+
+class CompiledFIS:
+    """
+    This is a compiled version of the FIS, which is built once from the rulebase
+    returned by fis_create(). Creating the control system and the simulation
+    instance is the most expensive part of fis_solve(), so this class builds
+    them a single time and reuses them for every robot/task evaluation.
+
+    It is a drop-in replacement for fis_solve(), such that:
+        fis_solve(rulebase, load, distance, total_travel)
+    becomes:
+        fis = CompiledFIS(rulebase)
+        fis.solve(load, distance, total_travel)
+
+    """
+
+    # constructor for compiled FIS objects:
+    def __init__(self, rulebase):
+        self.rulebase = rulebase                                # rulebase the FIS was compiled from
+        self.system = ctrl.ControlSystem(rulebase)              # control system, holds the rule graph
+        self.sim = ctrl.ControlSystemSimulation(self.system)    # simulation instance, reused between calls
+
+    # solve the FIS for a given robot:
+    def solve(self, load, distance, total_travel):
+        # pass the inputs into the persistent simulation:
+        self.sim.input['Load History'] = load
+        self.sim.input['Distance to Task'] = distance
+        self.sim.input['Total Distance Travelled'] = total_travel
+
+        self.sim.compute()
+
+        result = self.sim.output['Suitability']
+        return result
+
+    # solve the FIS for a batch of robots, one simulation at a time:
+    def solve_batch(self, inputs):
+        inputs = np.atleast_2d(np.asarray(inputs, dtype = float))
+        return np.array([self.solve(load, distance, total_travel) for load, distance, total_travel in inputs])
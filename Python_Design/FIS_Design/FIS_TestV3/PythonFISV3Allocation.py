@@ -0,0 +1,167 @@
+"""
+
+This program hosts the allocation round that is used within the FIS testing, to
+select the robots that are sent to each task.
+
+Rather than querying each robot in turn, with one path search and one FIS
+evaluation per robot, the fleet is given as arrays of its positions, loads,
+total distances travelled and sensor types. Every distance is looked up from a
+single distance field to the task, every suitability is solved in one batched
+FIS call, and the most suitable robot of each sensor type is selected with an
+argmax over a mask of that sensor type, so there is no per-robot Python overhead.
+
+The state of every robot after each round is appended to a preallocated NumPy
+structured array, which is only turned into a DataFrame once the simulation has
+finished, such that no DataFrame is built within the loop.
+
+"""
+######################## Import Packages ########################
+
+import numpy as np
+import pandas as pd
+from PythonFISV3PathPlanning import *
+
+####################### Define Classes ##########################
+
+class RoundLog:
+    """
+    This is a log of every allocation round of a simulation, which holds one
+    record per robot per round within a preallocated structured array. A record
+    consists of:
+    - the index of the task, and the id and sensor type of the robot
+    - the load history, distance to task and total distance travelled of the
+      robot, once the selected robots have been sent to the task
+    - the suitability of the robot, and whether it was selected
+    """
+
+    # fields of each record:
+    record_dtype = np.dtype([
+        ('Task', np.int32),
+        ('Robot ID', np.int32),
+        ('Sensor Type', 'U16'),
+        ('Load History', np.float64),
+        ('Distance to Task', np.float64),
+        ('Total Distance Travelled', np.float64),
+        ('Suitability', np.float64),
+        ('Selected', np.bool_),
+    ])
+
+    # constructor for round logs:
+    def __init__(self, num_rounds, num_robots):
+        self.num_robots = num_robots                                                    # number of robots in each round
+        self.records = np.zeros(num_rounds * num_robots, dtype = self.record_dtype)     # every record, preallocated
+        self.num_rounds = 0                                                             # number of rounds logged so far
+
+    # log a round, with every field given as a (num_robots, ) array:
+    def append(self, task, ids, sensors, loads, travel, totals, suitability, selected):
+        block = self.records[self.num_rounds * self.num_robots:(self.num_rounds + 1) * self.num_robots]
+        block['Task'] = task
+        block['Robot ID'] = ids
+        block['Sensor Type'] = sensors
+        block['Load History'] = loads
+        block['Distance to Task'] = travel
+        block['Total Distance Travelled'] = totals
+        block['Suitability'] = suitability
+        block['Selected'] = False
+        block['Selected'][[index for index in selected.values() if index is not None]] = True
+        self.num_rounds += 1
+
+    # records of the latest round:
+    def last(self):
+        return self.records[(self.num_rounds - 1) * self.num_robots:self.num_rounds * self.num_robots]
+
+    # every logged record as a dataframe:
+    def to_dataframe(self):
+        return pd.DataFrame(self.records[:self.num_rounds * self.num_robots])
+
+####################### Define Functions ########################
+
+def fleet_distances(image, positions, goal, planner = 'field', return_paths = False):
+
+    """
+    Returns the planned distance, in pixels, from every position to the goal,
+    which is np.inf for positions that cannot reach it.
+
+    With the field planner, every distance is looked up from the single distance
+    field to the goal, as it is with the cached planner once that field is cached.
+    The other planners search from each position in turn.
+
+    If return_paths is True, the path of every position is also returned, which
+    is None for positions that cannot reach the goal. These are the paths found
+    by the planner, or are descended from the distance field, so they never run
+    a second search.
+
+    """
+
+    field = None
+    if planner == 'field':
+        field = distance_field(image, goal)
+    elif planner == 'cached':
+        field = cached_field(image, goal)
+
+    if field is not None:
+        distances = start_distances(field, image, positions)
+        if return_paths:
+            return distances, [extract_path(field, image, tuple(start))[0] for start in positions]
+        return distances
+
+    distances = np.empty(len(positions))
+    paths = []
+    for i, start in enumerate(positions):
+        path, dist = plan(image, tuple(start), goal, planner)
+        distances[i] = np.inf if dist is None else dist
+        paths.append(path)
+
+    return (distances, paths) if return_paths else distances
+
+def allocation_round(fis, image, goal, positions, loads, totals, sensors, resolution,
+                     sensor_types = ('Imagery', 'Measurement'), planner = 'field', return_paths = False):
+
+    """
+    Runs one allocation round for the task at goal, for a fleet given as arrays of:
+        positions:  (num_robots, 2) positions, in (x, y) format
+        loads:      (num_robots, ) load histories
+        totals:     (num_robots, ) total distances travelled
+        sensors:    (num_robots, ) sensor types
+
+    Returns the (num_robots, ) travel distances and suitabilities, rounded as within
+    the implementation scripts, along with a dictionary of the index of the most
+    suitable robot of each sensor type, which is None if no robot of that type can
+    reach the task. Ties go to the robot with the highest index, as with the sorted
+    bids of the implementation scripts. Robots that cannot
+    reach the task have a travel distance of np.inf and a suitability of np.nan,
+    and are never scored by the FIS.
+
+    If return_paths is True, the path of every robot is also returned, as with
+    fleet_distances(), such that they can be drawn without planning them again.
+
+    """
+
+    positions = np.asarray(positions)
+    sensors = np.asarray(sensors)
+
+    # distance from every robot to the task, in metres:
+    distances = fleet_distances(image, positions, goal, planner, return_paths)
+    if return_paths:
+        distances, paths = distances
+    travel = np.round(distances * resolution, 3)
+
+    # suitability of every robot that can reach the task, in one batched call:
+    reachable = np.isfinite(travel)
+    inputs = np.column_stack([loads, travel, totals]).astype(float)
+    suitability = np.full(len(travel), np.nan)
+    if reachable.any():
+        suitability[reachable] = np.round(fis.solve_batch(inputs[reachable]), 2)
+
+    # select the most suitable robot of each sensor type, out of those that can reach the task,
+    # searching from the last robot such that ties go to the highest index:
+    selected = {}
+    for sensor in sensor_types:
+        mask = (sensors == sensor) & reachable
+        scores = np.where(mask, suitability, -np.inf)
+        selected[sensor] = len(scores) - 1 - int(np.argmax(scores[::-1])) if mask.any() else None
+
+    if return_paths:
+        return travel, suitability, selected, paths
+
+    return travel, suitability, selected
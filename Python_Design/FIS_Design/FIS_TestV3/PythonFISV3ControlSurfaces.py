@@ -11,27 +11,24 @@ and the distance history to make decisions about the suitability of a given robo
 """
 ######################## Import Packages ########################
 
+import os
 import numpy as np
-import skfuzzy as fuzz
-from skfuzzy import control as ctrl
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
-from PythonFISFunctionV3 import *
+from PythonFISVectorized import *
+from PythonFISV3Surfaces import *
 from matplotlib import cm
 
 #######################       Main       ########################
 
-# define rulebase:
-rulebase = fis_create()
+# create the vectorized FIS, which solves every point of a surface in one pass:
+fis = fis_create_vectorized()
 
-# create FIS system from rulebase:
-system = ctrl.ControlSystem(rulebase)
-
-# create a simulation instance from the FIS system:
-resolution = 32
-sim = ctrl.ControlSystemSimulation(system, flush_after_run = resolution * resolution + 1)
+# surfaces are cached on disk, keyed by the rulebase and resolution:
+cache_dir = os.path.join(os.getcwd(), "Python_Design", "FIS_Design", "cache")
 
 # define universes of discourse:
+resolution = 256
 x = np.linspace(0, 10, resolution)  # load history
 y = np.linspace(0, 25, resolution)  # distance to task
 z = np.linspace(0, 50, resolution)  # total distance travelled
@@ -40,25 +37,11 @@ z = np.linspace(0, 50, resolution)  # total distance travelled
 # for this control surface, the values of LH and DTT are varied while the third variable, 
 # the total distance travelled, is held constant at half its universe of discourse:
 
-# create meshgrid for 2D surface:
-lh, dtt = np.meshgrid(x, y)
-u1 = np.zeros_like(lh)
-
 # fix one variable at half its range:
 fixed_tdt = max(z) / 2
 
-# loop through the 2D input space and compute suitability for each combination:
-counter = 1
-for i in range(resolution):
-    for j in range(resolution):
-        sim.input['Load History'] = lh[i, j]
-        sim.input['Distance to Task'] = dtt[i, j]
-        sim.input['Total Distance Travelled'] = fixed_tdt
-        sim.compute()
-        u1[i,j] = sim.output['Suitability']
-        print(f'simulation 1 | checking combination: {counter}/{resolution*resolution}', end = '\r')
-        counter += 1
-print('\n')
+# compute suitability for every combination of the 2D input space:
+lh, dtt, u1 = control_surface(fis, x, y, fixed_tdt, varied = (0, 1), cache_dir = cache_dir)
 
 # plot the result in 3D:
 fig1 = plt.figure(figsize = (8,8))
@@ -74,25 +57,11 @@ ax1.set_zlabel('Suitability')
 # for this control surface, the values of LH and TDT are varied while the third variable, 
 # the distance to task, is held constant at half its universe of discourse:
 
-# create meshgrid for 2D surface:
-lh, tdt = np.meshgrid(x, z)
-u2 = np.zeros_like(lh)
-
 # fix one variable at half its range:
 fixed_dtt = max(y) / 2
 
-# loop through the 2D input space and compute suitability for each combination:
-counter = 1
-for i in range(resolution):
-    for j in range(resolution):
-        sim.input['Load History'] = lh[i, j]
-        sim.input['Distance to Task'] = fixed_dtt
-        sim.input['Total Distance Travelled'] = tdt[i, j]
-        sim.compute()
-        u2[i,j] = sim.output['Suitability']
-        print(f'simulation 2 | checking combination: {counter}/{resolution*resolution}', end = '\r')
-        counter += 1
-print('\n')
+# compute suitability for every combination of the 2D input space:
+lh, tdt, u2 = control_surface(fis, x, z, fixed_dtt, varied = (0, 2), cache_dir = cache_dir)
 
 # plot the result in 3D:
 fig2 = plt.figure(figsize = (8,8))
@@ -107,25 +76,11 @@ ax2.set_zlabel('Suitability')
 # for this control surface, the values of DTT and TDT are varied while the third variable, 
 # the load history, is held constant at half its universe of discourse:
 
-# create meshgrid for 2D surface:
-dtt, tdt = np.meshgrid(y, z)
-u3 = np.zeros_like(dtt)
-
 # fix one variable at half its range:
 fixed_lh = max(x) / 2
 
-# loop through the 2D input space and compute suitability for each combination:
-counter = 1
-for i in range(resolution):
-    for j in range(resolution):
-        sim.input['Load History'] = fixed_lh
-        sim.input['Distance to Task'] = dtt[i, j]
-        sim.input['Total Distance Travelled'] = tdt[i, j]
-        sim.compute()
-        u3[i,j] = sim.output['Suitability']
-        print(f'simulation 3 | checking combination: {counter}/{resolution*resolution}', end = '\r')
-        counter += 1
-print('\n')
+# compute suitability for every combination of the 2D input space:
+dtt, tdt, u3 = control_surface(fis, y, z, fixed_lh, varied = (1, 2), cache_dir = cache_dir)
 
 # plot the result in 3D:
 fig3 = plt.figure(figsize = (8,8))
@@ -136,8 +91,23 @@ ax3.set_xlabel('Distance to Task')
 ax3.set_ylabel('Total Distance Travelled')
 ax3.set_zlabel('Suitability')
 
-# show plots:
-plt.show()
+##########   Suitability Volume: slices along TDT    ##########
+# for tuning, the full 3D suitability volume is computed once, and slices of LH vs. DTT are 
+# read from it at several values of the total distance travelled, without solving the FIS again:
 
+# load the volume, which is built and cached on the first run:
+volume = volume_create(fis, cache_dir, shape = (101, 101, 101))
 
+# plot slices of the volume at a quarter, half, and three quarters of the TDT universe of discourse:
+fig4, axs4 = plt.subplots(1, 3, figsize = (15, 5), sharey = True)
+for ax4, value in zip(axs4, [max(z) / 4, max(z) / 2, 3 * max(z) / 4]):
+    lh, dtt, u4, fixed = volume.slice(2, value)
+    contour = ax4.contourf(lh, dtt, u4, levels = 20, cmap = 'plasma', vmin = 0, vmax = 10)
+    ax4.set_title(f'TDT: {fixed}')
+    ax4.set_xlabel(volume.input_names[0])
+axs4[0].set_ylabel(volume.input_names[1])
+fig4.colorbar(contour, ax = axs4, label = 'Suitability')
+fig4.suptitle('Suitability Volume: LH vs. DTT vs. Suit')
 
+# show plots:
+plt.show()
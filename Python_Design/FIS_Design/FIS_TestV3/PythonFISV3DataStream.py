@@ -0,0 +1,161 @@
+"""
+
+This program is a streaming data generator for the Fuzzy Inference System (FIS)
+that was first designed within MATLAB, using the Fuzzy Logic Designer.
+
+This file serves to host the functions that are used to generate the labelled
+data that the ANFIS is trained on, at a scale that does not fit in memory.
+
+Rather than building the whole table before it is exported, the samples are
+generated and scored by the vectorized FIS one chunk at a time, and each chunk
+is split into the training, validation and testing sets and written straight
+into memory mapped .npy files. Only a single chunk is ever held in memory, so
+10^7 or more samples can be generated with a fixed memory footprint.
+
+Each chunk draws from its own random stream, spawned from a single seed, so the
+same seed and chunk size always give the same files. The number of samples that
+each chunk adds to each split is known in advance, such that the size of every
+file is fixed before any samples are generated.
+
+"""
+######################## Import Packages ########################
+
+import os
+import json
+import numpy as np
+from PythonFISVectorized import *
+
+####################### Define Functions ########################
+
+def split_counts(num_samples, chunk_size, splits):
+
+    """
+    Returns the number of samples that each chunk adds to each split, with shape
+    (num_chunks, num_splits).
+
+    Each chunk is split in the given proportions, with any remainder of the
+    rounding going to the first split, such as the training set.
+
+    """
+
+    chunk_sizes = np.diff(np.append(np.arange(0, num_samples, chunk_size), num_samples))
+    counts = np.floor(chunk_sizes[:, None] * np.asarray(splits, dtype = float)).astype(np.int64)
+    counts[:, 0] += chunk_sizes - counts.sum(axis = 1)
+
+    return counts
+
+def generate_chunk(fis, rng, num_samples, max_ud, integer = True):
+
+    """
+    Generates and scores a chunk of samples, returning the (num_samples, 3) inputs
+    and the (num_samples, ) suitabilities.
+
+    As within PythonFISV3DataGenerator.ipynb, each input is drawn uniformly from
+    0 to the max value of its universe of discourse, either as integers or, if
+    integer is False, as continuous values which give a denser training set.
+
+    """
+
+    max_ud = np.asarray(max_ud)
+    if integer:
+        inputs = rng.integers(0, max_ud + 1, size = (num_samples, len(max_ud))).astype(float)
+    else:
+        inputs = rng.uniform(0, max_ud, size = (num_samples, len(max_ud)))
+
+    return inputs, fis.solve_batch(inputs)
+
+def generate_dataset(output_dir, num_samples, chunk_size = 1000000, seed = 0, splits = (0.8, 0.1, 0.1),
+                     max_ud = (10, 25, 50), integer = True, dtype = np.float32, verbose = True):
+
+    """
+    Generates num_samples labelled samples and streams them into output_dir as:
+        train_input.npy, train_output.npy
+        val_input.npy, val_output.npy
+        test_input.npy, test_output.npy
+    along with dataset.json, which records the settings that the dataset was
+    generated with and the number of samples in each split.
+
+    The splits are assigned on the fly, where each chunk is shuffled before it is
+    divided in the given proportions, such that no split needs to be held in
+    memory. The peak memory is set by chunk_size rather than num_samples.
+
+    """
+
+    split_names = ['train', 'val', 'test']
+    if len(splits) != len(split_names) or not np.isclose(sum(splits), 1.0):
+        raise ValueError(f'splits must be the {len(split_names)} proportions of {split_names}, summing to 1')
+
+    os.makedirs(output_dir, exist_ok = True)
+    fis = fis_create_vectorized()
+    num_inputs = len(max_ud)
+
+    # number of samples that every chunk adds to every split, and the size of every split:
+    counts = split_counts(num_samples, chunk_size, splits)
+    totals = counts.sum(axis = 0)
+
+    # create the memory mapped files at their final size:
+    inputs_out = {}
+    outputs_out = {}
+    for name, total in zip(split_names, totals):
+        inputs_out[name] = np.lib.format.open_memmap(os.path.join(output_dir, f'{name}_input.npy'), mode = 'w+', dtype = dtype, shape = (int(total), num_inputs))
+        outputs_out[name] = np.lib.format.open_memmap(os.path.join(output_dir, f'{name}_output.npy'), mode = 'w+', dtype = dtype, shape = (int(total), ))
+
+    # one random stream per chunk, spawned from the seed:
+    streams = np.random.SeedSequence(seed).spawn(len(counts))
+    offsets = np.zeros(len(split_names), dtype = np.int64)
+
+    for chunk_index, (stream, chunk_counts) in enumerate(zip(streams, counts)):
+        rng = np.random.default_rng(stream)
+
+        # generate and score the chunk:
+        inputs, outputs = generate_chunk(fis, rng, int(chunk_counts.sum()), max_ud, integer)
+
+        # shuffle the chunk and divide it between the splits:
+        order = rng.permutation(len(inputs))
+        bounds = np.append(0, np.cumsum(chunk_counts))
+        for split_index, name in enumerate(split_names):
+            index = order[bounds[split_index]:bounds[split_index + 1]]
+            start, end = offsets[split_index], offsets[split_index] + len(index)
+            inputs_out[name][start:end] = inputs[index]
+            outputs_out[name][start:end] = outputs[index]
+        offsets += chunk_counts
+
+        if verbose:
+            print(f'generated chunk {chunk_index + 1}/{len(counts)}, {int(offsets.sum())}/{num_samples} samples')
+
+    # flush the files to disk:
+    for name in split_names:
+        inputs_out[name].flush()
+        outputs_out[name].flush()
+    del inputs_out, outputs_out
+
+    # record the settings that the dataset was generated with:
+    settings = {
+        'num_samples'   : int(num_samples),
+        'chunk_size'    : int(chunk_size),
+        'seed'          : int(seed),
+        'splits'        : dict(zip(split_names, [float(s) for s in splits])),
+        'counts'        : dict(zip(split_names, totals.tolist())),
+        'max_ud'        : [float(m) for m in max_ud],
+        'integer'       : bool(integer),
+        'dtype'         : np.dtype(dtype).name,
+        'columns'       : ['Load History', 'Distance to Task', 'Total Distance Travelled', 'Suitability'],
+    }
+    with open(os.path.join(output_dir, 'dataset.json'), 'w') as f:
+        json.dump(settings, f, indent = 4)
+
+    return settings
+
+def load_split(output_dir, split, mmap = True):
+
+    """
+    Loads the inputs and outputs of a split that was written by generate_dataset(),
+    memory mapped by default such that only the samples that are used are read.
+
+    """
+
+    mmap_mode = 'r' if mmap else None
+    inputs = np.load(os.path.join(output_dir, f'{split}_input.npy'), mmap_mode = mmap_mode)
+    outputs = np.load(os.path.join(output_dir, f'{split}_output.npy'), mmap_mode = mmap_mode)
+
+    return inputs, outputs
@@ -0,0 +1,198 @@
+"""
+
+This program hosts the fleet of robots that is used within the FIS testing, to
+simulate the allocation of tasks to a multi-robot system (MRS).
+
+Rather than a Python object per robot, looked up by name within a dictionary,
+the state of the fleet is held as one NumPy column per attribute, such as the
+load histories or positions of every robot. The allocation round reads these
+columns directly, and sending the selected robots to a task updates them with
+vectorized column operations, so the cost of a round does not grow with Python
+attribute access as the fleet grows to thousands of robots.
+
+Where a single robot is needed, such as for drawing or querying it, indexing the
+fleet gives a lightweight view of that robot, which reads and writes the columns.
+
+"""
+######################## Import Packages ########################
+
+import random
+import numpy as np
+import pandas as pd
+from PythonFISV3Allocation import *
+
+####################### Define Classes ##########################
+
+class RobotView:
+    """
+    This is a view of a single robot within a fleet, which has the same
+    attributes as the robot objects of the implementation scripts, but holds
+    no state of its own:
+    - an ID tag, for referencing
+    - a sensor type, either imagery or measurement
+    - a load history, which denotes how many times the robot has gone to the
+      task site
+    - their position within space
+    - a travel distance, which represents how far a robot has to travel to the
+      task site
+    - a total travel distance that they have travelled overall
+    - a weight, which is used to quantify the impact of their travelling
+    - a suitability, which is calculated using the FIS
+    - a colour used in plotting
+    """
+
+    __slots__ = ('fleet', 'index')
+
+    # constructor for robot views:
+    def __init__(self, fleet, index):
+        self.fleet = fleet      # fleet that holds the state of the robot
+        self.index = index      # row of the robot within the fleet
+
+    @property
+    def id(self):
+        return int(self.fleet.ids[self.index])
+
+    @property
+    def sensor(self):
+        return str(self.fleet.sensors[self.index])
+
+    @property
+    def load(self):
+        return float(self.fleet.loads[self.index])
+
+    @load.setter
+    def load(self, value):
+        self.fleet.loads[self.index] = value
+
+    @property
+    def position(self):
+        return tuple(int(v) for v in self.fleet.positions[self.index])
+
+    @position.setter
+    def position(self, value):
+        self.fleet.positions[self.index] = value
+
+    @property
+    def travel(self):
+        return float(self.fleet.travel[self.index])
+
+    @travel.setter
+    def travel(self, value):
+        self.fleet.travel[self.index] = value
+
+    @property
+    def total(self):
+        return float(self.fleet.totals[self.index])
+
+    @total.setter
+    def total(self, value):
+        self.fleet.totals[self.index] = value
+
+    @property
+    def weight(self):
+        return float(self.fleet.weights[self.index])
+
+    @property
+    def suitability(self):
+        return float(self.fleet.suitability[self.index])
+
+    @property
+    def colour(self):
+        return tuple(int(v) for v in self.fleet.colours[self.index])
+
+    # for querying robots:
+    def display_robot_info(self):
+        return (f"Robot ID: {self.id}\n"
+                f"Position: {self.position}\n"
+                f"Sensor Type: {self.sensor}\n"
+                f"Load History: {self.load}\n"
+                f"Travelled Distance: {self.travel}\n"
+                f"Suitability: {self.suitability}")
+
+class Fleet:
+    """
+    This is a fleet of robots, held as NumPy columns, which consists of:
+    - the id tag and sensor type of every robot
+    - the load history, position, travel distance, total travel distance, weight
+      and suitability of every robot
+    - the colour of every robot, used in plotting
+    - a random number generator, used to reposition the robots at each task
+    """
+
+    # colours of each sensor type, one of which is picked for every robot:
+    sensor_colours = {
+        'Imagery'       : [(149, 168, 255), (56, 182, 255), (138, 199, 235), (16, 180, 230)],      # blue
+        'Measurement'   : [(117, 240, 150), (98, 181, 119), (31, 219, 78), (79, 209, 125)],        # green
+    }
+
+    # constructor for fleets:
+    def __init__(self, sensors, positions, seed = None):
+        num_robots = len(sensors)
+        self.ids = np.arange(1, num_robots + 1)                                         # id tags, for referencing
+        self.sensors = np.asarray(sensors)                                              # sensor type of every robot
+        self.loads = np.zeros(num_robots)                                               # load history of every robot
+        self.positions = np.array(positions, dtype = int).reshape(num_robots, 2)        # current position of every robot
+        self.travel = np.zeros(num_robots)                                              # distance every robot must travel to the task site
+        self.totals = np.zeros(num_robots)                                              # total distance that every robot has travelled
+        self.weights = np.ones(num_robots)                                              # movement weight, ignored if 1
+        self.suitability = np.zeros(num_robots)                                         # suitability of every robot
+        self.paths = None                                                               # path of every robot to the task site, if kept
+        self.rng = np.random.default_rng(seed)                                          # random number generator for repositioning
+
+        # pick a colour for every robot, in the same manner as the robot objects:
+        self.colours = np.zeros((num_robots, 3), dtype = int)
+        for i, sensor in enumerate(self.sensors):
+            options = self.sensor_colours.get(str(sensor), [(128, 128, 128)])
+            self.colours[i] = options[random.randint(0, len(options) - 1)]
+
+    # spawn a fleet of camera equipped robots followed by measurement equipped robots:
+    @classmethod
+    def spawn(cls, num_imagery, num_measurement, positions, seed = None):
+        sensors = ['Imagery'] * num_imagery + ['Measurement'] * num_measurement
+        return cls(sensors, positions[:len(sensors)], seed)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if not -len(self) <= index < len(self):
+            raise IndexError(f'Fleet has no robot at index {index}')
+        return RobotView(self, index % len(self))
+
+    def __iter__(self):
+        return (RobotView(self, i) for i in range(len(self)))
+
+    # run an allocation round for the task at goal:
+    def allocate(self, fis, image, goal, resolution, sensor_types = ('Imagery', 'Measurement'), planner = 'field', keep_paths = False):
+        """
+        Scores every robot for the task, storing their travel distances and
+        suitabilities, and returns the dictionary of the index of the most
+        suitable robot of each sensor type, as with allocation_round(). If
+        keep_paths is True, the path of every robot to the task is also stored.
+        """
+        result = allocation_round(fis, image, goal, self.positions, self.loads, self.totals,
+                                  self.sensors, resolution, sensor_types, planner, keep_paths)
+        self.travel, self.suitability, selected = result[:3]
+        self.paths = result[3] if keep_paths else None
+        return selected
+
+    # send the selected robots to the task:
+    def send(self, indices, goal, jitter = 10):
+        """
+        Increments the load history and total travel distance of the robots at the
+        given indices, and repositions them randomly within jitter pixels of the
+        task. Returns the total weighted distance that they travelled.
+        """
+        indices = np.array([index for index in indices if index is not None], dtype = int)
+
+        self.loads[indices] += 1
+        self.totals[indices] += self.travel[indices]
+        self.positions[indices] = np.asarray(goal, dtype = int) + self.rng.integers(-jitter, jitter + 1, size = (len(indices), 2))
+
+        return float(np.sum(self.travel[indices] * self.weights[indices]))
+
+    # every robot as a dataframe, for printing:
+    def to_dataframe(self):
+        return pd.DataFrame({'Robot ID': self.ids, 'Sensor Type': self.sensors, 'Load History': self.loads,
+                             'Distance to Task': self.travel, 'Total Distance Travelled': self.totals,
+                             'Suitability': self.suitability})
@@ -0,0 +1,443 @@
+"""
+
+This program hosts a hierarchical path planner for the FIS testing, in the style
+of HPA* (hierarchical path-finding A*), for maps that are too large to search at
+the pixel level for every robot.
+
+The buffered map is divided into square clusters. Wherever two neighbouring
+clusters share a run of white space along their border, an entrance is placed
+at the middle of the run, or at both ends of a long run, which adds a node on
+either side of the border joined by a single straight move. Within each cluster,
+the distance between every pair of its nodes is found with a search that is
+restricted to that cluster. This abstract graph is built once for each map and
+cluster size, and is cached on disk.
+
+A query connects the start and goal to the nodes of their clusters, searches the
+abstract graph, and then refines the path with A* over the pixels of the
+clusters along the abstract path, widened by a margin of neighbouring clusters,
+which is referred to as the corridor. The refined search only stores the cells
+that it reaches, in dictionaries, so the cost of a query depends on the size of
+the corridor rather than the size of the map. The refined path is the shortest
+path that stays within the corridor, so it is never longer than the abstract
+path, and is only longer than the exact dijkstra() distance when the shortest
+path leaves the corridor.
+
+Each query also reports a bound on its suboptimality. The refined search does
+not take the moves that leave the corridor, but every path that leaves it must
+do so through one of these moves, so the cost to reach the move plus the octile
+distance from where it leads to the goal is a lower bound on every such path.
+The smallest of these over the cells that were expanded, or the refined distance
+if it is smaller, is a lower bound on the exact distance, and the refined
+distance divided by it is an upper bound on its ratio to the exact distance. It
+is exactly 1 whenever no move out of the corridor could have given a shorter
+path. Where the bound is loose, the clusters whose moves out of the corridor
+could give a much shorter path are added to the corridor and the refinement is
+repeated, a few times at most, which tightens the bound only for the queries
+that need it.
+
+"""
+######################## Import Packages ########################
+
+import os
+import numpy as np
+import math as m
+import heapq
+from PythonFISV3PathPlanning import *
+
+####################### Define Classes ##########################
+
+class Hierarchy:
+    """
+    This is the abstract graph of a buffered map, which consists of:
+    - the size of the square clusters that the map is divided into
+    - the entrance nodes, in (row, col) format, and the cluster of each
+    - the edges between the nodes, as the (neighbour, cost) pairs of each node
+    """
+
+    # constructor for hierarchy objects:
+    def __init__(self, shape, cluster_size, nodes, edges):
+        self.shape = tuple(shape)                                       # (rows, cols) of the map
+        self.cluster_size = cluster_size                                # side of each cluster, in pixels
+        self.nodes = np.asarray(nodes, dtype = int).reshape(-1, 2)      # (num_nodes, 2) entrance cells
+        self.edges = np.asarray(edges, dtype = float).reshape(-1, 3)    # (num_edges, 3) node, neighbour and cost
+        self._free = None                                               # white space of the map as a flat list, built on the first query
+
+        # neighbours of every node, and the nodes within every cluster:
+        self.adjacency = [[] for _ in range(len(self.nodes))]
+        for node, neighbour, cost in self.edges.tolist():
+            self.adjacency[int(node)].append((int(neighbour), cost))
+        self.cluster_nodes = {}
+        for node, cell in enumerate(self.nodes.tolist()):
+            self.cluster_nodes.setdefault(self.cluster(cell), []).append(node)
+
+    # cluster of a cell, in (row, col) format:
+    def cluster(self, cell):
+        return (cell[0] // self.cluster_size, cell[1] // self.cluster_size)
+
+    # plan a path from the start to the goal:
+    def plan(self, image, start, goal, margin = 1, tolerance = 1.1, max_widen = 2):
+        """
+        Plans a path through the abstract graph, and refines it within the corridor
+        of clusters along it, widened by margin clusters on every side. While the
+        bound is above tolerance, the clusters whose moves out of the corridor could
+        give a path shorter than the refined one by more than the tolerance are
+        added to the corridor, and the refinement is repeated, up to max_widen times.
+
+        Returns the path in (x, y) format along with its length, in the same manner
+        as dijkstra(), and the bound on the ratio of its length to the exact
+        distance, or (None, None, None) if the goal cannot be reached.
+        """
+        rows, cols = image.shape
+        s, t = (start[1], start[0]), (goal[1], goal[0])
+
+        # as with dijkstra(), a goal that is not white space can only be reached from itself:
+        if s == t:
+            return [tuple(start)], 0.0, 1.0
+        if image[t] < 254:
+            return None, None, None
+
+        # connect the start and goal to the nodes of their clusters:
+        if self._free is None:
+            self._free = (image >= 254).ravel().tolist()
+        free = self._free
+        num_nodes = len(self.nodes)
+        source, target = num_nodes, num_nodes + 1
+        start_nodes = self.cluster_nodes.get(self.cluster(s), [])
+        goal_nodes = self.cluster_nodes.get(self.cluster(t), [])
+        start_targets = [tuple(self.nodes[n]) for n in start_nodes] + [t]
+        start_dist = cluster_search(free, self.shape, self.cluster_size, s, start_targets)
+        goal_dist = cluster_search(free, self.shape, self.cluster_size, t, [tuple(self.nodes[n]) for n in goal_nodes])
+
+        temporary = {source: [(n, start_dist[tuple(self.nodes[n])]) for n in start_nodes if tuple(self.nodes[n]) in start_dist]}
+        if t in start_dist:
+            temporary[source].append((target, start_dist[t]))
+        into_goal = {n: goal_dist[tuple(self.nodes[n])] for n in goal_nodes if tuple(self.nodes[n]) in goal_dist}
+
+        # A* over the abstract graph, with the octile distance as the heuristic:
+        def heuristic(node):
+            if node == target:
+                return 0.0
+            x, y = self.nodes[node] if node < num_nodes else s
+            dx, dy = abs(x - t[0]), abs(y - t[1])
+            return max(dx, dy) + (m.sqrt(2) - 1) * min(dx, dy)
+
+        g = {source: 0.0}
+        parent = {source: None}
+        closed = set()
+        pq = [(heuristic(source), source)]
+        while pq:
+            _, node = heapq.heappop(pq)
+            if node in closed:
+                continue
+            closed.add(node)
+            node_expansions['hierarchical'] += 1
+            if node == target:
+                break
+
+            # explore neighbours, along with the goal if this node is within its cluster:
+            neighbours = temporary[source] if node == source else self.adjacency[node]
+            if node in into_goal:
+                neighbours = neighbours + [(target, into_goal[node])]
+            for neighbour, cost in neighbours:
+                new_dist = g[node] + cost
+                if neighbour not in closed and new_dist < g.get(neighbour, np.inf):
+                    g[neighbour] = new_dist
+                    parent[neighbour] = node
+                    heapq.heappush(pq, (new_dist + heuristic(neighbour), neighbour))
+
+        # the corridor is the flat id of every cluster along the abstract path, widened by the margin:
+        num_clusters = (-(-rows // self.cluster_size), -(-cols // self.cluster_size))
+        path = None
+        if target in parent:
+            corridor = set()
+            node = target
+            while node is not None:
+                cell = s if node == source else t if node == target else self.nodes[node]
+                cx, cy = self.cluster(cell)
+                for x in range(max(cx - margin, 0), min(cx + margin + 1, num_clusters[0])):
+                    for y in range(max(cy - margin, 0), min(cy + margin + 1, num_clusters[1])):
+                        corridor.add(x * num_clusters[1] + y)
+                node = parent[node]
+
+            # refine the path with A* over the corridor only, widening it where it may cut off a shorter path:
+            for _ in range(max_widen + 1):
+                path, dist, exits = corridor_search(free, self.shape, self.cluster_size, corridor, s, t)
+                if path is None:
+                    break
+                lower = min([dist] + list(exits.values()))
+                opening = {cluster for cluster, bound in exits.items() if bound * tolerance < dist}
+                if not opening:
+                    break
+                corridor |= opening
+
+        # if the abstract graph misses a connection, such as a diagonal-only crossing, search the whole map:
+        if path is None:
+            path, dist, _ = corridor_search(free, self.shape, self.cluster_size, None, s, t)
+            lower = dist
+
+        if path is None:
+            return None, None, None
+
+        return path, dist, dist / lower
+
+    # save the hierarchy as a compressed .npz:
+    def save(self, path):
+        np.savez_compressed(path, shape = self.shape, cluster_size = self.cluster_size,
+                            nodes = self.nodes, edges = self.edges)
+
+    # load a saved hierarchy:
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['shape'], int(data['cluster_size']), data['nodes'], data['edges'])
+
+####################### Define Functions ########################
+
+def cluster_search(free, shape, cluster_size, source, targets):
+
+    """
+    Runs a Dijkstra search from the source, in (row, col) format, that never leaves
+    the cluster of the source, returning a dictionary of the distance to every
+    target that can be reached within the cluster.
+
+    free is the flattened list of whether each cell is white space.
+
+    """
+
+    rows, cols = shape
+    x0, y0 = (source[0] // cluster_size) * cluster_size, (source[1] // cluster_size) * cluster_size
+    x1, y1 = min(x0 + cluster_size, rows), min(y0 + cluster_size, cols)
+
+    remaining = {cell[0] * cols + cell[1] for cell in targets}
+    found = {}
+    dist = {source[0] * cols + source[1]: 0.0}
+    closed = set()
+    pq = [(0.0, source[0] * cols + source[1])]
+
+    while pq and remaining:
+        current_dist, node = heapq.heappop(pq)
+
+        # if the node has already been closed, skip it
+        if node in closed:
+            continue
+        closed.add(node)
+        node_expansions['hierarchical'] += 1
+        if node in remaining:
+            remaining.discard(node)
+            found[divmod(node, cols)] = current_dist
+
+        x, y = divmod(node, cols)
+
+        # explore the neighbours within the cluster
+        for (dx, dy), movement_cost in zip(directions, costs):
+            nx, ny = x + dx, y + dy
+            if x0 <= nx < x1 and y0 <= ny < y1:
+                neighbor = nx * cols + ny
+                if free[neighbor] and neighbor not in closed:
+                    new_dist = current_dist + movement_cost
+                    if new_dist < dist.get(neighbor, m.inf):
+                        dist[neighbor] = new_dist
+                        heapq.heappush(pq, (new_dist, neighbor))
+
+    return found
+
+def corridor_search(free, shape, cluster_size, corridor, source, target):
+
+    """
+    A* search from the source to the target, in (row, col) format, using the octile
+    distance as the heuristic, that only enters the clusters within the corridor,
+    given as a set of their flat ids, or the whole map if the corridor is None.
+    The g-scores and parents are kept in dictionaries, so only the cells that are
+    reached are stored.
+
+    The moves that would leave the corridor are not taken, but the cost to reach
+    each of them plus the octile distance from where it leads to the target is a
+    lower bound on the paths that leave the corridor there, and the smallest of
+    these is kept for each cluster outside the corridor.
+
+    Returns the path in (x, y) format along with its length and the dictionary of
+    these bounds by cluster, or (None, None, bounds) if the target cannot be
+    reached within the corridor.
+
+    """
+
+    rows, cols = shape
+    corridor_cols = -(-cols // cluster_size)
+    tx, ty = target
+
+    # octile distance, the exact cost to the target on an empty map:
+    def heuristic(x, y):
+        dx, dy = abs(x - tx), abs(y - ty)
+        return max(dx, dy) + (m.sqrt(2) - 1) * min(dx, dy)
+
+    start = source[0] * cols + source[1]
+    goal = target[0] * cols + target[1]
+    g = {start: 0.0}
+    parent = {start: None}
+    closed = set()
+    exits = {}
+    pq = [(heuristic(*source), heuristic(*source), start)]
+
+    while pq:
+        _, _, node = heapq.heappop(pq)
+
+        # if the node has already been closed, skip it
+        if node in closed:
+            continue
+        closed.add(node)
+        node_expansions['hierarchical'] += 1
+
+        # if we reached the target, reconstruct the path:
+        if node == goal:
+            path = []
+            while node is not None:
+                x, y = divmod(node, cols)
+                path.append((y, x))
+                node = parent[node]
+            return path[::-1], g[goal], exits
+
+        x, y = divmod(node, cols)
+        current_dist = g[node]
+
+        # explore the neighbours, keeping the bound of those outside the corridor
+        for (dx, dy), movement_cost in zip(directions, costs):
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < rows and 0 <= ny < cols:
+                neighbor = nx * cols + ny
+                if free[neighbor] and neighbor not in closed:
+                    new_dist = current_dist + movement_cost
+                    cluster = (nx // cluster_size) * corridor_cols + ny // cluster_size
+                    if corridor is not None and cluster not in corridor:
+                        exits[cluster] = min(exits.get(cluster, m.inf), new_dist + heuristic(nx, ny))
+                    elif new_dist < g.get(neighbor, m.inf):
+                        g[neighbor] = new_dist
+                        parent[neighbor] = node
+                        h = heuristic(nx, ny)
+                        heapq.heappush(pq, (new_dist + h, h, neighbor))
+
+    return None, None, exits
+
+def entrances(free, cluster_size, max_entrance = 6):
+
+    """
+    Returns the pairs of cells, in (row, col) format, that join neighbouring
+    clusters. Along each border, every run of cells that are white space on both
+    sides gets an entrance at its middle, or at both of its ends if the run is at
+    least max_entrance cells long.
+
+    """
+
+    rows, cols = free.shape
+    pairs = []
+
+    # borders between clusters along the columns, then along the rows:
+    for transpose in (False, True):
+        grid = free.T if transpose else free
+        length, width = grid.shape
+        for c0 in range(cluster_size - 1, width - 1, cluster_size):
+            open_cells = grid[:, c0] & grid[:, c0 + 1]
+            for r0 in range(0, length, cluster_size):
+                run_start = None
+                for r in range(r0, min(r0 + cluster_size, length) + 1):
+                    is_open = r < min(r0 + cluster_size, length) and open_cells[r]
+                    if is_open and run_start is None:
+                        run_start = r
+                    elif not is_open and run_start is not None:
+                        run_end = r - 1
+                        if run_end - run_start + 1 >= max_entrance:
+                            points = [run_start, run_end]
+                        else:
+                            points = [(run_start + run_end) // 2]
+                        for p in points:
+                            a, b = (p, c0), (p, c0 + 1)
+                            pairs.append(((a[1], a[0]), (b[1], b[0])) if transpose else (a, b))
+                        run_start = None
+
+    return pairs
+
+def hierarchy_build(image, cluster_size = 16):
+
+    """
+    Builds the abstract graph of a buffered map, with clusters of cluster_size
+    pixels.
+
+    """
+
+    free = image >= 254
+    free_list = free.ravel().tolist()
+    nodes = []
+    index = {}
+    edges = []
+
+    def node_of(cell):
+        if cell not in index:
+            index[cell] = len(nodes)
+            nodes.append(cell)
+        return index[cell]
+
+    # join the two sides of every entrance with a straight move:
+    for a, b in entrances(free, cluster_size):
+        na, nb = node_of(a), node_of(b)
+        edges.extend([(na, nb, 1.0), (nb, na, 1.0)])
+
+    # join every pair of nodes within each cluster by their distance within the cluster:
+    clusters = {}
+    for n, cell in enumerate(nodes):
+        clusters.setdefault((cell[0] // cluster_size, cell[1] // cluster_size), []).append(n)
+    for members in clusters.values():
+        for n in members:
+            others = [nodes[o] for o in members if o != n]
+            for cell, dist in cluster_search(free_list, image.shape, cluster_size, nodes[n], others).items():
+                edges.append((n, index[cell], dist))
+
+    return Hierarchy(image.shape, cluster_size, nodes, edges)
+
+def hierarchy_create(image, cache_dir = None, cluster_size = 16):
+
+    """
+    Loads the hierarchy of a buffered map from cache_dir, keyed by the hash of the
+    map, or builds it if it has not been built yet for this map and cluster size.
+    The hierarchy is then used by plan() for the 'hierarchical' planner.
+
+    """
+
+    path = None
+    if cache_dir is not None:
+        path = os.path.join(cache_dir, f'hierarchy_{map_key(image)[:16]}_cluster{cluster_size}.npz')
+
+    if path is not None and os.path.isfile(path):
+        hierarchy = Hierarchy.load(path)
+    else:
+        hierarchy = hierarchy_build(image, cluster_size)
+        if path is not None:
+            os.makedirs(cache_dir, exist_ok = True)
+            hierarchy.save(path)
+
+    hierarchies[map_key(image)] = hierarchy
+
+    return hierarchy
+
+def suboptimality(hierarchy, image, pairs, margin = 1):
+
+    """
+    Compares the hierarchical planner with the exact distance, as found by
+    dijkstra(), for a list of (start, goal) pairs in (x, y) format.
+
+    Returns a dictionary of the ratio of the hierarchical distance to the exact
+    distance, and of the bound reported by the planner, for every pair that can
+    be reached, along with the largest and mean of each.
+
+    """
+
+    ratios, bounds = [], []
+    for start, goal in pairs:
+        _, dist, bound = hierarchy.plan(image, start, goal, margin)
+        exact = start_distance(distance_field(image, goal), image, start)
+        if dist is not None and np.isfinite(exact) and exact > 0:
+            ratios.append(dist / exact)
+            bounds.append(bound)
+
+    ratios, bounds = np.array(ratios), np.array(bounds)
+    return {'ratio': ratios, 'bound': bounds,
+            'max_ratio': ratios.max(initial = 1.0), 'mean_ratio': ratios.mean() if len(ratios) else 1.0,
+            'max_bound': bounds.max(initial = 1.0), 'mean_bound': bounds.mean() if len(bounds) else 1.0}
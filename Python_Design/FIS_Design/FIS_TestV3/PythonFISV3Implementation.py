@@ -20,167 +20,39 @@ import random
 import math as m
 import heapq
 from PythonFISFunctionV3 import *
+from PythonFISV3LookupTable import *
+from PythonFISFileLoader import *
+from PythonFISV3PathPlanning import *
+from PythonFISV3Allocation import *
+from PythonFISV3Fleet import *
+from PythonFISV3MapArtifact import *
+from PythonFISV3Hierarchical import *
 import pandas as pd
 import tkinter as tk
 import time
 
 ################# Function & Class Definition ###################
 
-class Robot:
-    """
-    This is a simplistic robot class for use in the FIS, it is 
-    used to create robotic objects. A robot consists of:
-    - an ID tag, for referencing
-    - a sensor type, either imagery, measurement, or both
-    - a load history, which denotes how many times the robot has 
-      gone to the task site
-    - their position within space
-    - a travel distance, which represents how far a robot has to travel to the task site
-    - a total travel distance that they have travelled overall
-    - a weight, which is used to quantify the impact of their travelling
-    - a suitability, which is to be calculated using the FIS
-    - a colour used in plotting
-    """
-    
-    # constructor for robot objects:
-    def __init__(self, id, sensor, position):
-        self.id = id            # id tag for referencing
-        self.sensor = sensor    # type of sensor the robot is equipped with
-        self.load = 0.0             # load history of robot
-        self.position = position    # current position of robot
-        self.travel = 0.0       # distance robot must travel to task site
-        self.total = 0.0        # total distance that robot has travelled
-        self.weight = 1.0       # movement weight, ignored if 1
-        self.suitability = 0.0     # suitability
-        if self.sensor == 'Imagery':
-            # blue
-            blue_list = [(149, 168, 255), (56, 182, 255), (138, 199, 235), (16, 180, 230)]
-            index = random.randint(0, len(blue_list)-1)
-            self.colour = blue_list[index]
-
-        if self.sensor == 'Measurement':
-            # green
-            green_list = [(117, 240, 150), (98, 181, 119), (31, 219, 78), (79, 209, 125)]
-            index = random.randint(0, len(green_list)-1)
-            self.colour = green_list[index]
-
-
-
-    # for querying robots:
-    def display_robot_info(self):
-        return (f"Robot ID: {self.id}\n"
-                f"Position: {self.position}\n"
-                f"Sensor Type: {self.sensor}\n"
-                f"Load History: {self.load}\n"
-                f"Travelled Distance: {self.travel}\n"
-                f"Suitability: {self.suitability}")
-
 def read_map(map_str, resolution):
 
     # get cwd, list all directories and append to the file path of the maps
     current_dir = os.getcwd()
     file_path = os.path.join(current_dir, "Python_Design", "FIS_Design", "maps", str(map_str))
 
-    # check if that map exists, read image if it does
+    # check if that map exists
     if not os.path.isfile(file_path):
         sys.exit('No such file exists')
-    else: 
-        image = cv2.imread(file_path,0)
-
-    # load the map and dilate the borders to get a buffered image for navigation:
-    image_rgb = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
-    buffered_image, spawn_locations = add_buffer(image, buffer)
-
-    return image_rgb, buffered_image
-
-def dijkstra(image, start, goal):
-
-    # first need to get the dimensionality of the image:
-    rows, cols = image.shape
-
-    # swap the (x, y) input to (y, x) format for internal use - cv2 has y,x notation
-    start = (start[1], start[0])  # swap (x, y) -> (y, x)
-    goal = (goal[1], goal[0])     # swap (x, y) -> (y, x)
-
-    # need to initialize both the distance map and the previous node map:
-    dist = np.full((rows,cols), np.inf)  # set other distances to a very big number
-    dist[start] = 0                      # set the initial starting distance to 0
-
-    # need to track the parent of each node such that the resulting path can be reconstructed:
-    parent = {start: None}
-
-    # start the priority queue to store the distance values in x and y:
-    pq = [(0, start)]
-
-    # encode the directions that the robot can move, assuming 8 options of movement at each given
-    # node, 45 degree offsets (holonomic movement):
-    directions = [
-        (-1,0), (1,0), (0,-1), (0,1),    # left, right, down, up
-        (-1,-1), (-1,1), (1,-1), (1,1)   # diagonals
-    ]
-
-    # define a set for the visited node:
-    visited = set()
-
-    while pq:
-        current_dist, (x, y) = heapq.heappop(pq)
-        
-        # if the node has already been visited, skip it
-        if (x, y) in visited:
-            continue
-        visited.add((x, y))
-        
-        # if we reached the goal, reconstruct the path:
-        if (x, y) == goal:
-            path = []
-            while (x,y) != start:
-                path.append((y,x))
-                x,y = parent[(x,y)]
-            path.append((start[1],start[0]))
-            return path[::-1], dist[goal] # reverse path 
-        
-    # explore neighbors
-        for dx, dy in directions:
-            nx, ny = x + dx, y + dy
-            if 0 <= nx < rows and 0 <= ny < cols and (nx, ny) not in visited:
-                # ignore black borders
-                if image[nx, ny] >= 254:  # threshold for white space
-                    # calculate the movement cost
-                    movement_cost = m.sqrt(2) if dx != 0 and dy != 0 else 1
-                    new_dist = current_dist + movement_cost
-                    
-                    # if a shorter path is found, update the distance and push to pq
-                    if new_dist < dist[nx, ny]:
-                        dist[nx, ny] = new_dist
-                        parent[(nx,ny)] = (x,y)
-                        heapq.heappush(pq, (new_dist, (nx, ny)))
-    
-    return None, None # if goal unreachable
-
-def add_buffer(image, buffer_size):
 
-    # create a binary mask where black (0) and gray (205) areas are marked
-    mask = np.where((image == 0) | (image == 205), 1, 0).astype(np.uint8)
-    
-    # create a kernel for dilation (buffer expansion)
-    kernel = np.ones((buffer_size, buffer_size), np.uint8)
-    
-    # dilate the mask (expand obstacles)
-    dilated_mask = cv2.dilate(mask, kernel, iterations=1)
-    
-    # create a new image where dilated areas are treated as non-navigable (set to black)
-    buffered_image = image.copy()
-    buffered_image[dilated_mask == 1] = 0  # set dilated areas to black (0)
+    # load the compiled map, which is buffered for navigation and compiled once for each map and buffer:
+    cache_dir = os.path.join(current_dir, "Python_Design", "FIS_Design", "cache")
+    compiled = compile_map(file_path, buffer, cache_dir)
 
-    # white space detection:
-    spawn_locations = np.flip(np.column_stack(np.where(np.flipud(buffered_image) >= 254)),axis = 1)
-    
-    return buffered_image, spawn_locations
+    return compiled.image_rgb, compiled.buffered
 
 def draw_circles_on_image(image):
 
     # for every robot:
-    for robot in robots.values(): 
+    for robot in robots: 
         # extract robot position
         position = robot.position
 
@@ -219,7 +91,7 @@ def initialize_plot():
 
     # scatter in the corner for legend 
     plt.scatter(0,0, color = (1, 0, 0), label = 'Task')
-    for id, robot in robots.items():
+    for robot in robots:
         plt.scatter(0,0, color = (robot.colour[0]/255, robot.colour[1]/255, robot.colour[2]/255), label = f'ID: {robot.id} - {robot.sensor}')  
     plt.legend(loc='upper center', bbox_to_anchor=(0.5, -0.05), fancybox = True, ncol = 5)
 
@@ -229,16 +101,21 @@ def initialize_plot():
 resolution = 0.05               # resolution of the map, slam_toolbox default
 map_str = "warehouse_map.png"   # string value of the map name
 visualize = True                # whether to view or not
+headless = False                # whether to skip all rendering and per task printing, for fast simulation
+use_lut = False                 # whether to score robots with the precomputed lookup table of the FIS, or of fis_file if given
+fis_file = None                 # MATLAB .fis file to run instead of fis_create(), e.g. "MATLAB_FIS_V3.fis"
+planner = "field"               # path planner to use, one of "field", "cached", "astar", "dijkstra", or "hierarchical"
+precompute = True               # whether to precompute and cache the distance fields to every location, for the field planner
 buffer = 10                     # distance in pixels that obstacles should be avoided
 
 nr = 4                      # number of robots in the MRS
 x = 2                       # number of camera equipped robots within the MRS
 y = nr - x                  # number of measurement equipped robots within the MRS
 task_num = 10               # number of task sites and ultimately the length of the simulation
-robots = {}                 # empty dictionary to hold robot objects once created
+seed = None                 # seed for repositioning the robots at each task, random if None
 
-bid = np.zeros((nr,3), dtype = object)      # empty array to store robot bids
 cumulative_distance = 0                     # cumulative weighted travel distance amongst all robots, initialized
+round_bounds = []                           # worst suboptimality bound of the hierarchical planner in each round
 # allocation_times = []                       # empty list for appending allocation times
 
 # determine task and robot sites:
@@ -267,132 +144,112 @@ match map_str:
         tasks = locations[0:task_num]
         positions = locations[task_num::]   
 
-# spawn robots based on the user defined mission parameters:
-for num in range(1, nr+1):
-    robot_name = f"Robot {num}"
-
-    # if we haven't exceeded the number of imagery robots
-    if num <= x:
-        robots[robot_name] = Robot(
-            id = num,
-            sensor = "Imagery",
-            position = positions[num-1],
-        )
-    # else make measurement robots    
-    else:
-        robots[robot_name] = Robot(
-            id = num,
-            sensor = "Measurement",
-            position = positions[num-1],
-        )
+# spawn robots based on the user defined mission parameters, camera equipped robots first:
+robots = Fleet.spawn(x, y, positions, seed = seed)
 
 # initialize map:
 image_rgb, buffered_image = read_map(map_str, resolution)
 
+# load the distance fields to every location, computed and cached on the first run for this map and buffer:
+cache_dir = os.path.join(os.getcwd(), "Python_Design", "FIS_Design", "cache")
+if planner == "field" and precompute == True:
+    location_data = location_distances(buffered_image, locations, buffer, cache_dir)
+
+# load the hierarchy of the map for the hierarchical planner, built and cached on the first run for this map and buffer:
+if planner == "hierarchical":
+    hierarchy = hierarchy_create(buffered_image, cache_dir)
+
+# a headless simulation does no rendering at all:
+if headless == True:
+    visualize = False
+
 # initialize plot:
-initialize_plot()
+if visualize == True:
+    initialize_plot()
+
+# log of every robot in every allocation round, preallocated and turned into a dataframe at the end:
+log = RoundLog(len(tasks), nr)
 
-# create fuzzy inference rulebase:
+# create fuzzy inference rulebase, compile it once for reuse:
 rulebase = fis_create()
+fis = CompiledFIS(rulebase)
 
-for current_task in tasks:
+# run the MATLAB rulebase directly if a .fis file was given:
+if fis_file is not None:
+    fis = fis_load(os.path.join(os.getcwd(), "MATLAB_Design", "FIS Design", fis_file), cache_dir)
+
+# swap in the lookup table if requested, built and cached on the first run:
+if use_lut == True:
+    fis = lut_create(fis if fis_file is not None else fis_create_vectorized(), cache_dir)
+    print(f'using lookup table, whose largest error against the FIS over a {fis.subdivisions}x finer grid is {round(fis.verified_error, 3)}')
+
+for task_index, current_task in enumerate(tasks):
 
     # draw the markers for the initial positions of everything
-    combined_image = draw_circles_on_image(image_rgb.copy())
     if visualize == True:
+        combined_image = draw_circles_on_image(image_rgb.copy())
         plt.imshow(combined_image)
         plt.draw()
         plt.pause(0.5)
 
     # task_time_start = time.time()
 
-    # query robots and determine suitability:
-    for id, robot in robots.items():
-
-        # determine the robots starting position:
-        start = robot.position
-
-        # determine the length of the planned path:
-        shortest_path, dist = dijkstra(buffered_image, start, current_task)
+    # query every robot at once and determine suitability, the distance field to the task is computed once and shared by every robot:
+    suboptimality_bounds.clear()
+    selected = robots.allocate(fis, buffered_image, current_task, resolution, planner = planner, keep_paths = visualize)
 
-        # print(type(buffered_image))
-        # print(buffered_image.shape)
-        
-        # add the path if it exists:
-        if shortest_path is not None:
-            for x,y in shortest_path:
-                combined_image[y,x] = robot.colour
+    # keep the worst bound on the ratio of any robot's travel distance to the exact distance:
+    if planner == "hierarchical":
+        round_bounds.append(max(suboptimality_bounds, default = 1.0))
 
-        # update the robots planned travel distance:
-        robot.travel = round((dist * resolution), 3)
-
-        # need to use the fuzzy inference system to determine the suitability
-        # of a given robot for the task:
-        robot.suitability = round(fis_solve(rulebase, robot.load, robot.travel, robot.total), 2)
+    # re draw with the paths that were planned during the allocation round:
+    if visualize == True:
+        for robot, shortest_path in zip(robots, robots.paths):
 
-        # fill out the bid array:
-        bid[robot.id - 1, 0] = robot.sensor
-        bid[robot.id - 1, 1] = robot.suitability
-        bid[robot.id - 1, 2] = robot.id
+            # add the path if it exists:
+            if shortest_path is not None:
+                for px, py in shortest_path:
+                    combined_image[py, px] = robot.colour
 
-    # re draw with the path:
-    if visualize == True:
         plt.imshow(combined_image)
         plt.draw()
         plt.pause(1)
 
-    # sort the bids by highest to lowest suitability:
-    sorted_arr = bid[bid[:, 1].astype(float).argsort()[::-1]]
-
-    imagery_selected = None
-    measurement_selected = None
-
-    # choose the highest suitability for both capability types:
-    for row in sorted_arr:
-        if row[0] == 'Imagery' and imagery_selected is None:
-            imagery_selected = row
-        elif row[0] == 'Measurement' and measurement_selected is None:
-            measurement_selected = row
-    
-        if imagery_selected is not None and measurement_selected is not None:
-            break
-
     # task_time_end = time.time() - task_time_start
     # allocation_times.append(task_time_end)
 
-   # these robots have been selected, send them to the task site and update:
-    for id, robot in robots.items():
-        if robot.id == imagery_selected[2] or robot.id == measurement_selected[2]:
-
-            # increment the load history of the robot:
-            robot.load += 1
+    # the highest suitability for both capability types have been selected, send them to the task site, which increments their
+    # load history and total travel distance, and randomly updates their position to within the task location:
+    cumulative_distance += robots.send(selected.values(), current_task, jitter = 10)
 
-            # randomly update the robot position to within the task location:
-            robot.position = (current_task[0] + random.randint(-10,10), current_task[1] + random.randint(-10,10))
-
-            # increment the robots individual total travel distance:
-            robot.total += robot.travel
-
-            # keep track of the total distance that all robots have travelled:
-            cumulative_distance += robot.travel
+    # log the robot data of this round:
+    log.append(task_index, robots.ids, robots.sensors, robots.loads, robots.travel, robots.totals, robots.suitability, selected)
 
     # print robot data in terminal:
-    robots_data = [
-    {'Robot ID': robot.id, 'Sensor Type': robot.sensor, 'Load History': robot.load, 'Distance to Task': robot.travel, 'Total Distance Travelled': robot.total,
-     'Suitability': robot.suitability}
-    for robot in robots.values()
-    ]
-
-    df = pd.DataFrame(robots_data)
-    print(df.to_string(index = False, justify = 'center'))
+    if headless == False:
+        round_data = pd.DataFrame(log.last()).drop(columns = ['Task', 'Selected'])
+        print(round_data.to_string(index = False, justify = 'center'))
+        if planner == "hierarchical":
+            print(f'travel distances are within {round(round_bounds[-1], 3)}x of the exact distance')
 
     # draw after positions have been updated:
-    combined_image = draw_circles_on_image(image_rgb.copy())
     if visualize == True:
+        combined_image = draw_circles_on_image(image_rgb.copy())
         plt.imshow(combined_image)
         plt.draw()
         plt.pause(1)
 
+# build the dataframe of every round once, and take the robot data after the final round:
+results_df = log.to_dataframe()
+df = results_df[results_df['Task'] == task_index].drop(columns = ['Task', 'Selected'])
+if headless == True:
+    print(df.to_string(index = False, justify = 'center'))
+
+# print the number of nodes expanded by the planner:
+print(f'nodes expanded by the {planner} planner: {node_expansions[planner]}')
+if planner == "hierarchical":
+    print(f'suboptimality bound of the travel distances, worst: {round(max(round_bounds), 3)}, mean over rounds: {round(np.mean(round_bounds), 3)}')
+
 # loads = df['Load History'].std()
 # total_travel = df['Total Distance Travelled'].std()
 # avg_time = sum(allocation_times) / len(allocation_times)
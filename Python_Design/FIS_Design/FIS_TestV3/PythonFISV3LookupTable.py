@@ -0,0 +1,220 @@
+"""
+
+This program is a lookup table (LUT) version of the Fuzzy Inference System (FIS)
+that was first designed within MATLAB, using the Fuzzy Logic Designer.
+
+This file serves to host the functions that are used to precompute the FIS.
+
+The V3 FIS is a fixed, smooth map from a bounded box of inputs to a suitability:
+    - Load History:             0 to 10
+    - Distance to Task:         0 to 25
+    - Total Distance Travelled: 0 to 50
+so it can be sampled once on a grid, stored on disk as a compact float32 array,
+and then queried through trilinear interpolation at a fraction of the cost of
+solving the FIS. When the table is built, it is verified against the exact FIS
+over a grid that is several times finer than the table, such that every cell is
+checked at a dense set of points, and the largest error found is stored
+alongside it. This is the largest error over the points that were checked rather
+than a strict bound: the centroid of the FIS has kinks wherever a rule starts to
+fire or a term is cut, so the error can peak slightly higher between the points.
+
+Each table is keyed by the hash of the rulebase that it was built from, so an
+edited rulebase or a different .fis file is never served a stale table.
+
+"""
+######################## Import Packages ########################
+
+import os
+import json
+import numpy as np
+from PythonFISVectorized import *
+
+####################### Define Classes ##########################
+
+class SuitabilityLUT:
+    """
+    This is a lookup table for the FIS, used in place of the FIS when scoring
+    robots. A lookup table consists of:
+    - a float32 table of suitabilities, sampled on a regular grid over the inputs
+    - the range of each input that the grid spans
+    - the largest error of the table against the exact FIS over the finer grid
+      that it was verified on, along with how many times finer that grid is, if
+      it was verified
+    """
+
+    # constructor for lookup table objects:
+    def __init__(self, table, ranges, verified_error = None, subdivisions = None):
+        self.table = table                                      # (n_lh, n_dtt, n_tdt) table of suitabilities
+        self.ranges = np.asarray(ranges, dtype = float)         # (3, 2) range of each input
+        self.shape = np.array(table.shape)                      # number of grid points along each input
+        self.steps = (self.ranges[:, 1] - self.ranges[:, 0]) / (self.shape - 1)   # grid spacing along each input
+        self.verified_error = verified_error                    # largest absolute error against the exact FIS over the verification grid
+        self.subdivisions = subdivisions                        # times finer than the table that the verification grid is
+
+        # plain python copies for the scalar lookup, which avoids numpy overhead:
+        self._lo = self.ranges[:, 0].tolist()
+        self._hi = self.ranges[:, 1].tolist()
+        self._steps = self.steps.tolist()
+        self._last = (self.shape - 2).tolist()
+        self.rulebase = None                                    # hash of the rulebase that the table was built from
+
+    # interpolate a batch of samples:
+    def solve_batch(self, inputs):
+        """
+        Accepts an array of shape (num_samples, 3), such as:
+            [[Load History, Distance to Task, Total Distance Travelled], ...]
+        and returns the (num_samples, ) interpolated suitabilities.
+        """
+        inputs = np.atleast_2d(np.asarray(inputs, dtype = float))
+
+        # position of each sample within the grid, clipped to its bounds:
+        inputs = np.clip(inputs, self.ranges[:, 0], self.ranges[:, 1])
+        position = (inputs - self.ranges[:, 0]) / self.steps
+
+        # index of the lower corner of the surrounding cell, and the fraction across it:
+        index = np.minimum(position.astype(int), self.shape - 2)
+        fraction = position - index
+        i, j, k = index.T
+        fx, fy, fz = fraction.T
+
+        # trilinear interpolation between the eight corners of the cell:
+        t = self.table
+        c00 = t[i, j, k] * (1 - fx) + t[i + 1, j, k] * fx
+        c01 = t[i, j, k + 1] * (1 - fx) + t[i + 1, j, k + 1] * fx
+        c10 = t[i, j + 1, k] * (1 - fx) + t[i + 1, j + 1, k] * fx
+        c11 = t[i, j + 1, k + 1] * (1 - fx) + t[i + 1, j + 1, k + 1] * fx
+        c0 = c00 * (1 - fy) + c10 * fy
+        c1 = c01 * (1 - fy) + c11 * fy
+
+        return c0 * (1 - fz) + c1 * fz
+
+    # interpolate a single robot, as with fis_solve():
+    def solve(self, load, distance, total_travel):
+        cell = []
+        fraction = []
+
+        # position within the grid along each input:
+        for value, lo, hi, step, last in zip((load, distance, total_travel), self._lo, self._hi, self._steps, self._last):
+            position = (min(max(value, lo), hi) - lo) / step
+            index = min(int(position), last)
+            cell.append(index)
+            fraction.append(position - index)
+
+        # pull the eight corners of the cell in one slice:
+        i, j, k = cell
+        fx, fy, fz = fraction
+        (c000, c001), (c010, c011) = self.table[i, j:j+2, k:k+2].tolist()
+        (c100, c101), (c110, c111) = self.table[i + 1, j:j+2, k:k+2].tolist()
+
+        # trilinear interpolation:
+        c00 = c000 * (1 - fx) + c100 * fx
+        c01 = c001 * (1 - fx) + c101 * fx
+        c10 = c010 * (1 - fx) + c110 * fx
+        c11 = c011 * (1 - fx) + c111 * fx
+        c0 = c00 * (1 - fy) + c10 * fy
+        c1 = c01 * (1 - fy) + c11 * fy
+
+        return c0 * (1 - fz) + c1 * fz
+
+    # save the table and its settings:
+    def save(self, path):
+        np.save(path, self.table)
+
+        # the settings are saved next to the table as a JSON:
+        with open(os.path.splitext(path)[0] + '.json', 'w') as f:
+            json.dump({'shape': self.shape.tolist(), 'ranges': self.ranges.tolist(), 'verified_error': self.verified_error,
+                       'subdivisions': self.subdivisions, 'rulebase': self.rulebase}, f, indent = 4)
+
+    # load a saved table, memory mapped such that only the cells that are queried are read:
+    @classmethod
+    def load(cls, path, mmap = True):
+        table = np.load(path, mmap_mode = 'r' if mmap else None)
+
+        with open(os.path.splitext(path)[0] + '.json', 'r') as f:
+            settings = json.load(f)
+
+        lut = cls(table, settings['ranges'], settings.get('verified_error'), settings.get('subdivisions'))
+        lut.rulebase = settings['rulebase']
+
+        return lut
+
+####################### Define Functions ########################
+
+def lut_build(fis, shape, ranges):
+
+    """
+    Samples the FIS once on a regular grid of the given shape, spanning the given
+    range of each input, and returns the resulting lookup table.
+
+    """
+
+    # grid points along each input:
+    axes = [np.linspace(lo, hi, n) for (lo, hi), n in zip(ranges, shape)]
+    grid = np.stack(np.meshgrid(*axes, indexing = 'ij'), axis = -1).reshape(-1, 3)
+
+    # solve the FIS at every grid point:
+    table = fis.solve_batch(grid).reshape(shape).astype(np.float32)
+
+    lut = SuitabilityLUT(table, ranges)
+    lut.rulebase = fis.rulebase_key()
+
+    return lut
+
+def lut_verify(lut, fis, subdivisions = 3):
+
+    """
+    Verifies a lookup table against the exact FIS over a grid that is subdivisions
+    times finer than the table along every input, such that every cell of the
+    table is checked at (subdivisions + 1) ** 3 points, including its corners, and
+    returns the largest absolute error found.
+
+    This checks every cell densely, but is not a bound on the error between the
+    points that are checked.
+
+    """
+
+    # points of the finer grid along each input:
+    axes = [np.linspace(lo, hi, (n - 1) * subdivisions + 1) for (lo, hi), n in zip(lut.ranges, lut.shape)]
+    plane = np.stack(np.meshgrid(axes[1], axes[2], indexing = 'ij'), axis = -1).reshape(-1, 2)
+
+    # one plane of the finer grid at a time, such that the samples are never all held in memory:
+    error = 0.0
+    samples = np.empty((len(plane), 3))
+    samples[:, 1:] = plane
+    for value in axes[0]:
+        samples[:, 0] = value
+        error = max(error, float(np.max(np.abs(lut.solve_batch(samples) - fis.solve_batch(samples)))))
+
+    return error
+
+def lut_create(fis, cache_dir, shape = (41, 101, 101), ranges = ((0, 10), (0, 25), (0, 50)), subdivisions = 3):
+
+    """
+    Loads the lookup table of the FIS from cache_dir, or builds it from the FIS and
+    saves it if it has not been built yet for this rulebase and grid. The FIS must
+    be a vectorized FIS, such as from fis_create_vectorized() or fis_load().
+
+    The default grid has a spacing of 0.25 for the load history and distance to
+    task, and 0.5 for the total distance travelled, which is ~1.7 MB on disk. It
+    is verified on a grid that is subdivisions times finer, which takes around
+    half a minute when the table is first built.
+
+    """
+
+    grid = f'{"x".join(str(n) for n in shape)}_{"_".join(f"{lo:g}-{hi:g}" for lo, hi in ranges)}'
+    path = os.path.join(cache_dir, f'lut_{fis.rulebase_key()[:16]}_{grid}.npy')
+
+    # load the table if it has already been built and verified for this rulebase and grid:
+    if os.path.isfile(path) and os.path.isfile(os.path.splitext(path)[0] + '.json'):
+        lut = SuitabilityLUT.load(path)
+        if lut.verified_error is not None:
+            return lut
+
+    # otherwise sample the FIS, verify the table against it, and save it:
+    os.makedirs(cache_dir, exist_ok = True)
+    lut = lut_build(fis, shape, ranges)
+    lut.verified_error = lut_verify(lut, fis, subdivisions)
+    lut.subdivisions = subdivisions
+    lut.save(path)
+
+    return SuitabilityLUT.load(path)
@@ -0,0 +1,250 @@
+"""
+
+This program compiles the maps that are used within the FIS testing into a
+cached artifact, such that they do not need to be processed on every run.
+
+Reading a map involves loading the PNG, converting it to RGB, dilating the
+obstacles by the buffer size and finding the white space, and every planner then
+re-derives the neighbours of each cell from the pixel thresholds. Instead, a map
+and buffer size are compiled once into a directory of .npy files:
+    - the RGB map, and the buffered map that the planners run on
+    - a flat index of the free cells, which numbers the nodes of the graph
+    - the navigation graph in compressed sparse row (CSR) format, where the
+      neighbours of node i are indices[indptr[i]:indptr[i + 1]], and whether
+      each move is straight (0) or diagonal (1) is held in moves, one byte each
+    - the spawn locations, which are every free cell in (x, y) format
+
+The artifact is keyed by the hash of the PNG and the buffer size, and is memory
+mapped when it is loaded, such that starting a simulation and enumerating the
+neighbours of a cell are nearly free.
+
+The distance fields of a compiled map are searched over the CSR arrays as they
+are, without copying them into Python objects. Rather than popping one node at
+a time from a priority queue, every node whose distance improved is relaxed at
+once with NumPy, over all of its edges, until no distance improves. This is the
+Bellman-Ford method run from a frontier, which gives the same exact distances
+as a Dijkstra search, and as nearly every node only improves once on these
+maps, it does about the same amount of work in a few hundred array operations.
+
+"""
+######################## Import Packages ########################
+
+import os
+import json
+import hashlib
+import math as m
+import numpy as np
+import cv2
+from PythonFISV3PathPlanning import *
+
+####################### Define Classes ##########################
+
+class CompiledMap:
+    """
+    This is a compiled map, which consists of:
+    - the RGB map, used for drawing
+    - the buffered map, used by the planners
+    - the flat index of the free cells
+    - the CSR navigation graph over the free cells
+    - the spawn locations
+    """
+
+    # arrays that make up the artifact, each saved as its own .npy file:
+    array_names = ['image_rgb', 'buffered', 'free_cells', 'indptr', 'indices', 'moves', 'spawn_locations']
+
+    # cost of each class of move, straight or diagonal:
+    move_costs = np.array([1.0, m.sqrt(2)])
+
+    # constructor for compiled maps:
+    def __init__(self, arrays, shape, buffer):
+        self.image_rgb = arrays['image_rgb']            # (rows, cols, 3) RGB map
+        self.buffered = arrays['buffered']              # (rows, cols) buffered map
+        self.free_cells = arrays['free_cells']          # flat id of the cell of each node
+        self.indptr = arrays['indptr']                  # CSR row pointers, (num_nodes + 1, )
+        self.indices = arrays['indices']                # CSR neighbour nodes
+        self.moves = arrays['moves']                    # CSR move classes, 0 for straight and 1 for diagonal
+        self.spawn_locations = arrays['spawn_locations']    # every free cell, in (x, y) format
+        self.shape = tuple(shape)                       # (rows, cols) of the map
+        self.buffer = buffer                            # buffer size the map was compiled with
+
+    # node of a cell, in (x, y) format, or -1 if the cell is not free:
+    def node(self, cell):
+        flat = cell[1] * self.shape[1] + cell[0]
+        index = int(np.searchsorted(self.free_cells, flat))
+        return index if index < len(self.free_cells) and self.free_cells[index] == flat else -1
+
+    # cell of a node, in (x, y) format:
+    def cell(self, node):
+        y, x = divmod(int(self.free_cells[node]), self.shape[1])
+        return (x, y)
+
+    # neighbours of a node, along with the cost of each move:
+    def neighbours(self, node):
+        start, end = self.indptr[node], self.indptr[node + 1]
+        return self.indices[start:end], self.move_costs[self.moves[start:end]]
+
+    # distance field to a goal, in the same format as compute_distance_field():
+    def distance_field(self, goal):
+        """
+        Runs a one-to-all search from the goal over the CSR graph, relaxing every
+        edge of the nodes whose distance improved at once, such that no bounds or
+        pixel thresholds are checked during the search.
+        """
+        rows, cols = self.shape
+        field = np.full(rows * cols, np.inf)
+        source = self.node(goal)
+
+        # as with dijkstra(), a goal that is not white space can only be reached from itself:
+        if source < 0:
+            field[goal[1] * cols + goal[0]] = 0
+            return field.reshape(rows, cols)
+
+        dist = np.full(len(self.free_cells), np.inf)
+        dist[source] = 0.0
+        frontier = np.array([source])
+
+        while len(frontier):
+            node_expansions['field'] += len(frontier)
+
+            # every edge out of the frontier, found from the row pointers of its nodes:
+            starts = self.indptr[frontier]
+            counts = self.indptr[frontier + 1] - starts
+            edges = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+
+            # keep the moves that give a shorter distance, and relax them:
+            new_dist = np.repeat(dist[frontier], counts) + self.move_costs[self.moves[edges]]
+            neighbours = self.indices[edges]
+            shorter = new_dist < dist[neighbours]
+            neighbours, new_dist = neighbours[shorter], new_dist[shorter]
+            np.minimum.at(dist, neighbours, new_dist)
+
+            # the nodes whose distance improved are searched next:
+            frontier = np.unique(neighbours)
+
+        field[self.free_cells] = dist
+        return field.reshape(rows, cols)
+
+    # save the artifact into a directory:
+    def save(self, path, meta):
+        os.makedirs(path, exist_ok = True)
+        for name in self.array_names:
+            np.save(os.path.join(path, f'{name}.npy'), getattr(self, name))
+
+        # the settings are saved last, such that a partly written artifact is never loaded:
+        with open(os.path.join(path, 'map.json'), 'w') as f:
+            json.dump(meta, f, indent = 4)
+
+    # load a saved artifact, memory mapped:
+    @classmethod
+    def load(cls, path, mmap = True):
+        with open(os.path.join(path, 'map.json'), 'r') as f:
+            meta = json.load(f)
+
+        arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode = 'r' if mmap else None) for name in cls.array_names}
+        compiled = cls(arrays, meta['shape'], meta['buffer'])
+
+        # let distance_field() search this map over its graph, without hashing the map again:
+        compiled_maps[map_key(compiled.buffered, meta['map_key'])] = compiled
+
+        return compiled
+
+####################### Define Functions ########################
+
+def add_buffer(image, buffer_size):
+
+    # create a binary mask where black (0) and gray (205) areas are marked
+    mask = np.where((image == 0) | (image == 205), 1, 0).astype(np.uint8)
+
+    # create a kernel for dilation (buffer expansion)
+    kernel = np.ones((buffer_size, buffer_size), np.uint8)
+
+    # dilate the mask (expand obstacles)
+    dilated_mask = cv2.dilate(mask, kernel, iterations=1)
+
+    # create a new image where dilated areas are treated as non-navigable (set to black)
+    buffered_image = image.copy()
+    buffered_image[dilated_mask == 1] = 0  # set dilated areas to black (0)
+
+    # white space detection:
+    spawn_locations = np.flip(np.column_stack(np.where(np.flipud(buffered_image) >= 254)),axis = 1)
+
+    return buffered_image, spawn_locations
+
+def build_graph(buffered):
+
+    """
+    Builds the navigation graph of a buffered map, with the same movement model as
+    the planners, returning the flat index of the free cells and the CSR arrays,
+    where the class of each move indexes CompiledMap.move_costs.
+
+    """
+
+    rows, cols = buffered.shape
+    free = buffered >= 254
+    free_cells = np.flatnonzero(free).astype(np.int64)
+
+    # node of every cell, which is -1 for cells that are not free:
+    node_of = np.full(rows * cols, -1, dtype = np.int64)
+    node_of[free_cells] = np.arange(len(free_cells))
+    x, y = np.divmod(free_cells, cols)
+
+    # every move out of every free cell, onto a free cell within the map:
+    sources, targets, move_classes = [], [], []
+    for dx, dy in directions:
+        nx, ny = x + dx, y + dy
+        inside = (nx >= 0) & (nx < rows) & (ny >= 0) & (ny < cols)
+        neighbour = np.where(inside, node_of[np.clip(nx, 0, rows - 1) * cols + np.clip(ny, 0, cols - 1)], -1)
+        valid = neighbour >= 0
+        sources.append(np.flatnonzero(valid))
+        targets.append(neighbour[valid])
+        move_classes.append(np.full(valid.sum(), dx != 0 and dy != 0, dtype = np.uint8))
+
+    # sort the moves by their source node, keeping the order of the directions:
+    sources = np.concatenate(sources)
+    order = np.argsort(sources, kind = 'stable')
+    indices = np.concatenate(targets)[order].astype(np.int32)
+    moves = np.concatenate(move_classes)[order]
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(sources, minlength = len(free_cells)))]).astype(np.int64)
+
+    return free_cells, indptr, indices, moves
+
+def compile_map(map_path, buffer, cache_dir):
+
+    """
+    Loads the compiled artifact of the map at map_path with the given buffer size
+    from cache_dir, or compiles and saves it if it does not exist yet. The
+    artifact is keyed by the hash of the PNG, so an edited map is recompiled.
+
+    """
+
+    with open(map_path, 'rb') as f:
+        file_key = hashlib.sha1(f.read()).hexdigest()
+    name = os.path.splitext(os.path.basename(map_path))[0]
+    path = os.path.join(cache_dir, f'map_{name}_{file_key[:16]}_buffer{buffer}')
+
+    # artifacts written with a different set of arrays are compiled again:
+    if all(os.path.isfile(os.path.join(path, f)) for f in ['map.json'] + [f'{name}.npy' for name in CompiledMap.array_names]):
+        return CompiledMap.load(path)
+
+    # read the map and dilate the borders to get a buffered image for navigation:
+    image = cv2.imread(map_path, 0)
+    image_rgb = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
+    buffered, spawn_locations = add_buffer(image, buffer)
+
+    # index the free cells and build the navigation graph:
+    free_cells, indptr, indices, moves = build_graph(buffered)
+    arrays = {
+        'image_rgb'         : image_rgb,
+        'buffered'          : buffered,
+        'free_cells'        : free_cells,
+        'indptr'            : indptr,
+        'indices'           : indices,
+        'moves'             : moves,
+        'spawn_locations'   : spawn_locations,
+    }
+
+    meta = {'map': os.path.basename(map_path), 'file_key': file_key, 'map_key': map_key(buffered),
+            'shape': list(buffered.shape), 'buffer': buffer, 'num_nodes': len(free_cells), 'num_edges': len(indices)}
+    CompiledMap(arrays, buffered.shape, buffer).save(path, meta)
+
+    return CompiledMap.load(path)
@@ -0,0 +1,629 @@
+"""
+
+This program hosts the path planning functions that are used within the FIS
+testing, to determine how far each robot must travel to the task site.
+
+The dijkstra() function within the implementation scripts runs a full search
+from every robot to the task. Since the map is undirected, a single reverse
+search from the task instead gives the distance from every cell to the task,
+which is referred to as a distance field. Each robot then only has to look up
+its distance within the field, and its path can be cheaply extracted by
+descending the field, so the planning cost of a task does not depend on the
+number of robots.
+
+An A* planner is also provided, which uses the octile distance as its heuristic.
+This is admissible for the same move costs, so it finds paths of the same length
+as dijkstra() while expanding far fewer nodes.
+
+After a robot is sent to a task, it is repositioned within a small radius of the
+task, whose distance field is still cached. The cached planner reuses this: if
+the field to the next task is cached it is looked up directly, and otherwise, if
+the start lies within the jitter radius of a cached source, that field is used
+as a landmark for A*. By the triangle inequality, |d(c, L) - d(T, L)| is a lower
+bound on the distance from any cell c to the task T for a landmark L, which is
+tight along the path when the start is close to L, so the search stays within a
+narrow corridor rather than spreading over the whole map, while still giving the
+exact distance. Where the corridor still grows too large, A* is given up and the
+field to the task is computed and cached instead, which every later robot sent
+to the task then looks up.
+
+The movement model of every planner is the same: 8-connected, with a cost of 1
+for straight moves and sqrt(2) for diagonal moves, where only white space
+(image >= 254) can be entered. The number of nodes expanded by each planner is
+counted in node_expansions, such that the planners can be compared.
+
+Tasks and spawn points are drawn from a fixed list of candidate locations for
+each map, so the distance fields to every location, along with the matrix of
+distances between them, can be precomputed once and cached on disk. Later runs
+on the same map and buffer then load them, and do no path search at all for
+tasks placed at these locations.
+
+If a map has been compiled by PythonFISV3MapArtifact.py, its distance fields are
+searched over the precomputed navigation graph rather than over the image. For
+maps that are too large to search at the pixel level, a hierarchical planner is
+hosted within PythonFISV3Hierarchical.py.
+
+"""
+######################## Import Packages ########################
+
+import os
+import numpy as np
+import math as m
+import heapq
+import hashlib
+import weakref
+from collections import OrderedDict
+
+####################### Define Classes ##########################
+
+class LocationDistances:
+    """
+    This holds the precomputed distances for a fixed list of locations on a map,
+    which consists of:
+    - the locations, in (x, y) format
+    - the distance field to each location
+    - the matrix of distances between every pair of locations
+    """
+
+    # constructor for location distance objects:
+    def __init__(self, locations, fields, matrix):
+        self.locations = [tuple(int(v) for v in loc) for loc in locations]   # candidate locations
+        self.fields = fields                                                 # (n, rows, cols) distance field to each location
+        self.matrix = matrix                                                 # (n, n) distance from location i to location j
+        self.index = {loc: i for i, loc in enumerate(self.locations)}        # index of each location
+
+    # distance between two of the locations:
+    def distance(self, start, goal):
+        return self.matrix[self.index[tuple(start)], self.index[tuple(goal)]]
+
+    # distance field to one of the locations:
+    def field(self, goal):
+        return self.fields[self.index[tuple(goal)]]
+
+####################### Define Functions ########################
+
+# encode the directions that the robot can move, assuming 8 options of movement at each given
+# node, 45 degree offsets (holonomic movement), with the cost of each move:
+directions = [
+    (-1,0), (1,0), (0,-1), (0,1),    # left, right, down, up
+    (-1,-1), (-1,1), (1,-1), (1,1)   # diagonals
+]
+costs = [1, 1, 1, 1, m.sqrt(2), m.sqrt(2), m.sqrt(2), m.sqrt(2)]
+
+# number of nodes expanded by each planner:
+node_expansions = {'dijkstra': 0, 'astar': 0, 'field': 0, 'cached': 0, 'hierarchical': 0}
+
+# cache of distance fields, keyed by (map hash, goal):
+max_cached_fields = 64
+_field_cache = OrderedDict()
+
+# hash of every map image that has been seen, keyed by the id of the image:
+_map_keys = {}
+
+# compiled maps, keyed by map hash, whose navigation graph is searched instead of the image:
+compiled_maps = {}
+
+# hierarchies of the maps, keyed by map hash, used by the hierarchical planner:
+hierarchies = {}
+
+# bound on the suboptimality of every distance found by the hierarchical planner, cleared by the caller:
+suboptimality_bounds = []
+
+def map_key(image, key = None):
+
+    """
+    Hash of a (buffered) map image, which identifies both the map and the buffer
+    size that was applied to it.
+
+    The hash is only computed the first time an image is seen, and is then kept
+    for as long as the image exists, such that the planners can look it up on
+    every query. Maps are never edited in place once they are loaded. If the key
+    is already known, such as from a compiled map, it can be given instead.
+
+    """
+
+    # return the hash of an image that has already been seen:
+    entry = _map_keys.get(id(image))
+    if entry is not None and entry[0]() is image:
+        return entry[1]
+
+    if key is None:
+        key = hashlib.sha1(np.ascontiguousarray(image).tobytes() + str(image.shape).encode()).hexdigest()
+
+    # keep the hash until the image is garbage collected:
+    _map_keys[id(image)] = (weakref.ref(image, lambda _, index = id(image): _map_keys.pop(index, None)), key)
+
+    return key
+
+def dijkstra(image, start, goal):
+
+    # first need to get the dimensionality of the image:
+    rows, cols = image.shape
+
+    # swap the (x, y) input to (y, x) format for internal use - cv2 has y,x notation
+    start = (start[1], start[0])  # swap (x, y) -> (y, x)
+    goal = (goal[1], goal[0])     # swap (x, y) -> (y, x)
+
+    # need to initialize both the distance map and the previous node map:
+    dist = np.full((rows,cols), np.inf)  # set other distances to a very big number
+    dist[start] = 0                      # set the initial starting distance to 0
+
+    # need to track the parent of each node such that the resulting path can be reconstructed:
+    parent = {start: None}
+
+    # start the priority queue to store the distance values in x and y:
+    pq = [(0, start)]
+
+    # encode the directions that the robot can move, assuming 8 options of movement at each given
+    # node, 45 degree offsets (holonomic movement):
+    directions = [
+        (-1,0), (1,0), (0,-1), (0,1),    # left, right, down, up
+        (-1,-1), (-1,1), (1,-1), (1,1)   # diagonals
+    ]
+
+    # define a set for the visited node:
+    visited = set()
+
+    while pq:
+        current_dist, (x, y) = heapq.heappop(pq)
+        
+        # if the node has already been visited, skip it
+        if (x, y) in visited:
+            continue
+        visited.add((x, y))
+        node_expansions['dijkstra'] += 1
+        
+        # if we reached the goal, reconstruct the path:
+        if (x, y) == goal:
+            path = []
+            while (x,y) != start:
+                path.append((y,x))
+                x,y = parent[(x,y)]
+            path.append((start[1],start[0]))
+            return path[::-1], dist[goal] # reverse path 
+        
+    # explore neighbors
+        for dx, dy in directions:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < rows and 0 <= ny < cols and (nx, ny) not in visited:
+                # ignore black borders
+                if image[nx, ny] >= 254:  # threshold for white space
+                    # calculate the movement cost
+                    movement_cost = m.sqrt(2) if dx != 0 and dy != 0 else 1
+                    new_dist = current_dist + movement_cost
+                    
+                    # if a shorter path is found, update the distance and push to pq
+                    if new_dist < dist[nx, ny]:
+                        dist[nx, ny] = new_dist
+                        parent[(nx,ny)] = (x,y)
+                        heapq.heappush(pq, (new_dist, (nx, ny)))
+    
+    return None, None # if goal unreachable
+
+def astar(image, start, goal, landmark = None, max_expansions = None):
+
+    """
+    A* search from the start to the goal, using the octile distance as the heuristic.
+
+    If a landmark is given, which is the distance field to any source, the heuristic
+    is instead the larger of the octile distance and the landmark bound
+    |landmark[cell] - landmark[goal]|, which is still admissible and consistent.
+
+    The g-scores, parents and closed flags are stored in preallocated NumPy arrays
+    that are indexed by the flat id of each cell, rather than in dictionaries and
+    sets keyed by tuples.
+
+    Returns the path in (x, y) format along with its length, in the same manner as
+    dijkstra(), or (None, None) if the goal cannot be reached, or cannot be reached
+    within max_expansions expansions if it is given.
+
+    """
+
+    # first need to get the dimensionality of the image:
+    rows, cols = image.shape
+
+    # swap the (x, y) input to (y, x) format for internal use - cv2 has y,x notation
+    start = (start[1], start[0])
+    goal = (goal[1], goal[0])
+    gx, gy = goal
+    expanded = 0
+
+    # g-scores, parents and closed flags of every cell:
+    g = np.full(rows * cols, np.inf)
+    parent = np.full(rows * cols, -1, dtype = np.int64)
+    closed = np.zeros(rows * cols, dtype = bool)
+    free = (image >= 254).ravel()
+    offsets = [dx * cols + dy for dx, dy in directions]
+
+    # the landmark can only bound cells that reach its source, which the goal must also reach:
+    if landmark is not None and not np.isfinite(landmark[goal]):
+        landmark = None
+    if landmark is not None:
+        landmark_goal = landmark[goal]
+        landmark = landmark.ravel()
+
+    # octile distance, the exact cost to the goal on an empty map, raised to the landmark bound:
+    def heuristic(x, y):
+        dx, dy = abs(x - gx), abs(y - gy)
+        h = max(dx, dy) + (m.sqrt(2) - 1) * min(dx, dy)
+        if landmark is not None:
+            h = max(h, abs(landmark[x * cols + y] - landmark_goal))
+        return h
+
+    source = start[0] * cols + start[1]
+    target = goal[0] * cols + goal[1]
+    g[source] = 0.0
+
+    # the priority queue is ordered by f-score, breaking ties towards the goal:
+    pq = [(heuristic(*start), heuristic(*start), source)]
+
+    while pq:
+        _, _, node = heapq.heappop(pq)
+
+        # if the node has already been closed, skip it
+        if closed[node]:
+            continue
+        closed[node] = True
+        node_expansions['astar'] += 1
+        expanded += 1
+
+        # if we reached the goal, reconstruct the path:
+        if node == target:
+            path = []
+            while node != -1:
+                x, y = divmod(int(node), cols)
+                path.append((y, x))
+                node = parent[node]
+            return path[::-1], g[target]
+
+        # give up once the search has grown past its limit:
+        if max_expansions is not None and expanded >= max_expansions:
+            return None, None
+
+        x, y = divmod(node, cols)
+        current_dist = g[node]
+
+        # explore neighbors
+        for (dx, dy), offset, movement_cost in zip(directions, offsets, costs):
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < rows and 0 <= ny < cols:
+                neighbor = node + offset
+                if free[neighbor] and not closed[neighbor]:
+                    new_dist = current_dist + movement_cost
+
+                    # if a shorter path is found, update the g-score and push to pq
+                    if new_dist < g[neighbor]:
+                        g[neighbor] = new_dist
+                        parent[neighbor] = node
+                        h = heuristic(nx, ny)
+                        heapq.heappush(pq, (new_dist + h, h, neighbor))
+
+    return None, None # if goal unreachable
+
+def compute_distance_field(image, goal):
+
+    """
+    Runs a one-to-all Dijkstra search from the goal, returning an array of the same
+    shape as the image that holds the cost to go from every cell to the goal, which
+    is np.inf for cells that cannot reach it.
+
+    The goal is given in (x, y) format, as with dijkstra().
+
+    """
+
+    # first need to get the dimensionality of the image:
+    rows, cols = image.shape
+
+    # swap the (x, y) input to (y, x) format for internal use - cv2 has y,x notation
+    goal = (goal[1], goal[0])
+
+    # as with dijkstra(), a goal that is not white space can only be reached from itself:
+    if image[goal] < 254:
+        field = np.full((rows, cols), np.inf)
+        field[goal] = 0
+        return field
+
+    # the search is run over flat cell ids, using plain lists as they are faster to index than arrays:
+    free = (image >= 254).ravel().tolist()
+    dist = [m.inf] * (rows * cols)
+    visited = [False] * (rows * cols)
+    offsets = [dx * cols + dy for dx, dy in directions]
+
+    # start the priority queue from the goal:
+    start = goal[0] * cols + goal[1]
+    dist[start] = 0.0
+    pq = [(0.0, start)]
+
+    while pq:
+        current_dist, node = heapq.heappop(pq)
+
+        # if the node has already been visited, skip it
+        if visited[node]:
+            continue
+        visited[node] = True
+        node_expansions['field'] += 1
+
+        x, y = divmod(node, cols)
+
+        # explore neighbors
+        for (dx, dy), offset, movement_cost in zip(directions, offsets, costs):
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < rows and 0 <= ny < cols:
+                neighbor = node + offset
+                if free[neighbor] and not visited[neighbor]:
+                    new_dist = current_dist + movement_cost
+
+                    # if a shorter path is found, update the distance and push to pq
+                    if new_dist < dist[neighbor]:
+                        dist[neighbor] = new_dist
+                        heapq.heappush(pq, (new_dist, neighbor))
+
+    return np.array(dist).reshape(rows, cols)
+
+def distance_field(image, goal):
+
+    """
+    Returns the distance field to the goal, which is computed once and then cached
+    by (map, buffer, goal), such that every robot and every later task at the same
+    location reuses it.
+
+    """
+
+    key = (map_key(image), tuple(int(v) for v in goal))
+
+    # return the cached field if it exists:
+    if key in _field_cache:
+        _field_cache.move_to_end(key)
+        return _field_cache[key]
+
+    # search the navigation graph of the map if it has been compiled:
+    compiled = compiled_maps.get(key[0])
+    field = compute_distance_field(image, goal) if compiled is None else compiled.distance_field(goal)
+    field.setflags(write = False)
+
+    # cache the field, dropping the least recently used field if full:
+    _field_cache[key] = field
+    if len(_field_cache) > max_cached_fields:
+        _field_cache.popitem(last = False)
+
+    return field
+
+def start_distance(field, image, start):
+
+    """
+    Looks up the distance from the start to the goal of a distance field.
+
+    Robots are not always positioned on white space, and dijkstra() can still leave
+    a start that is not white space, so these starts take the cheapest move onto a
+    neighbour instead.
+
+    """
+
+    rows, cols = image.shape
+    x, y = start[1], start[0]
+
+    # white space, or the goal itself:
+    if image[x, y] >= 254 or field[x, y] == 0:
+        return field[x, y]
+
+    # otherwise take the cheapest move into the field:
+    best = np.inf
+    for (dx, dy), movement_cost in zip(directions, costs):
+        nx, ny = x + dx, y + dy
+        if 0 <= nx < rows and 0 <= ny < cols and image[nx, ny] >= 254:
+            best = min(best, field[nx, ny] + movement_cost)
+
+    return best
+
+def cached_field(image, goal):
+
+    """
+    Returns the cached distance field to the goal, or None if it has not been
+    computed for this map.
+
+    """
+
+    key = (map_key(image), tuple(int(v) for v in goal))
+    if key in _field_cache:
+        _field_cache.move_to_end(key)
+        return _field_cache[key]
+
+    return None
+
+def nearest_cached_source(image, start, radius):
+
+    """
+    Returns the distance field of the cached source on this map that is nearest to
+    the start, or None if no cached source lies within radius pixels of it.
+
+    """
+
+    image_key = map_key(image)
+    best, best_dist = None, radius
+    for (key, source), field in _field_cache.items():
+        if key == image_key:
+            dist = m.hypot(source[0] - start[0], source[1] - start[1])
+            if dist <= best_dist:
+                best, best_dist = field, dist
+
+    return best
+
+def plan_cached(image, start, goal, radius = 15, max_expansions = 5000):
+
+    """
+    Plans a path from the start to the goal while avoiding a global search where
+    the cached distance fields allow it:
+        - if the field to the goal is cached, such as for an earlier task at the same
+          location, the path is looked up from it
+        - if the start lies within radius pixels of a cached source, such as the
+          previous task of a robot, A* is run with that field as a landmark, which
+          only expands a narrow corridor around the path, and is given up after
+          max_expansions expansions
+        - otherwise, or if A* gives up, the field to the goal is computed and kept,
+          such that every later robot for this task looks up its path from it
+
+    Returns the path in (x, y) format along with its length, in the same manner as
+    dijkstra().
+
+    """
+
+    expanded = (node_expansions['astar'], node_expansions['field'])
+
+    field = cached_field(image, goal)
+    result = extract_path(field, image, start) if field is not None else (None, None)
+    if field is None:
+        landmark = nearest_cached_source(image, start, radius)
+        if landmark is not None:
+            result = astar(image, start, goal, landmark, max_expansions)
+        if result[0] is None:
+            result = extract_path(distance_field(image, goal), image, start)
+
+    # the searches are counted under this planner only, rather than also under astar and field:
+    searched = (node_expansions['astar'] - expanded[0], node_expansions['field'] - expanded[1])
+    node_expansions['astar'], node_expansions['field'] = expanded
+    node_expansions['cached'] += sum(searched)
+
+    return result
+
+def start_distances(field, image, starts):
+
+    """
+    Looks up the distance from every start to the goal of a distance field at once,
+    where starts is an array of (x, y) positions, in the same manner as
+    start_distance().
+
+    """
+
+    rows, cols = image.shape
+    starts = np.asarray(starts, dtype = int).reshape(-1, 2)
+    x, y = starts[:, 1], starts[:, 0]
+    dist = field[x, y].astype(float)
+
+    # starts that are not white space, or the goal itself, take the cheapest move into the field:
+    off = (image[x, y] < 254) & (dist != 0)
+    if off.any():
+        x, y = x[off], y[off]
+        best = np.full(len(x), np.inf)
+        for (dx, dy), movement_cost in zip(directions, costs):
+            nx, ny = x + dx, y + dy
+            inside = (nx >= 0) & (nx < rows) & (ny >= 0) & (ny < cols)
+            nx, ny = np.clip(nx, 0, rows - 1), np.clip(ny, 0, cols - 1)
+            best = np.minimum(best, np.where(inside & (image[nx, ny] >= 254), field[nx, ny] + movement_cost, np.inf))
+        dist[off] = best
+
+    return dist
+
+def extract_path(field, image, start):
+
+    """
+    Extracts the shortest path from the start to the goal of a distance field, by
+    repeatedly moving to the neighbour that minimizes the cost of the move plus the
+    distance to go.
+
+    Returns the path in (x, y) format along with its length, in the same manner as
+    dijkstra(), or (None, None) if the goal cannot be reached.
+
+    """
+
+    rows, cols = image.shape
+    dist = start_distance(field, image, start)
+
+    # check if the goal is reachable:
+    if not np.isfinite(dist):
+        return None, None
+
+    # descend the field until the goal is reached:
+    x, y = start[1], start[0]
+    path = [(y, x)]
+    while field[x, y] != 0:
+        best = None
+        best_dist = np.inf
+        for (dx, dy), movement_cost in zip(directions, costs):
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < rows and 0 <= ny < cols and image[nx, ny] >= 254:
+                new_dist = field[nx, ny] + movement_cost
+                if new_dist < best_dist:
+                    best, best_dist = (nx, ny), new_dist
+        x, y = best
+        path.append((y, x))
+
+    return path, dist
+
+def plan(image, start, goal, planner = 'field'):
+
+    """
+    Plans a path from the start to the goal with the chosen planner, which is one of:
+        - 'field': the cached distance field to the goal
+        - 'cached': the cached field to the goal, or A* with a nearby cached field as a landmark
+        - 'astar': A* with the octile heuristic
+        - 'dijkstra': a full Dijkstra search from the start
+        - 'hierarchical': the hierarchy of the map, built by PythonFISV3Hierarchical.py
+
+    Returns the path in (x, y) format along with its length.
+
+    """
+
+    if planner == 'field':
+        return extract_path(distance_field(image, goal), image, start)
+    elif planner == 'cached':
+        return plan_cached(image, start, goal)
+    elif planner == 'astar':
+        return astar(image, start, goal)
+    elif planner == 'dijkstra':
+        return dijkstra(image, start, goal)
+    elif planner == 'hierarchical':
+        hierarchy = hierarchies.get(map_key(image))
+        if hierarchy is None:
+            raise ValueError('No hierarchy has been built for this map, see hierarchy_create()')
+        path, dist, bound = hierarchy.plan(image, start, goal)
+        if bound is not None:
+            suboptimality_bounds.append(bound)
+        return path, dist
+    else:
+        raise ValueError(f'Unrecognized planner: {planner}')
+
+def location_distances(image, locations, buffer, cache_dir):
+
+    """
+    Returns the distance fields to every location, and the matrix of distances
+    between them, for the given buffered map.
+
+    These are computed once and saved as a compressed .npz within cache_dir, keyed
+    by the hash of the map and the buffer size, such that later runs only load
+    them. The fields are also placed in the distance field cache, so distance_field()
+    and plan() do no search for tasks at these locations.
+
+    """
+
+    locations = sorted(tuple(int(v) for v in loc) for loc in locations)
+    image_key = map_key(image)
+    path = os.path.join(cache_dir, f'locations_{image_key[:16]}_buffer{buffer}.npz')
+
+    # load the cached distances if they were computed for the same locations:
+    distances = None
+    if os.path.isfile(path):
+        with np.load(path) as data:
+            if [tuple(loc) for loc in data['locations'].tolist()] == locations:
+                distances = LocationDistances(locations, data['fields'], data['matrix'])
+
+    # otherwise run one distance field per location, over the navigation graph if the map has been compiled:
+    if distances is None:
+        compiled = compiled_maps.get(image_key)
+        fields = np.stack([compute_distance_field(image, loc) if compiled is None else compiled.distance_field(loc)
+                           for loc in locations])
+        matrix = np.array([[start_distance(fields[j], image, start) for j in range(len(locations))]
+                           for start in locations])
+
+        os.makedirs(cache_dir, exist_ok = True)
+        np.savez_compressed(path, locations = np.array(locations), fields = fields, matrix = matrix)
+        distances = LocationDistances(locations, fields, matrix)
+
+    # share the fields with distance_field():
+    for loc, field in zip(distances.locations, distances.fields):
+        field.setflags(write = False)
+        _field_cache[(image_key, loc)] = field
+        _field_cache.move_to_end((image_key, loc))
+    while len(_field_cache) > max_cached_fields:
+        _field_cache.popitem(last = False)
+
+    return distances
@@ -0,0 +1,216 @@
+"""
+
+This program computes the control surfaces of the Fuzzy Inference System (FIS)
+that was first designed within MATLAB, using the Fuzzy Logic Designer.
+
+This file serves to host the functions that are used to compute the control
+surfaces, where two of the inputs are varied over a grid while the third input
+is held at a fixed value, as well as the full 3-D suitability volume over every
+input.
+
+Rather than solving the FIS once per point of the grid, the whole grid is solved
+by the vectorized FIS in a single batched evaluation, so surfaces of 256 x 256
+or finer take seconds. Each surface is saved on disk, keyed by the hash of the
+rulebase and the resolution of the grid, such that it is only computed once for
+a given FIS.
+
+The suitability volume is solved in chunks of slabs along the load history and
+written into a memory mapped .npy file, such that any axis-aligned slice of it
+can be read for plotting or analysis without solving the FIS again.
+
+"""
+######################## Import Packages ########################
+
+import os
+import json
+import hashlib
+import numpy as np
+from PythonFISVectorized import *
+from PythonFISV3LookupTable import SuitabilityLUT
+
+####################### Define Classes ##########################
+
+class SuitabilityVolume:
+    """
+    This is the full 3-D suitability volume of the FIS, over the load history,
+    distance to task, and total distance travelled. A volume consists of:
+    - a float32 array of suitabilities, of shape (n_lh, n_dtt, n_tdt), which is
+      memory mapped when loaded such that only the slices that are read are
+      pulled from disk
+    - the points along each input that the volume is sampled at
+    - the hash of the rulebase that the volume was built from
+    """
+
+    # names of the inputs along each axis of the volume:
+    input_names = ['Load History', 'Distance to Task', 'Total Distance Travelled']
+
+    # constructor for volume objects:
+    def __init__(self, volume, axes):
+        self.volume = volume                                            # (n_lh, n_dtt, n_tdt) suitabilities
+        self.axes = [np.asarray(axis, dtype = float) for axis in axes]  # points along each input
+        self.rulebase = None                                            # hash of the rulebase that the volume was built from
+
+    # slice the volume at a fixed value of one input:
+    def slice(self, axis, value):
+        """
+        Returns the surface of the two remaining inputs at the sample nearest to
+        value along the given axis, as (xx, yy, surface, fixed_value), in the same
+        layout as control_surface() such that it can be passed to plot_surface().
+        """
+        index = int(np.argmin(np.abs(self.axes[axis] - value)))
+        x_axis, y_axis = [self.axes[i] for i in range(3) if i != axis]
+
+        # take the slice, with the first remaining input along the columns:
+        surface = np.asarray(np.take(self.volume, index, axis = axis)).T
+        xx, yy = np.meshgrid(x_axis, y_axis)
+
+        return xx, yy, surface, float(self.axes[axis][index])
+
+    # serve the volume as a lookup table, if it is sampled on a regular grid:
+    def to_lut(self):
+        for axis in self.axes:
+            if not np.allclose(np.diff(axis), axis[1] - axis[0]):
+                raise ValueError('Only a volume with evenly spaced axes can be served as a lookup table')
+        lut = SuitabilityLUT(self.volume, [[axis[0], axis[-1]] for axis in self.axes])
+        lut.rulebase = self.rulebase
+
+        return lut
+
+    # load a saved volume, memory mapped such that only the slices that are read are pulled from disk:
+    @classmethod
+    def load(cls, path, mmap = True):
+        volume = np.load(path, mmap_mode = 'r' if mmap else None)
+
+        with open(os.path.splitext(path)[0] + '.json', 'r') as f:
+            settings = json.load(f)
+
+        volume = cls(volume, settings['axes'])
+        volume.rulebase = settings['rulebase']
+
+        return volume
+
+####################### Define Functions ########################
+
+def surface_key(fis, x_axis, y_axis, varied, fixed_value):
+
+    """
+    Hash of a control surface, which identifies the rulebase, which inputs are
+    varied, the points of each axis, and the value of the fixed input.
+
+    """
+
+    digest = hashlib.sha1(fis.rulebase_key().encode())
+    digest.update(str(tuple(varied)).encode() + str(float(fixed_value)).encode())
+    for axis in (x_axis, y_axis):
+        digest.update(np.ascontiguousarray(axis, dtype = float).tobytes())
+
+    return digest.hexdigest()
+
+def control_surface(fis, x_axis, y_axis, fixed_value, varied = (0, 1), cache_dir = None):
+
+    """
+    Computes the control surface of the FIS, where the inputs at the indices in
+    varied are taken along x_axis and y_axis, and the remaining input is held at
+    fixed_value. For example, with varied = (0, 1):
+        Load History along x_axis, Distance to Task along y_axis,
+        Total Distance Travelled held at fixed_value
+
+    Returns the (len(y_axis), len(x_axis)) meshgrids of the two varied inputs and
+    the suitability, in the same layout as np.meshgrid(x_axis, y_axis), such that
+    they can be passed straight to plot_surface().
+
+    If cache_dir is given, the surface is saved within it and is loaded on later
+    calls with the same rulebase, axes and fixed value.
+
+    """
+
+    x_axis = np.asarray(x_axis, dtype = float)
+    y_axis = np.asarray(y_axis, dtype = float)
+    if len(varied) != 2 or varied[0] == varied[1] or fis.num_inputs != 3:
+        raise ValueError('A control surface varies two of the three inputs of the FIS')
+
+    xx, yy = np.meshgrid(x_axis, y_axis)
+
+    # load the surface if it has already been computed:
+    path = None
+    if cache_dir is not None:
+        key = surface_key(fis, x_axis, y_axis, varied, fixed_value)
+        path = os.path.join(cache_dir, f'surface_{fis.rulebase_key()[:16]}_{len(x_axis)}x{len(y_axis)}_{key[:16]}.npy')
+        if os.path.isfile(path):
+            return xx, yy, np.load(path)
+
+    # build every point of the grid as a row of inputs, with the fixed input filled in:
+    inputs = np.full((xx.size, fis.num_inputs), float(fixed_value))
+    inputs[:, varied[0]] = xx.ravel()
+    inputs[:, varied[1]] = yy.ravel()
+
+    # solve the whole grid in one batched evaluation:
+    surface = fis.solve_batch(inputs).reshape(xx.shape)
+
+    if path is not None:
+        os.makedirs(cache_dir, exist_ok = True)
+        np.save(path, surface)
+
+    return xx, yy, surface
+
+def volume_build(fis, axes, path, chunk_size = 1000000):
+
+    """
+    Solves the FIS at every point of the grid spanned by the three axes, and
+    writes the suitabilities into a memory mapped .npy file at path, with the
+    axes saved next to it as a JSON.
+
+    The volume is solved in slabs along the first axis, with as many slabs in
+    each batch as fit within chunk_size samples, such that the whole grid of
+    inputs is never held in memory.
+
+    """
+
+    axes = [np.asarray(axis, dtype = float) for axis in axes]
+    shape = tuple(len(axis) for axis in axes)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok = True)
+    volume = np.lib.format.open_memmap(path, mode = 'w+', dtype = np.float32, shape = shape)
+
+    # inputs of a single slab, for the remaining two axes:
+    yy, zz = np.meshgrid(axes[1], axes[2], indexing = 'ij')
+    slab = np.column_stack([np.zeros(yy.size), yy.ravel(), zz.ravel()])
+    slabs_per_chunk = max(1, chunk_size // len(slab))
+
+    for start in range(0, shape[0], slabs_per_chunk):
+        values = axes[0][start:start + slabs_per_chunk]
+
+        # stack the slabs of this chunk, with the first input filled in:
+        inputs = np.tile(slab, (len(values), 1))
+        inputs[:, 0] = np.repeat(values, len(slab))
+
+        volume[start:start + len(values)] = fis.solve_batch(inputs).reshape(len(values), shape[1], shape[2])
+
+    volume.flush()
+    del volume
+
+    # the axes are saved next to the volume as a JSON:
+    with open(os.path.splitext(path)[0] + '.json', 'w') as f:
+        json.dump({'shape': list(shape), 'axes': [axis.tolist() for axis in axes], 'rulebase': fis.rulebase_key()}, f)
+
+    return SuitabilityVolume.load(path)
+
+def volume_create(fis, cache_dir, shape = (101, 101, 101), ranges = ((0, 10), (0, 25), (0, 50)), chunk_size = 1000000):
+
+    """
+    Loads the suitability volume of the FIS from cache_dir, or builds it if it
+    has not been built yet for this rulebase and grid.
+
+    The default grid has a spacing of 0.1 for the load history, 0.25 for the
+    distance to task, and 0.5 for the total distance travelled, which is ~4 MB on
+    disk.
+
+    """
+
+    axes = [np.linspace(lo, hi, n) for (lo, hi), n in zip(ranges, shape)]
+    digest = hashlib.sha1(np.concatenate(axes).tobytes()).hexdigest()
+    path = os.path.join(cache_dir, f'volume_{fis.rulebase_key()[:16]}_{"x".join(str(n) for n in shape)}_{digest[:8]}.npy')
+
+    if os.path.isfile(path) and os.path.isfile(os.path.splitext(path)[0] + '.json'):
+        return SuitabilityVolume.load(path)
+
+    return volume_build(fis, axes, path, chunk_size)
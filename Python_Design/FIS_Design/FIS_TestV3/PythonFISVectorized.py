@@ -0,0 +1,294 @@
+"""
+
+This program is a pure NumPy implementation of the Mamdani Fuzzy Inference
+System (FIS) that was first designed within MATLAB, using the Fuzzy Logic Designer.
+
+This file serves to host a vectorized FIS that evaluates a whole batch of robots
+in a single pass, rather than walking the skfuzzy graph once per sample. The
+inference steps are the same as MATLAB_FIS_V3.fis:
+    - trimf antecedents, fuzzified for all samples at once as matrices
+    - min AND, where the rules are fired as a gathered min over the inputs
+    - min implication and max aggregation of the output terms
+    - centroid defuzzification, computed with array centroids
+
+The output universe is sampled at the same points as skfuzzy (the universe of
+discourse plus the points where each term is cut by its activation), such that
+the results match fis_solve() to floating point precision.
+
+"""
+######################## Import Packages ########################
+
+import hashlib
+import numpy as np
+
+####################### Define Functions ########################
+
+def trimf(x, params):
+
+    """
+    Triangular membership function, evaluated for every sample in x against every
+    membership function in params at once.
+
+    x has shape (..., 1) and params has shape (num_mfs, 3), giving an output of
+    shape (..., num_mfs). Shoulders (a == b or b == c) and singletons (a == b == c)
+    are handled in the same manner as skfuzzy.
+
+    """
+
+    a, b, c = params[:, 0], params[:, 1], params[:, 2]
+
+    # rising edge, which is a step for left shoulders:
+    rising = b > a
+    left = np.where(rising, (x - a) / np.where(rising, b - a, 1.0), np.where(x >= b, 1.0, 0.0))
+
+    # falling edge, which is a step for right shoulders:
+    falling = c > b
+    right = np.where(falling, (c - x) / np.where(falling, c - b, 1.0), np.where(x <= b, 1.0, 0.0))
+
+    return np.clip(np.minimum(left, right), 0.0, 1.0)
+
+def centroid(x, mfx):
+
+    """
+    Centroid defuzzification of a batch of piecewise linear membership functions.
+
+    x and mfx have shape (num_samples, num_points), where each row of x is sorted.
+    Every segment between two points is a trapezoid, so its exact area and moment
+    can be calculated in the same manner as skfuzzy.defuzz.centroid().
+
+    """
+
+    x1, x2 = x[:, :-1], x[:, 1:]
+    y1, y2 = mfx[:, :-1], mfx[:, 1:]
+    width = x2 - x1
+    height = y1 + y2
+
+    # area and moment of each trapezoid, where empty segments contribute nothing:
+    area = 0.5 * width * height
+    moment = np.where(height > 0, (2.0 / 3.0 * width * (y2 + 0.5 * y1)) / np.where(height > 0, height, 1.0) + x1, 0.0)
+
+    sum_moment_area = np.sum(moment * area, axis = 1)
+    sum_area = np.sum(area, axis = 1)
+
+    return sum_moment_area / np.fmax(sum_area, np.finfo(float).eps)
+
+####################### Define Classes ##########################
+
+class VectorizedFIS:
+    """
+    This is a vectorized Mamdani FIS, which stores the entire FIS as arrays. It
+    consists of:
+    - the names and ranges of the input variables
+    - the trimf parameters of each input membership function, padded to the
+      largest number of membership functions
+    - the range and trimf parameters of the output membership functions
+    - the rulebase, in the MATLAB format of one row per rule with the 1-based index
+      of the membership function for each input (0 is a don't care), the 1-based
+      index of the output membership function, the rule weight, and the connective
+      (1 for AND, 2 for OR)
+    """
+
+    # constructor for vectorized FIS objects:
+    def __init__(self, input_names, input_ranges, input_mfs, output_name, output_range, output_mfs,
+                 antecedents, consequents, weights = None, connections = None):
+        self.input_names = list(input_names)                        # names of the input variables
+        self.input_ranges = np.asarray(input_ranges, dtype = float) # (num_inputs, 2) ranges of the inputs
+        self.output_name = output_name                              # name of the output variable
+        self.output_range = np.asarray(output_range, dtype = float) # (2, ) range of the output
+        self.num_inputs = len(self.input_names)
+
+        # pad the input membership functions into one (num_inputs, max_mfs, 3) array:
+        self.num_mfs = np.array([len(mfs) for mfs in input_mfs])
+        self.input_mfs = np.zeros((self.num_inputs, self.num_mfs.max(), 3))
+        for i, mfs in enumerate(input_mfs):
+            self.input_mfs[i, :len(mfs)] = np.asarray(mfs, dtype = float)
+
+        # output membership functions have shape (num_terms, 3):
+        self.output_mfs = np.asarray(output_mfs, dtype = float)
+        self.num_terms = len(self.output_mfs)
+
+        # rulebase:
+        self.antecedents = np.asarray(antecedents, dtype = int)     # (num_rules, num_inputs), 1-based, 0 is don't care
+        self.consequents = np.asarray(consequents, dtype = int)     # (num_rules, ), 1-based
+        self.num_rules = len(self.antecedents)
+        self.weights = np.ones(self.num_rules) if weights is None else np.asarray(weights, dtype = float)
+        self.connections = np.ones(self.num_rules, dtype = int) if connections is None else np.asarray(connections, dtype = int)
+
+        # precompute the gather indices for firing the rules, where a column of
+        # ones is prepended to the memberships such that index 0 is a don't care:
+        self._input_index = np.broadcast_to(np.arange(self.num_inputs), self.antecedents.shape)
+        self._is_or = self.connections == 2
+        self._dont_care = self.antecedents == 0
+
+        # one hot mask of which output term each rule implies:
+        self._term_mask = np.zeros((self.num_rules, self.num_terms), dtype = bool)
+        self._term_mask[np.arange(self.num_rules), self.consequents - 1] = True
+
+        # each universe of discourse is sampled at its range and the vertices of its membership functions,
+        # which is how the universes are defined in fis_create(). The membership functions are linear
+        # between these points, so they are interpolated from the samples as in skfuzzy:
+        self._input_universes = [self._universe(self.input_ranges[i], self.input_mfs[i, :self.num_mfs[i]]) for i in range(self.num_inputs)]
+        self._input_universe_mfs = [trimf(u[:, None], self.input_mfs[i, :self.num_mfs[i]]).T for i, u in enumerate(self._input_universes)]
+        self._output_universe = self._universe(self.output_range, self.output_mfs)
+        self._output_universe_mfs = trimf(self._output_universe[:, None], self.output_mfs).T
+
+    # sample a universe of discourse at its range and membership function vertices:
+    @staticmethod
+    def _universe(var_range, mfs):
+        lo, hi = var_range
+        return np.union1d([lo, hi], np.clip(mfs.ravel(), lo, hi))
+
+    # hash of the membership functions and rulebase, which identifies the FIS:
+    def rulebase_key(self):
+        arrays = [self.input_ranges, self.input_mfs, self.num_mfs, self.output_range, self.output_mfs,
+                  self.antecedents, self.consequents, self.weights, self.connections]
+        digest = hashlib.sha1()
+        for array in arrays:
+            array = np.ascontiguousarray(array)
+            digest.update(str(array.shape).encode() + str(array.dtype).encode() + array.tobytes())
+        return digest.hexdigest()
+
+    # fuzzify every input for every sample:
+    def fuzzify(self, inputs):
+        # clip the inputs to their universes of discourse, as skfuzzy does:
+        inputs = np.clip(inputs, self.input_ranges[:, 0], self.input_ranges[:, 1])
+
+        # memberships of shape (num_samples, num_inputs, 1 + max_mfs), where the first column is the don't care:
+        memberships = np.zeros((len(inputs), self.num_inputs, 1 + self.input_mfs.shape[1]))
+        memberships[:, :, 0] = 1.0
+        for i in range(self.num_inputs):
+            for j in range(self.num_mfs[i]):
+                memberships[:, i, j + 1] = np.interp(inputs[:, i], self._input_universes[i], self._input_universe_mfs[i][j])
+
+        return memberships
+
+    # fire every rule for every sample:
+    def fire(self, memberships):
+        # gather the membership of every antecedent, shape (num_samples, num_rules, num_inputs):
+        gathered = memberships[:, self._input_index, self.antecedents]
+
+        # AND rules take the min, ignoring don't cares as they have a membership of 1:
+        strengths = np.min(gathered, axis = 2)
+
+        # OR rules take the max, where don't cares must be ignored instead as a 0:
+        if self._is_or.any():
+            or_strengths = np.max(np.where(self._dont_care, 0.0, gathered), axis = 2)
+            strengths = np.where(self._is_or, or_strengths, strengths)
+
+        return strengths * self.weights
+
+    # aggregate the rules into the cut for each output term:
+    def aggregate(self, strengths):
+        # max of the firing strengths of every rule that implies each term, shape (num_samples, num_terms):
+        return np.max(np.where(self._term_mask, strengths[:, :, None], 0.0), axis = 1)
+
+    # defuzzify the aggregated output:
+    def defuzzify(self, cuts):
+        num_samples = len(cuts)
+        a, b, c = self.output_mfs[:, 0], self.output_mfs[:, 1], self.output_mfs[:, 2]
+        lo, hi = self.output_range
+
+        # points at which each term is cut by its activation, on both the rising and falling edge:
+        crossings = np.concatenate([a + cuts * (b - a), c - cuts * (c - b)], axis = 1)
+        crossings = np.clip(crossings, lo, hi)
+
+        # upsampled universe of shape (num_samples, num_points):
+        universe = np.broadcast_to(self._output_universe, (num_samples, len(self._output_universe)))
+        points = np.sort(np.concatenate([universe, crossings], axis = 1), axis = 1)
+
+        # implication (min) and aggregation (max) over the terms:
+        output_mf = np.zeros_like(points)
+        for k in range(self.num_terms):
+            term_mf = np.interp(points, self._output_universe, self._output_universe_mfs[k])
+            np.maximum(output_mf, np.minimum(term_mf, cuts[:, k:k+1]), out = output_mf)
+
+        return centroid(points, output_mf)
+
+    # solve the FIS for a batch of samples:
+    def solve_batch(self, inputs, chunk_size = 65536):
+        """
+        Accepts an array of shape (num_samples, num_inputs), such as:
+            [[Load History, Distance to Task, Total Distance Travelled], ...]
+        and returns the (num_samples, ) suitabilities.
+
+        Large batches are evaluated in chunks of chunk_size samples, which keeps the
+        intermediate arrays of the defuzzification bounded in memory.
+        """
+        inputs = np.atleast_2d(np.asarray(inputs, dtype = float))
+        outputs = np.empty(len(inputs))
+
+        for start in range(0, len(inputs), chunk_size):
+            chunk = inputs[start:start + chunk_size]
+
+            memberships = self.fuzzify(chunk)
+            strengths = self.fire(memberships)
+            cuts = self.aggregate(strengths)
+
+            outputs[start:start + chunk_size] = self.defuzzify(cuts)
+
+        return outputs
+
+    # solve the FIS for a single robot, as with fis_solve():
+    def solve(self, *inputs):
+        return float(self.solve_batch(np.array([inputs]))[0])
+
+def fis_create_vectorized():
+
+    """
+    Creates the vectorized version of the FIS that is defined within fis_create().
+
+    The membership functions and rules are the same as PythonFISFunctionV3.py, with
+    the rulebase written in the MATLAB format:
+        [Load History, Distance to Task, Total Distance Travelled] -> Suitability
+    where for each input 1 is Low, 2 is Medium, 3 is High, and for the output
+    1 is Very Low, 2 is Low, 3 is Medium, 4 is High, 5 is Very High.
+
+    """
+
+    # names and universes of discourse:
+    input_names = ['Load History', 'Distance to Task', 'Total Distance Travelled']
+    input_ranges = [[0, 10], [0, 25], [0, 50]]
+
+    # input membership functions, Low, Medium, High:
+    input_mfs = [
+        [[0, 0, 6], [5/6, 5, 55/6], [4, 10, 10]],                # load history
+        [[0, 0, 15], [25/12, 12.5, 275/12], [10, 25, 25]],       # distance to task
+        [[0, 0, 30], [25/6, 25, 275/6], [15, 50, 50]],           # total distance travelled
+    ]
+
+    # output membership functions, Very Low, Low, Medium, High, Very High:
+    output_mfs = [[0, 0, 25/12], [5/12, 2.5, 55/12], [35/12, 5, 85/12], [65/12, 7.5, 115/12], [95/12, 10, 10]]
+
+    # rulebase of 27 rules, numbered as in fis_create():
+    rules = np.array([
+        [1, 1, 1, 5],   # Rule 01
+        [2, 1, 1, 4],   # Rule 02
+        [3, 1, 1, 3],   # Rule 03
+        [1, 2, 1, 4],   # Rule 04
+        [2, 2, 1, 3],   # Rule 05
+        [3, 2, 1, 3],   # Rule 06
+        [1, 3, 1, 3],   # Rule 07
+        [2, 3, 1, 3],   # Rule 08
+        [3, 3, 1, 2],   # Rule 09
+        [1, 1, 2, 4],   # Rule 10
+        [2, 1, 2, 3],   # Rule 11
+        [3, 1, 2, 3],   # Rule 12
+        [1, 2, 2, 3],   # Rule 13
+        [2, 2, 2, 2],   # Rule 14
+        [3, 2, 2, 2],   # Rule 15
+        [1, 3, 2, 3],   # Rule 16
+        [2, 3, 2, 2],   # Rule 17
+        [3, 3, 2, 1],   # Rule 18
+        [1, 1, 3, 3],   # Rule 19
+        [2, 1, 3, 3],   # Rule 20
+        [3, 1, 3, 2],   # Rule 21
+        [1, 2, 3, 3],   # Rule 22
+        [2, 2, 3, 2],   # Rule 23
+        [3, 2, 3, 1],   # Rule 24
+        [1, 3, 3, 2],   # Rule 25
+        [2, 3, 3, 1],   # Rule 26
+        [3, 3, 3, 1],   # Rule 27
+    ])
+
+    return VectorizedFIS(input_names, input_ranges, input_mfs, 'Suitability', [0, 10], output_mfs,
+                         antecedents = rules[:, :3], consequents = rules[:, 3])
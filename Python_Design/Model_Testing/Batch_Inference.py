@@ -0,0 +1,97 @@
+"""
+This file hosts the batch inference path for the ANFIS and ANN models.
+
+Calling model.predict() once per robot is dominated by the overhead of Keras'
+predict loop rather than by the model itself. Instead, the model is called
+directly within a tf.function that has a fixed input signature, such that it is
+traced once and then reused for any batch size, and the whole fleet of robots
+is scored in a single call.
+
+It is meant to be imported alongside the custom layers when the models are
+deployed.
+
+"""
+#################################### Import Packages: ####################################
+
+import time
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+
+#################################### Define  Classes: ####################################
+
+# batch predictor for a keras model and its scaler:
+class BatchPredictor:
+    # constructor:
+    def __init__(self, model, scaler = None, num_inputs = 3):
+        self.model = model
+        self.scaler = scaler
+        self.num_inputs = num_inputs
+
+        # standard scalers are applied directly with numpy, which avoids the overhead of scaler.transform():
+        if scaler is not None and hasattr(scaler, 'mean_') and hasattr(scaler, 'scale_'):
+            self.mean = np.asarray(scaler.mean_, dtype = np.float32)
+            self.scale = np.asarray(scaler.scale_, dtype = np.float32)
+        else:
+            self.mean = None
+            self.scale = None
+
+        # compile the forward pass once, for a batch of any size:
+        self.forward = tf.function(
+            self.call_model,
+            input_signature = [tf.TensorSpec(shape = (None, num_inputs), dtype = tf.float32)],
+        )
+
+    # direct call of the model, which skips the predict loop:
+    def call_model(self, inputs):
+        return self.model(inputs, training = False)
+
+    # scale the raw inputs:
+    def transform(self, inputs):
+        if self.mean is not None:
+            return (inputs - self.mean) / self.scale
+        elif self.scaler is not None:
+            return self.scaler.transform(inputs).astype(np.float32)
+        return inputs
+
+    # predict a batch of samples:
+    def predict(self, inputs):
+        # this function accepts raw inputs of shape (batch_size, num_inputs), such as:
+        # [[Load History, Distance to Task, Total Distance Travelled], ...]
+        inputs = np.atleast_2d(np.asarray(inputs, dtype = np.float32))
+        inputs = self.transform(inputs)
+
+        # returns the (batch_size, ) predictions:
+        return self.forward(tf.convert_to_tensor(inputs)).numpy().reshape(-1)
+
+#################################### Define Functions: ###################################
+
+# measure the latency of a prediction function at several batch sizes:
+def benchmark_latency(predict, batch_sizes = (1, 8, 64, 1024), repeats = 100, ranges = ((0, 10), (0, 25), (0, 50)), seed = 0):
+    # this function accepts any function that maps a (batch_size, num_inputs) array of raw inputs
+    # to predictions, and returns the batch and per-sample latency at each batch size:
+    rng = np.random.default_rng(seed)
+    low = np.array([r[0] for r in ranges], dtype = np.float32)
+    high = np.array([r[1] for r in ranges], dtype = np.float32)
+
+    results = []
+    for batch_size in batch_sizes:
+        # randomly sample the universe of discourse of each input:
+        inputs = rng.uniform(low, high, size = (batch_size, len(ranges))).astype(np.float32)
+
+        # warm up, such that any tracing is not timed:
+        predict(inputs)
+
+        # time the repeated calls:
+        start_time = time.perf_counter()
+        for _ in range(repeats):
+            predict(inputs)
+        batch_time = (time.perf_counter() - start_time) / repeats
+
+        results.append({
+            'Batch Size'                : batch_size,
+            'Batch Latency (ms)'        : batch_time * 1e3,
+            'Per-Sample Latency (us)'   : batch_time / batch_size * 1e6,
+        })
+
+    return pd.DataFrame(results)
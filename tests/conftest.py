@@ -0,0 +1,69 @@
+"""
+
+This file hosts the shared fixtures of the tests, which are run from the root of
+the repository with:
+    python -m pytest -q
+
+The FIS, planner and ANFIS modules are not packaged, and are imported by the
+scripts from their own folders, so those folders are added to the path here in
+the same manner.
+
+"""
+######################## Import Packages ########################
+
+import os
+import sys
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIS_DESIGN = os.path.join(ROOT, 'Python_Design', 'FIS_Design')
+ANFIS_DEPLOYMENT = os.path.join(ROOT, 'Python_Design', 'ANFIS_Design', 'ANFIS_Model_Deployment')
+
+for folder in [os.path.join(FIS_DESIGN, 'FIS_TestV3'), os.path.join(FIS_DESIGN, 'FIS_TestV2'), ANFIS_DEPLOYMENT]:
+    if folder not in sys.path:
+        sys.path.append(folder)
+
+####################### Define Fixtures #########################
+
+@pytest.fixture
+def maze():
+
+    """
+    A small buffered map of 60 x 80 pixels, where white space is 255 and obstacles
+    are 0, with walls that force the paths around them, a diagonal-only gap, and
+    an enclosed room that cannot be reached.
+
+    """
+
+    image = np.full((60, 80), 255, dtype = np.uint8)
+
+    # border:
+    image[0, :] = image[-1, :] = 0
+    image[:, 0] = image[:, -1] = 0
+
+    # vertical walls with gaps at alternating ends:
+    image[1:45, 20] = 0
+    image[15:59, 40] = 0
+    image[1:50, 60] = 0
+
+    # horizontal wall with a diagonal-only crossing:
+    image[30, 41:52] = 0
+    image[31, 52:60] = 0
+
+    # enclosed room:
+    image[5:12, 65:75] = 0
+    image[7:10, 67:73] = 255
+
+    return image
+
+@pytest.fixture
+def maze_points(maze):
+
+    """
+    Every white space cell of the maze on a coarse grid, in (x, y) format.
+
+    """
+
+    rows, cols = np.nonzero(maze[::7, ::7] >= 254)
+    return [(int(c * 7), int(r * 7)) for r, c in zip(rows, cols)]
@@ -0,0 +1,72 @@
+"""
+
+This program tests the allocation round of PythonFISV3Allocation.py, which must
+select the most suitable robot of each sensor type, breaking ties towards the
+robot with the highest index as the sorted bids of the implementation scripts do.
+
+"""
+######################## Import Packages ########################
+
+import numpy as np
+import pytest
+from PythonFISVectorized import fis_create_vectorized
+from PythonFISV3Allocation import allocation_round, fleet_distances
+from PythonFISV3PathPlanning import dijkstra
+
+resolution = 0.05
+goal = (70, 56)
+
+######################### Define Tests ##########################
+
+@pytest.fixture(scope = 'module')
+def fis():
+    return fis_create_vectorized()
+
+def test_ties_go_to_highest_index(maze, fis):
+    # robots 0, 1 and 3 are identical, as are robots 2 and 4:
+    positions = [(7, 7), (7, 7), (14, 49), (7, 7), (14, 49)]
+    sensors = ['Imagery', 'Imagery', 'Measurement', 'Imagery', 'Measurement']
+    loads = [1, 1, 1, 1, 1]
+    totals = [3, 3, 3, 3, 3]
+
+    travel, suitability, selected = allocation_round(fis, maze, goal, positions, loads, totals, sensors, resolution)
+    assert suitability[0] == suitability[1] == suitability[3]
+    assert suitability[2] == suitability[4]
+    assert selected == {'Imagery': 3, 'Measurement': 4}
+
+def test_ties_after_rounding(maze, fis):
+    # the suitabilities are rounded to two decimals before they are compared, so near ties are also ties:
+    positions = [(7, 7), (7, 14), (7, 7)]
+    sensors = ['Imagery', 'Imagery', 'Measurement']
+    travel, suitability, selected = allocation_round(fis, maze, goal, positions, [2, 2, 2], [5, 5, 5], sensors, resolution)
+    raw = fis.solve_batch(np.column_stack([[2, 2], travel[:2], [5, 5]]))
+    assert raw[0] != raw[1]
+    assert suitability[0] == suitability[1]
+    assert selected['Imagery'] == 1
+
+def test_most_suitable_is_selected(maze, fis):
+    positions = [(7, 7), (7, 7), (7, 7), (7, 7)]
+    sensors = ['Imagery', 'Imagery', 'Measurement', 'Measurement']
+    _, suitability, selected = allocation_round(fis, maze, goal, positions, [0, 8, 8, 0], [0, 40, 40, 0], sensors, resolution)
+    assert suitability[0] > suitability[1] and suitability[3] > suitability[2]
+    assert selected == {'Imagery': 0, 'Measurement': 3}
+
+def test_unreachable_robots_are_never_selected(maze, fis):
+    room = (70, 7)
+    positions = [(7, 7), room, room]
+    sensors = ['Imagery', 'Imagery', 'Measurement']
+    travel, suitability, selected = allocation_round(fis, maze, goal, positions, [9, 0, 0], [45, 0, 0], sensors, resolution)
+    assert np.isinf(travel[1:]).all() and np.isnan(suitability[1:]).all()
+    assert selected == {'Imagery': 0, 'Measurement': None}
+
+@pytest.mark.parametrize('planner', ['field', 'cached', 'astar', 'dijkstra'])
+def test_distances_match_planners(maze, planner):
+    positions = np.array([(7, 7), (14, 49), (70, 7), (35, 21)])
+    distances, paths = fleet_distances(maze, positions, goal, planner, return_paths = True)
+    for start, dist, path in zip(positions, distances, paths):
+        expected = dijkstra(maze, tuple(start), goal)[1]
+        if expected is None:
+            assert np.isinf(dist) and path is None
+        else:
+            assert dist == pytest.approx(expected, abs = 1e-9)
+            assert tuple(path[0]) == tuple(start) and tuple(path[-1]) == goal
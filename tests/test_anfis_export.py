@@ -0,0 +1,42 @@
+"""
+
+This program tests the fused forward pass of ANFIS_Export.py against the Keras
+model and the NumPy runtime, which all read the same trained parameters.
+
+"""
+######################## Import Packages ########################
+
+import numpy as np
+import pytest
+from test_anfis_runtime import model_path, scaler_path, load_keras_model
+
+tf = pytest.importorskip('tensorflow')
+from ANFIS_Runtime import ANFISRuntime, read_scaler
+from ANFIS_Export import export_fused_anfis
+
+######################### Define Tests ##########################
+
+@pytest.fixture(scope = 'module')
+def samples():
+    rng = np.random.default_rng(1)
+    return rng.uniform([0, 0, 0], [10, 25, 50], size = (64, 3)).astype(np.float32)
+
+@pytest.fixture(scope = 'module')
+def forward():
+    return export_fused_anfis(model_path, scaler_path)
+
+def test_matches_keras(forward, samples):
+    scaler = read_scaler(scaler_path)
+    expected = load_keras_model(model_path).predict((samples - scaler.mean_) / scaler.scale_, verbose = 0).ravel()
+    np.testing.assert_allclose(forward(tf.constant(samples)).numpy().ravel(), expected, rtol = 0, atol = 1e-4)
+
+def test_matches_runtime(forward, samples):
+    expected = ANFISRuntime.load(model_path, scaler_path).predict(samples)
+    np.testing.assert_allclose(forward(tf.constant(samples)).numpy().ravel(), expected, rtol = 0, atol = 1e-5)
+
+def test_saved_model_matches_function(forward, samples, tmp_path):
+    export_path = str(tmp_path / 'fused')
+    export_fused_anfis(model_path, scaler_path, export_path)
+    serving = tf.saved_model.load(export_path).signatures['serving_default']
+    outputs = list(serving(tf.constant(samples)).values())[0]
+    np.testing.assert_allclose(outputs.numpy().ravel(), forward(tf.constant(samples)).numpy().ravel(), rtol = 0, atol = 1e-6)
@@ -0,0 +1,95 @@
+"""
+
+This program tests the NumPy runtime of ANFIS_Runtime.py against the Keras
+model that it reads its parameters from, for the deployed model and for a small
+untrained model of every membership function type.
+
+"""
+######################## Import Packages ########################
+
+import os
+import pickle
+import numpy as np
+import pytest
+from conftest import ANFIS_DEPLOYMENT
+from ANFIS_Runtime import ANFISRuntime, read_anfis_weights, read_scaler
+
+model_path = os.path.join(ANFIS_DEPLOYMENT, 'anfis_model.h5')
+scaler_path = os.path.join(ANFIS_DEPLOYMENT, 'scaler.pkl')
+
+######################## Define Helpers #########################
+
+def load_keras_model(path):
+
+    # load a saved model with the custom objects, as within ANFIS_Deployment_Test.ipynb:
+    pytest.importorskip('tensorflow')
+    from tensorflow.keras.models import load_model
+    from tensorflow.keras.losses import MeanSquaredError
+    from ANFIS_Custom_Layers import MF_Layer, FS_Layer, NM_Layer, CN_Layer, O_Layer, OrderedConstraint
+
+    custom_objects = {
+        'MF_Layer'          : MF_Layer,
+        'FS_Layer'          : FS_Layer,
+        'NM_Layer'          : NM_Layer,
+        'CN_Layer'          : CN_Layer,
+        'O_Layer'           : O_Layer,
+        'OrderedConstraint' : OrderedConstraint(),
+        'mse'               : MeanSquaredError()
+    }
+    return load_model(path, custom_objects = custom_objects)
+
+######################### Define Tests ##########################
+
+@pytest.fixture(scope = 'module')
+def samples():
+    rng = np.random.default_rng(0)
+    return rng.uniform([0, 0, 0], [10, 25, 50], size = (64, 3)).astype(np.float32)
+
+@pytest.fixture(scope = 'module')
+def keras_model():
+    return load_keras_model(model_path)
+
+def test_scaler_matches_pickle():
+    pytest.importorskip('sklearn')
+    with open(scaler_path, 'rb') as f:
+        expected = pickle.load(f)
+    scaler = read_scaler(scaler_path)
+    np.testing.assert_array_equal(scaler.mean_, expected.mean_)
+    np.testing.assert_array_equal(scaler.scale_, expected.scale_)
+
+def test_scaler_rejects_other_objects(tmp_path):
+    path = tmp_path / 'scaler.pkl'
+    path.write_bytes(pickle.dumps(os.getcwd))
+    with pytest.raises(pickle.UnpicklingError):
+        read_scaler(str(path))
+
+def test_deployed_model_matches_keras(keras_model, samples):
+    scaler = read_scaler(scaler_path)
+    expected = keras_model.predict((samples - scaler.mean_) / scaler.scale_, verbose = 0).ravel()
+    runtime = ANFISRuntime.load(model_path, scaler_path)
+    np.testing.assert_allclose(runtime.predict(samples), expected, rtol = 0, atol = 1e-4)
+
+@pytest.mark.parametrize('mf_type', ['Gaussian', 'Smoothed Triangular', 'Generalized Bell'])
+def test_every_mf_type_matches_keras(mf_type, samples, tmp_path):
+    tf = pytest.importorskip('tensorflow')
+    from ANFIS_Custom_Layers import MF_Layer, FS_Layer, NM_Layer, CN_Layer, O_Layer
+
+    # a small untrained model, saved in the same format as the deployed model:
+    tf.keras.utils.set_random_seed(0)
+    inputs = tf.keras.Input(shape = (3, ))
+    membership_layer = MF_Layer(num_inputs = 3, num_mfs = 2, mf_type = mf_type)(inputs)
+    firing_layer = FS_Layer(num_inputs = 3, num_mfs = 2)(membership_layer)
+    normalization_layer = NM_Layer(num_inputs = 3, num_mfs = 2)(firing_layer)
+    consequent_layer = CN_Layer(num_inputs = 3, num_mfs = 2)([normalization_layer, inputs])
+    output_layer = O_Layer(num_inputs = 3, num_mfs = 2)(consequent_layer)
+    model = tf.keras.Model(inputs = inputs, outputs = output_layer)
+    model.compile(optimizer = 'adam', loss = 'mse')
+    path = str(tmp_path / 'model.h5')
+    model.save(path)
+
+    weights = read_anfis_weights(path)
+    assert (weights['mf_type'], weights['num_inputs'], weights['num_mfs']) == (mf_type, 3, 2)
+
+    scaled = (samples - samples.mean(axis = 0)) / samples.std(axis = 0)
+    expected = model.predict(scaled, verbose = 0).ravel()
+    np.testing.assert_allclose(ANFISRuntime(weights).predict(scaled), expected, rtol = 0, atol = 1e-4)
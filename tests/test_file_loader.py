@@ -0,0 +1,56 @@
+"""
+
+This program tests the MATLAB .fis loader of PythonFISFileLoader.py, which must
+compile MATLAB_FIS_V3.fis into the same FIS as fis_create_vectorized().
+
+"""
+######################## Import Packages ########################
+
+import os
+import numpy as np
+import pytest
+from conftest import ROOT
+from PythonFISVectorized import fis_create_vectorized
+import PythonFISFileLoader
+from PythonFISFileLoader import fis_load
+
+fis_folder = os.path.join(ROOT, 'MATLAB_Design', 'FIS Design')
+
+######################### Define Tests ##########################
+
+@pytest.fixture(scope = 'module')
+def samples():
+    rng = np.random.default_rng(0)
+    return rng.uniform([0, 0, 0], [10, 25, 50], size = (64, 3))
+
+def test_v3_matches_vectorized(samples):
+    fis = fis_load(os.path.join(fis_folder, 'MATLAB_FIS_V3.fis'))
+    expected = fis_create_vectorized()
+    np.testing.assert_array_equal(fis.antecedents, expected.antecedents)
+    np.testing.assert_array_equal(fis.consequents, expected.consequents)
+
+    # the file stores two of the output vertices to six digits only, e.g. 2.08333 rather than 25/12:
+    np.testing.assert_allclose(fis.output_mfs, expected.output_mfs, rtol = 0, atol = 1e-5)
+    np.testing.assert_allclose(fis.solve_batch(samples), expected.solve_batch(samples), rtol = 0, atol = 1e-5)
+
+@pytest.mark.parametrize('version', ['V1', 'V2', 'V3'])
+def test_disk_cache_matches_parsed_file(version, samples, tmp_path):
+    path = os.path.join(fis_folder, f'MATLAB_FIS_{version}.fis')
+    parsed = fis_load(path)
+
+    # the first load saves the compiled arrays, which a fresh process would then restore:
+    PythonFISFileLoader._fis_cache.pop(os.path.abspath(path), None)
+    fis_load(path, str(tmp_path))
+    PythonFISFileLoader._fis_cache.pop(os.path.abspath(path), None)
+    restored = fis_load(path, str(tmp_path))
+
+    assert len(list(tmp_path.iterdir())) == 1
+    assert restored.rulebase_key() == parsed.rulebase_key()
+    np.testing.assert_array_equal(restored.solve_batch(samples), parsed.solve_batch(samples))
+
+def test_unsupported_membership_function(tmp_path):
+    text = open(os.path.join(fis_folder, 'MATLAB_FIS_V3.fis')).read().replace("'trimf',[0 0 6]", "'gaussmf',[2 0]")
+    path = tmp_path / 'gaussian.fis'
+    path.write_text(text)
+    with pytest.raises(ValueError, match = 'gaussmf'):
+        fis_load(str(path))
@@ -0,0 +1,38 @@
+"""
+
+This program tests the compiled FIS of PythonFISFunctionV3.py, which must give
+the same suitabilities as fis_solve(), which builds the control system again for
+every robot.
+
+"""
+######################## Import Packages ########################
+
+import numpy as np
+import pytest
+from PythonFISFunctionV3 import fis_create, fis_solve, CompiledFIS
+
+# inputs of a few robots, including the bounds of every input:
+samples = np.array([
+    [0, 0, 0],
+    [10, 25, 50],
+    [2, 7.5, 12],
+    [5, 12.5, 25],
+    [8.25, 3.1, 44.9],
+    [1, 20, 5],
+])
+
+######################### Define Tests ##########################
+
+@pytest.fixture(scope = 'module')
+def rulebase():
+    return fis_create()
+
+def test_solve_matches_fis_solve(rulebase):
+    fis = CompiledFIS(rulebase)
+    for load, distance, total_travel in samples:
+        assert fis.solve(load, distance, total_travel) == pytest.approx(fis_solve(rulebase, load, distance, total_travel), abs = 1e-12)
+
+def test_solve_batch_matches_solve(rulebase):
+    fis = CompiledFIS(rulebase)
+    expected = [fis.solve(*sample) for sample in samples]
+    np.testing.assert_allclose(fis.solve_batch(samples), expected, rtol = 0, atol = 1e-12)
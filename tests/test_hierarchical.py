@@ -0,0 +1,58 @@
+"""
+
+This program tests the hierarchical planner of PythonFISV3Hierarchical.py, whose
+paths may be longer than the exact distance, but never by more than the bound
+that it reports.
+
+"""
+######################## Import Packages ########################
+
+import numpy as np
+import pytest
+import PythonFISV3PathPlanning
+from PythonFISV3PathPlanning import *
+from PythonFISV3Hierarchical import Hierarchy, hierarchy_build, hierarchy_create, suboptimality
+from test_path_planning import pairs_of, check_path
+
+######################### Define Tests ##########################
+
+@pytest.mark.parametrize('cluster_size', [8, 16])
+def test_bound_holds(maze, maze_points, cluster_size):
+    hierarchy = hierarchy_build(maze, cluster_size)
+    for start, goal in pairs_of(maze_points, num_pairs = 60):
+        exact = dijkstra(maze, start, goal)[1]
+        path, dist, bound = hierarchy.plan(maze, start, goal)
+        if exact is None:
+            assert path is None and dist is None and bound is None
+        else:
+            check_path(maze, path, dist, start, goal)
+            assert dist >= exact - 1e-9
+            assert bound >= 1.0 and dist <= exact * bound + 1e-9
+
+def test_exact_without_widening_limit(maze, maze_points):
+    # a corridor that is widened until no move out of it could give a shorter path gives the exact distance:
+    hierarchy = hierarchy_build(maze, 8)
+    for start, goal in pairs_of(maze_points, seed = 3):
+        exact = dijkstra(maze, start, goal)[1]
+        _, dist, bound = hierarchy.plan(maze, start, goal, tolerance = 1.0, max_widen = 100)
+        if exact is not None:
+            assert dist == pytest.approx(exact, abs = 1e-9)
+            assert bound == pytest.approx(1.0)
+
+def test_suboptimality_report(maze, maze_points):
+    report = suboptimality(hierarchy_build(maze, 8), maze, pairs_of(maze_points))
+    assert np.all(report['ratio'] <= report['bound'] + 1e-9)
+    assert 1.0 <= report['max_ratio'] <= report['max_bound']
+
+def test_plan_uses_saved_hierarchy(maze, maze_points, tmp_path):
+    built = hierarchy_create(maze, str(tmp_path), 8)
+    loaded = hierarchy_create(maze, str(tmp_path), 8)
+    assert len(list(tmp_path.iterdir())) == 1
+    np.testing.assert_array_equal(loaded.edges, built.edges)
+
+    # plan() finds the hierarchy of the map by its hash, and keeps the bound of every query:
+    PythonFISV3PathPlanning.suboptimality_bounds.clear()
+    start, goal = maze_points[0], maze_points[-1]
+    assert plan(maze.copy(), start, goal, 'hierarchical')[1] == pytest.approx(loaded.plan(maze, start, goal)[1])
+    assert len(PythonFISV3PathPlanning.suboptimality_bounds) == 1
+    PythonFISV3PathPlanning.hierarchies.clear()
@@ -0,0 +1,62 @@
+"""
+
+This program tests the suitability lookup table of PythonFISV3LookupTable.py,
+on a coarse grid such that it is built and verified in a moment.
+
+"""
+######################## Import Packages ########################
+
+import numpy as np
+import pytest
+from PythonFISVectorized import fis_create_vectorized
+from PythonFISV3LookupTable import SuitabilityLUT, lut_build, lut_verify, lut_create
+
+shape = (11, 26, 26)
+ranges = ((0, 10), (0, 25), (0, 50))
+
+######################### Define Tests ##########################
+
+@pytest.fixture(scope = 'module')
+def fis():
+    return fis_create_vectorized()
+
+@pytest.fixture(scope = 'module')
+def lut(fis):
+    return lut_build(fis, shape, ranges)
+
+def test_grid_points_match_fis(fis, lut):
+    axes = [np.linspace(lo, hi, n) for (lo, hi), n in zip(ranges, shape)]
+    grid = np.stack(np.meshgrid(*axes, indexing = 'ij'), axis = -1).reshape(-1, 3)
+    np.testing.assert_allclose(lut.solve_batch(grid), fis.solve_batch(grid), rtol = 0, atol = 1e-5)
+
+def test_verified_error_is_largest_error_on_finer_grid(fis, lut):
+    subdivisions = 2
+    axes = [np.linspace(lo, hi, (n - 1) * subdivisions + 1) for (lo, hi), n in zip(ranges, shape)]
+    grid = np.stack(np.meshgrid(*axes, indexing = 'ij'), axis = -1).reshape(-1, 3)
+    error = np.max(np.abs(lut.solve_batch(grid) - fis.solve_batch(grid)))
+
+    assert lut_verify(lut, fis, subdivisions) == pytest.approx(error, abs = 1e-12)
+
+def test_solve_matches_solve_batch(lut):
+    rng = np.random.default_rng(0)
+    samples = rng.uniform([-1, -1, -1], [11, 26, 51], size = (32, 3))
+    np.testing.assert_allclose([lut.solve(*sample) for sample in samples], lut.solve_batch(samples), rtol = 0, atol = 1e-9)
+
+def test_create_caches_verified_table(fis, tmp_path):
+    lut = lut_create(fis, str(tmp_path), shape, ranges, subdivisions = 2)
+    assert lut.verified_error is not None and lut.subdivisions == 2
+    assert lut.rulebase == fis.rulebase_key()
+
+    # a second call loads the saved table rather than building it again:
+    saved = list(tmp_path.iterdir())
+    loaded = lut_create(fis, str(tmp_path), shape, ranges, subdivisions = 2)
+    assert sorted(tmp_path.iterdir()) == sorted(saved)
+    assert loaded.verified_error == lut.verified_error
+    np.testing.assert_array_equal(loaded.table, lut.table)
+
+def test_save_and_load(lut, tmp_path):
+    path = str(tmp_path / 'lut.npy')
+    lut.save(path)
+    loaded = SuitabilityLUT.load(path)
+    assert loaded.rulebase == lut.rulebase
+    np.testing.assert_array_equal(loaded.table, lut.table)
@@ -0,0 +1,67 @@
+"""
+
+This program tests the compiled map artifact of PythonFISV3MapArtifact.py, whose
+distance fields are searched over the CSR navigation graph, against the distance
+fields searched over the image.
+
+"""
+######################## Import Packages ########################
+
+import os
+import numpy as np
+import pytest
+import cv2
+import PythonFISV3PathPlanning
+from PythonFISV3PathPlanning import *
+from PythonFISV3MapArtifact import CompiledMap, add_buffer, build_graph, compile_map
+
+######################### Define Tests ##########################
+
+@pytest.fixture
+def compiled_maze(maze, tmp_path):
+    # the maze is saved as a PNG and compiled, with a buffer that narrows its gaps:
+    map_path = str(tmp_path / 'maze.png')
+    cv2.imwrite(map_path, maze)
+    compiled = compile_map(map_path, 3, str(tmp_path / 'cache'))
+    yield map_path, compiled
+    PythonFISV3PathPlanning.compiled_maps.clear()
+    PythonFISV3PathPlanning._field_cache.clear()
+
+def test_graph_matches_movement_model(maze):
+    free_cells, indptr, indices, moves = build_graph(maze)
+    rows, cols = maze.shape
+    compiled = CompiledMap({'image_rgb': None, 'buffered': maze, 'free_cells': free_cells, 'indptr': indptr,
+                            'indices': indices, 'moves': moves, 'spawn_locations': None}, maze.shape, 0)
+
+    # every free neighbour of every free cell is an edge, with the cost of its move:
+    for node in range(0, len(free_cells), 13):
+        x, y = divmod(int(free_cells[node]), cols)
+        expected = {((x + dx) * cols + y + dy): cost for (dx, dy), cost in zip(directions, costs)
+                    if 0 <= x + dx < rows and 0 <= y + dy < cols and maze[x + dx, y + dy] >= 254}
+        neighbours, move_costs = compiled.neighbours(node)
+        assert dict(zip(free_cells[neighbours].tolist(), move_costs.tolist())) == pytest.approx(expected)
+
+def test_field_matches_image_field(maze, maze_points, compiled_maze):
+    _, compiled = compiled_maze
+    buffered, _ = add_buffer(maze, 3)
+    np.testing.assert_array_equal(compiled.buffered, buffered)
+
+    # the goals include cells that the buffer has closed, which can only be reached from themselves:
+    for goal in maze_points[::4]:
+        np.testing.assert_allclose(compiled.distance_field(goal), compute_distance_field(buffered, goal), rtol = 0, atol = 1e-9)
+
+def test_planners_search_compiled_graph(maze_points, compiled_maze):
+    _, compiled = compiled_maze
+    goal = maze_points[7]
+    before = dict(node_expansions)
+    field = distance_field(compiled.buffered, goal)
+    assert node_expansions['field'] > before['field']
+    np.testing.assert_allclose(field, compute_distance_field(np.asarray(compiled.buffered), goal), rtol = 0, atol = 1e-9)
+    assert map_key(compiled.buffered) in PythonFISV3PathPlanning.compiled_maps
+
+def test_compile_reloads_saved_artifact(compiled_maze, tmp_path):
+    map_path, compiled = compiled_maze
+    reloaded = compile_map(map_path, 3, str(tmp_path / 'cache'))
+    assert isinstance(reloaded.indptr, np.memmap)
+    for name in CompiledMap.array_names:
+        np.testing.assert_array_equal(getattr(reloaded, name), getattr(compiled, name))
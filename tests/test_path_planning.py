@@ -0,0 +1,125 @@
+"""
+
+This program tests that the planners of PythonFISV3PathPlanning.py agree with
+the full dijkstra() search on a small maze, both on the length of every path and
+on the path being a valid sequence of moves of that length.
+
+"""
+######################## Import Packages ########################
+
+import math as m
+import random
+import numpy as np
+import pytest
+import PythonFISV3PathPlanning
+from PythonFISV3PathPlanning import *
+
+######################## Define Helpers #########################
+
+def pairs_of(points, num_pairs = 40, seed = 0):
+
+    # a seeded sample of (start, goal) pairs, along with a start that is its own goal:
+    rng = random.Random(seed)
+    pairs = [tuple(rng.sample(points, 2)) for _ in range(num_pairs)]
+    return pairs + [(points[0], points[0])]
+
+def check_path(image, path, dist, start, goal):
+
+    # the path must run from the start to the goal over white space, in single moves whose costs sum to its length:
+    assert tuple(path[0]) == tuple(start) and tuple(path[-1]) == tuple(goal)
+    length = 0.0
+    for (x0, y0), (x1, y1) in zip(path, path[1:]):
+        assert image[y1, x1] >= 254
+        assert max(abs(x1 - x0), abs(y1 - y0)) == 1
+        length += m.sqrt(2) if x1 != x0 and y1 != y0 else 1
+    assert length == pytest.approx(dist, abs = 1e-9)
+
+######################### Define Tests ##########################
+
+def test_field_matches_dijkstra(maze, maze_points):
+    for start, goal in pairs_of(maze_points):
+        _, expected = dijkstra(maze, start, goal)
+        path, dist = plan(maze, start, goal, 'field')
+        if expected is None:
+            assert path is None and dist is None
+        else:
+            assert dist == pytest.approx(expected, abs = 1e-9)
+            check_path(maze, path, dist, start, goal)
+
+def test_start_distances_match_start_distance(maze, maze_points):
+    field = distance_field(maze, maze_points[3])
+    expected = [start_distance(field, maze, start) for start in maze_points]
+    np.testing.assert_array_equal(start_distances(field, maze, maze_points), expected)
+
+def test_unreachable_goal(maze, maze_points):
+    room = (70, 7)
+    assert room in maze_points
+    assert dijkstra(maze, maze_points[0], room) == (None, None)
+    assert plan(maze, maze_points[0], room, 'field') == (None, None)
+
+def test_astar_matches_dijkstra(maze, maze_points):
+    for start, goal in pairs_of(maze_points, seed = 1):
+        _, expected = dijkstra(maze, start, goal)
+        path, dist = plan(maze, start, goal, 'astar')
+        if expected is None:
+            assert path is None and dist is None
+        else:
+            assert dist == pytest.approx(expected, abs = 1e-9)
+            check_path(maze, path, dist, start, goal)
+
+def test_astar_expands_fewer_nodes(maze):
+    start, goal = (7, 7), (70, 56)
+    before = dict(node_expansions)
+    dijkstra(maze, start, goal)
+    astar(maze, start, goal)
+    assert node_expansions['astar'] - before['astar'] < node_expansions['dijkstra'] - before['dijkstra']
+
+def test_astar_gives_up_past_max_expansions(maze):
+    start, goal = (7, 7), (70, 56)
+    assert astar(maze, start, goal, max_expansions = 10) == (None, None)
+    assert astar(maze, start, goal, max_expansions = 10 ** 6)[1] == pytest.approx(dijkstra(maze, start, goal)[1], abs = 1e-9)
+
+@pytest.fixture
+def empty_cache():
+    PythonFISV3PathPlanning._field_cache.clear()
+    yield
+    PythonFISV3PathPlanning._field_cache.clear()
+
+def test_cached_matches_dijkstra(maze, maze_points, empty_cache):
+    # the robots are repositioned near the previous task, whose field is cached, as within the simulations:
+    rng = random.Random(2)
+    previous = maze_points[5]
+    for start, goal in pairs_of(maze_points, seed = 2):
+        distance_field(maze, previous)
+        _, expected = dijkstra(maze, start, goal)
+        path, dist = plan(maze, start, goal, 'cached')
+        if expected is None:
+            assert path is None and dist is None
+        else:
+            assert dist == pytest.approx(expected, abs = 1e-9)
+            check_path(maze, path, dist, start, goal)
+        previous = rng.choice(maze_points)
+
+def test_cached_landmark_search(maze, empty_cache):
+    source, start, goal = (7, 7), (9, 8), (70, 56)
+    distance_field(maze, source)
+    before = dict(node_expansions)
+
+    # the start is near the cached source, so A* is run with its field as a landmark rather than computing the field to the goal:
+    path, dist = plan_cached(maze, start, goal)
+    assert dist == pytest.approx(dijkstra(maze, start, goal)[1], abs = 1e-9)
+    assert cached_field(maze, goal) is None
+
+    # the search is only counted under the cached planner:
+    assert node_expansions['astar'] == before['astar'] and node_expansions['field'] == before['field']
+    assert node_expansions['cached'] > before['cached']
+
+def test_cached_falls_back_to_field(maze, empty_cache):
+    source, start, goal = (7, 7), (9, 8), (70, 56)
+    distance_field(maze, source)
+
+    # A* gives up straight away, so the field to the goal is computed and kept for the next robot:
+    path, dist = plan_cached(maze, start, goal, max_expansions = 1)
+    assert dist == pytest.approx(dijkstra(maze, start, goal)[1], abs = 1e-9)
+    check_path(maze, path, dist, start, goal)
+    assert cached_field(maze, goal) is not None
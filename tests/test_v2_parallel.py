@@ -0,0 +1,54 @@
+"""
+
+This program tests that the V2 Monte Carlo runs of PythonFISV2Test.py give the
+same results across a pool of worker processes as they do serially, on a few
+short simulations.
+
+"""
+######################## Import Packages ########################
+
+import numpy as np
+import pytest
+import PythonFISV3PathPlanning
+from conftest import ROOT
+from PythonFISV2Test import run_simulations
+
+params = {
+    'resolution': 0.05,
+    'map_str': "warehouse_map.png",
+    'visualize': False,
+    'buffer': 5,
+    'nr': 2,
+    'x': 1,
+    'task_num': 2,
+    'planner': "field",
+    'precompute': False,
+}
+
+######################### Define Tests ##########################
+
+@pytest.fixture
+def run(monkeypatch):
+    # the maps are read relative to the root of the repository, and each run starts without any cached fields:
+    monkeypatch.chdir(ROOT)
+    def run(sim_length, seed, workers):
+        PythonFISV3PathPlanning._field_cache.clear()
+        return run_simulations(params, sim_length, seed, workers)
+    return run
+
+def test_parallel_matches_serial(run):
+    parallel = run(3, 5, 2)
+    serial = run(3, 5, 1)
+
+    # the loads, distances travelled, and FIS inputs and outputs of every allocation:
+    np.testing.assert_array_equal(parallel[0], serial[0])
+    np.testing.assert_array_equal(parallel[1], serial[1])
+    assert parallel[2].equals(serial[2])
+    assert parallel[3].equals(serial[3])
+
+def test_simulations_are_seeded(run):
+    # simulation i is seeded with seed + i, so a later seed continues the same sequence of simulations:
+    first = run(2, 5, 1)
+    shifted = run(1, 6, 1)
+    np.testing.assert_array_equal(first[1][1:], shifted[1])
+    assert not np.array_equal(first[1][0], first[1][1])
@@ -0,0 +1,36 @@
+"""
+
+This program tests the vectorized FIS of PythonFISVectorized.py against the
+skfuzzy FIS of PythonFISFunctionV3.py, on a seeded batch of inputs spanning the
+range of every input.
+
+"""
+######################## Import Packages ########################
+
+import numpy as np
+import pytest
+from PythonFISFunctionV3 import fis_create, CompiledFIS
+from PythonFISVectorized import fis_create_vectorized
+
+######################### Define Tests ##########################
+
+@pytest.fixture(scope = 'module')
+def samples():
+    rng = np.random.default_rng(0)
+    samples = rng.uniform([0, 0, 0], [10, 25, 50], size = (64, 3))
+
+    # the corners of the input space and the vertices of the membership functions:
+    return np.vstack([samples, [[0, 0, 0], [10, 25, 50], [5, 12.5, 25], [4, 10, 15], [6, 15, 30]]])
+
+def test_matches_skfuzzy(samples):
+    expected = CompiledFIS(fis_create()).solve_batch(samples)
+    np.testing.assert_allclose(fis_create_vectorized().solve_batch(samples), expected, rtol = 0, atol = 1e-9)
+
+def test_chunks_match_single_batch(samples):
+    fis = fis_create_vectorized()
+    np.testing.assert_array_equal(fis.solve_batch(samples, chunk_size = 7), fis.solve_batch(samples))
+
+def test_solve_matches_solve_batch(samples):
+    fis = fis_create_vectorized()
+    batch = fis.solve_batch(samples)
+    assert [fis.solve(*sample) for sample in samples] == pytest.approx(batch.tolist(), abs = 1e-12)